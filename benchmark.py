@@ -0,0 +1,324 @@
+"""
+Messreihe für alle Operationen von ClDataframeHelper und alle Routen von main.py.
+
+Für jede Zeilenzahl werden synthetische Tabellen mitglieder.csv und vorstand.csv (siehe synthetic_data) in einem
+temporären Ordner erzeugt. Die Messungen laufen je Zeilenzahl in einem eigenen Prozess, damit der höchste
+Speicherbedarf (Peak RSS) zu dieser Zeilenzahl gehört. Die Routen werden über den Test-Client von Flask
+aufgerufen, also mit Vorlagen und Antwort, aber ohne Netzwerk.
+
+Jede Operation wird einmal zum Aufwärmen und danach bis zu --repeat mal ausgeführt, höchstens --budget Sekunden
+lang. Ausgegeben werden Median (p50), p95 und p99 in Millisekunden und der bis dahin höchste Speicherbedarf.
+Schreibende Operationen bereiten ihre Daten außerhalb der Messung vor (z. B. ein Mitglied, das danach gelöscht
+wird), die Tabellen bleiben dadurch ungefähr gleich groß.
+
+Mit --save werden die Ergebnisse als Vergleichswerte gespeichert. Liegen Vergleichswerte vor, wird jede
+Operation verglichen: ist ihr Median oder der Speicherbedarf um mehr als --tolerance langsamer bzw. größer,
+gilt das als Verschlechterung und das Skript endet mit Rückgabewert 1.
+
+Aufruf: python benchmark.py [--rows 1000 10000 100000] [--backend csv|sqlite|snapshot] [--repeat N]
+                            [--budget Sekunden] [--baseline Datei] [--save] [--tolerance 1.5]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from synthetic_data import write_tables
+
+DEFAULT_ROWS = (1000, 10000, 100000)
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+# Unterschiede unter dieser Dauer gelten nie als Verschlechterung (Messrauschen bei sehr kurzen Operationen)
+MIN_DIFFERENCE_MS = 1.0
+
+try:
+    import resource
+except ImportError:
+    # Unter Windows gibt es kein resource, der Speicherbedarf wird dann nicht gemessen
+    resource = None
+
+
+def peak_rss_mb():
+    """
+    Gibt den bisher höchsten Speicherbedarf des Prozesses in MiB zurück oder None, wenn er nicht messbar ist.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS gibt Bytes an, Linux Kilobytes
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+class ClBenchmark:
+    """
+    Führt Operationen wiederholt aus und sammelt ihre Dauer.
+
+    Attribute:
+        repeat (int): Die höchste Anzahl an Messungen je Operation.
+        budget (float): Die Zeit in Sekunden, nach der keine weitere Messung begonnen wird.
+        results (dict): Je Operation Anzahl, p50, p95 und p99 in Millisekunden und den Peak RSS in MiB.
+    """
+
+    # Mindestens so viele Messungen, auch wenn das Zeitbudget überschritten wird
+    MIN_REPEAT = 3
+
+    def __init__(self, repeat: int, budget: float):
+        self.repeat = repeat
+        self.budget = budget
+        self.results = {}
+
+    def measure(self, name: str, run, prepare=None):
+        """
+        Misst eine Operation.
+
+        Args:
+            name (str): Der Name in der Ausgabe.
+            run: Die Operation. Sie bekommt das Ergebnis von `prepare` übergeben, wenn es angegeben ist.
+            prepare (optional): Wird vor jedem Aufruf außerhalb der Messung ausgeführt.
+        """
+        durations = []
+        started = time.perf_counter()
+        for i in range(self.repeat + 1):
+            if i > self.MIN_REPEAT and time.perf_counter() - started > self.budget:
+                break
+            args = (prepare(),) if prepare is not None else ()
+            start = time.perf_counter()
+            run(*args)
+            duration = time.perf_counter() - start
+            # Der erste Aufruf wärmt nur auf (Caches, Sichten, Suchindex)
+            if i > 0:
+                durations.append(duration * 1000)
+        p50, p95, p99 = np.percentile(durations, [50, 95, 99])
+        self.results[name] = {'n': len(durations), 'p50': round(float(p50), 3), 'p95': round(float(p95), 3),
+                              'p99': round(float(p99), 3), 'rss_mb': peak_rss_mb()}
+        print(f"  {name:<44} {len(durations):>5} {p50:>10.2f} {p95:>10.2f} {p99:>10.2f}"
+              f" {self.results[name]['rss_mb'] or 0:>9.1f}", flush=True)
+
+
+def _member(id: int = 0) -> dict:
+    return {'ID': id, 'Vorname': 'Bench', 'Nachname': 'Mark', 'Geburtsdatum': '01.01.1990',
+            'Eintrittsdatum': '01.01.2020', 'Status': 2}
+
+
+def _check(response):
+    """
+    Bricht die Messung ab, wenn eine Route einen Fehler meldet, statt eine schnelle Fehlerseite zu messen.
+    """
+    body = response.get_data()
+    if response.status_code != 200 or body.startswith(b'Fehler'):
+        raise RuntimeError(f"{response.request.path} antwortet mit {response.status_code}: {body[:200]!r}")
+
+
+def run_size(file_path: str, backend: str, repeat: int, budget: float, seed: int) -> dict:
+    """
+    Misst alle Operationen und Routen mit den Tabellen im Ordner `file_path`/daten.
+    Läuft in einem eigenen Prozess, siehe main.
+    """
+    # Ablage und Datenordner werden beim Import von dataframe_helper bzw. main festgelegt, deshalb erst hier
+    # importieren. main wärmt den Datendienst beim Import auf, bei SQLite erst nach der Übertragung.
+    os.environ['MEIN_VEREIN_BACKEND'] = backend
+    os.environ['MEIN_VEREIN_DATA_DIR'] = os.path.join(file_path, 'daten')
+    os.chdir(file_path)
+    from dataframe_cache import ClDataframeCache
+    from dataframe_helper import ClDataframeHelper
+    if backend == 'sqlite':
+        from sqlite_backend import migrate_csv_to_sqlite
+        migrate_csv_to_sqlite('daten')
+    from main import app
+
+    rng = np.random.default_rng(seed)
+    o_helper = ClDataframeHelper('daten')
+    bench = ClBenchmark(repeat, budget)
+    df_members = o_helper.read_csv('mitglieder.csv')
+    df_board = o_helper.read_csv('vorstand.csv')
+    member_ids = df_members['ID'].to_numpy()
+    board_ids = df_board['ID'].unique()
+    # IDs oberhalb aller Mitglieder für Vorstandsposten, die nur zum Löschen angelegt werden
+    spare_ids = iter(range(int(member_ids.max()) + 1_000_000, int(member_ids.max()) + 2_000_000))
+
+    def random_id():
+        return int(rng.choice(member_ids))
+
+    def new_member():
+        rows = [_member()]
+        o_helper.insert_csv('mitglieder.csv', rows)
+        return rows[0]['ID']
+
+    def new_board_row(id=None):
+        id = next(spare_ids) if id is None else id
+        o_helper.insert_csv('vorstand.csv', [{'ID': id, 'Position': 'Beisitzer', 'Von': '01.01.2020', 'Bis': ''}])
+        return id
+
+    def new_board_member():
+        return new_board_row(new_member())
+
+    def board_member():
+        id = int(rng.choice(board_ids))
+        return id, o_helper.get_rows_by_id('vorstand.csv', id)
+
+    print(f"{'Operation':<46} {'n':>5} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10} {'RSS (MiB)':>9}")
+
+    # ClDataframeHelper
+    bench.measure('read_csv (kalt)', lambda: ClDataframeHelper('daten', cache=ClDataframeCache()).read_csv(
+        'mitglieder.csv'))
+    bench.measure('read_csv', lambda: o_helper.read_csv('mitglieder.csv'))
+    bench.measure('read_csv ID', lambda id: o_helper.read_csv('mitglieder.csv', {'ID': id}), random_id)
+    bench.measure('read_csv Bedingungen', lambda: o_helper.read_csv('mitglieder.csv', [
+        ('Status', '==', 2), ('Eintrittsdatum', 'between', ('01.01.2000', '31.12.2009')),
+        ('Nachname', 'prefix', 'Sch')]))
+    bench.measure('read_csv dict', lambda: o_helper.read_csv('mitglieder.csv', return_format='dict'))
+    bench.measure('read_csv vorstand', lambda: o_helper.read_csv('vorstand.csv'))
+    bench.measure('page_records', lambda: o_helper.page_records(df_members, page=2, limit=50, sort='Nachname'))
+    bench.measure('stream_csv csv', lambda: ''.join(o_helper.stream_csv('mitglieder.csv')))
+    bench.measure('stream_csv ndjson', lambda: ''.join(o_helper.stream_csv('mitglieder.csv', return_format='ndjson')))
+    bench.measure('get_rows_by_id', lambda id: o_helper.get_rows_by_id('vorstand.csv', id),
+                  lambda: int(rng.choice(board_ids)))
+    bench.measure('id_exists', lambda id: o_helper.id_exists('mitglieder.csv', id), random_id)
+    bench.measure('get_version', lambda: o_helper.get_version('mitglieder.csv'))
+    bench.measure('get_first_unused_id', lambda: o_helper.get_first_unused_id('mitglieder.csv'))
+    bench.measure('update_csv', lambda id: o_helper.update_csv('mitglieder.csv', id, {'Status': 3}), random_id)
+    bench.measure('insert_csv', lambda: o_helper.insert_csv('mitglieder.csv', [_member()]))
+    bench.measure('delete_id_csv', lambda id: o_helper.delete_id_csv('mitglieder.csv', id), new_member)
+    bench.measure('delete_id_row_csv', lambda id: o_helper.delete_id_row_csv('vorstand.csv', id, 1), new_board_row)
+
+    def update_with_board(args):
+        id, df_rows = args
+        with o_helper.transaction() as transaction:
+            transaction.update('mitglieder.csv', id, {'Status': 2})
+            transaction.delete_id('vorstand.csv', id)
+            transaction.insert('vorstand.csv', o_helper.to_records(df_rows))
+    bench.measure('transaction', update_with_board, board_member)
+    bench.measure('compact_csv', lambda: o_helper.compact_csv('mitglieder.csv'))
+
+    # Routen über den Test-Client
+    client = app.test_client()
+
+    def get(url):
+        return lambda *args: _check(client.get(url.format(*args)))
+
+    def post(url, form):
+        return lambda *args: _check(client.post(url.format(*args), data=form(*args) if callable(form) else form))
+
+    def details_form(args):
+        id, df_rows = args
+        member = o_helper.to_records(o_helper.get_rows_by_id('mitglieder.csv', id))[0]
+        form = {key: str(value) for key, value in member.items()}
+        for nr, row in enumerate(o_helper.to_records(df_rows), start=1):
+            form.update({f'{column}_{nr:02}': '' if pd.isna(row[column]) else row[column]
+                         for column in ('Position', 'Von', 'Bis')})
+        return form
+
+    bench.measure('GET /', get('/'))
+    bench.measure('GET /mitglieder', get('/mitglieder'))
+    bench.measure('GET /mitglieder?page=2&sort=Nachname', get('/mitglieder?page=2&sort=Nachname'))
+    bench.measure('POST /mitglieder filter=25+', post('/mitglieder', {'filter': '25+'}))
+    bench.measure('GET /vorstand', get('/vorstand'))
+    bench.measure('POST /vorstand filter=25', post('/vorstand', {'filter': '25'}))
+    bench.measure('GET /details?id=', get('/details?id={}'), random_id)
+    bench.measure('GET /details?action=new', get('/details?action=new'))
+    bench.measure('POST /details?action=insert', post('/details?action=insert', _member()))
+    bench.measure('POST /details?action=update',
+                  lambda args: _check(client.post('/details?action=update', data=details_form(args))), board_member)
+    bench.measure('POST /details?action=del_row&row=1',
+                  post('/details?action=del_row&row=1', lambda id: {'ID': id}), new_board_member)
+    # Die Detailseite eines gelöschten Mitglieds meldet einen Fehler, hier wird die Antwort nicht geprüft
+    bench.measure('POST /details?action=del_ID',
+                  lambda id: client.post('/details?action=del_ID', data={'ID': id}), new_member)
+    bench.measure('GET /del_mitglied?id=', get('/del_mitglied?id={}'), new_member)
+    bench.measure('GET /export/mitglieder?format=ndjson', get('/export/mitglieder?format=ndjson'))
+    bench.measure('GET /export/vorstand', get('/export/vorstand'))
+    bench.measure('GET /suche?q=mü', get('/suche?q=m%C3%BC'))
+
+    return {'operations': bench.results, 'peak_rss_mb': peak_rss_mb()}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Vergleicht die Ergebnisse mit den Vergleichswerten.
+
+    Returns:
+        list: Die Verschlechterungen als Texte, leer wenn es keine gibt.
+    """
+    regressions = []
+    for rows, result in results.items():
+        base = baseline.get('sizes', {}).get(rows)
+        if base is None:
+            continue
+        for name, values in result['operations'].items():
+            base_values = base['operations'].get(name)
+            if base_values is None:
+                continue
+            if values['p50'] > base_values['p50'] * tolerance \
+                    and values['p50'] - base_values['p50'] > MIN_DIFFERENCE_MS:
+                regressions.append(f"{rows} Zeilen, {name}: p50 {values['p50']:.2f} ms "
+                                   f"statt {base_values['p50']:.2f} ms")
+        if result['peak_rss_mb'] and base.get('peak_rss_mb') \
+                and result['peak_rss_mb'] > base['peak_rss_mb'] * tolerance:
+            regressions.append(f"{rows} Zeilen, Peak RSS: {result['peak_rss_mb']:.1f} MiB "
+                               f"statt {base['peak_rss_mb']:.1f} MiB")
+    return regressions
+
+
+def main(args: list) -> bool:
+    parser = argparse.ArgumentParser(description="Messreihe für ClDataframeHelper und die Flask-Routen.")
+    parser.add_argument('--rows', type=int, nargs='+', default=list(DEFAULT_ROWS))
+    parser.add_argument('--backend', choices=('csv', 'sqlite', 'snapshot'), default='csv')
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--budget', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true', help="Ergebnisse als Vergleichswerte speichern")
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    options = parser.parse_args(args)
+
+    meta = {'backend': options.backend, 'python': platform.python_version(), 'pandas': pd.__version__,
+            'machine': platform.node()}
+    baseline = None
+    if os.path.exists(options.baseline):
+        with open(options.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('meta') != meta:
+            print(f"Hinweis: Die Vergleichswerte stammen aus einer anderen Umgebung: {baseline.get('meta')}")
+
+    results = {}
+    # Ein neuer Prozess je Zeilenzahl (spawn statt fork), damit Peak RSS und Caches nicht übernommen werden
+    context = multiprocessing.get_context('spawn')
+    for rows in options.rows:
+        file_path = tempfile.mkdtemp(prefix='mein_verein_benchmark_')
+        try:
+            write_tables(os.path.join(file_path, 'daten'), rows, options.seed)
+            print(f"\n{rows} Mitglieder, Ablage {options.backend}")
+            with context.Pool(1) as pool:
+                results[str(rows)] = pool.apply(run_size, (file_path, options.backend, options.repeat,
+                                                           options.budget, options.seed))
+            print(f"Peak RSS: {results[str(rows)]['peak_rss_mb'] or 0:.1f} MiB")
+        finally:
+            shutil.rmtree(file_path)
+
+    ok = True
+    if baseline is not None:
+        regressions = compare(results, baseline, options.tolerance)
+        print(f"\nVergleich mit {options.baseline} (Toleranz {options.tolerance}):")
+        for regression in regressions:
+            print("  Verschlechterung:", regression)
+        if not regressions:
+            print("  keine Verschlechterung")
+        ok = not regressions
+    if options.save:
+        sizes = dict(baseline.get('sizes', {})) if baseline is not None and baseline.get('meta') == meta else {}
+        sizes.update(results)
+        with open(options.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'sizes': sizes}, f, indent=2, ensure_ascii=False)
+        print(f"Vergleichswerte gespeichert in {options.baseline}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(sys.argv[1:]) else 1)
@@ -0,0 +1,63 @@
+import threading
+from collections import deque
+
+
+class ClChangeLog:
+    """
+    Ein Protokoll der Schreibvorgänge je Tabelle.
+
+    Jeder Eintrag hält den Stempel der Tabelle vor und nach dem Schreiben sowie die betroffenen IDs.
+    Inkrementell gepflegte Sichten fragen damit ab, welche IDs sich zwischen ihrem Stand und dem aktuellen
+    Stand geändert haben. Lässt sich der Weg zwischen den Stempeln nicht lückenlos nachvollziehen (z. B. nach
+    einer Änderung durch einen anderen Prozess oder von Hand), muss die Sicht vollständig neu aufgebaut werden.
+
+    Attribute:
+        max_entries (int): Die Anzahl der Einträge, die je Tabelle aufbewahrt werden.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def record(self, table_key: str, stamp_before: tuple, stamp_after: tuple, ids):
+        """
+        Protokolliert einen Schreibvorgang.
+
+        Args:
+            table_key (str): Der Schlüssel der Tabelle (siehe ClStorageBackend.table_key).
+            stamp_before (tuple): Der Stempel der Tabelle vor dem Schreiben.
+            stamp_after (tuple): Der Stempel der Tabelle nach dem Schreiben.
+            ids (iterable): Die IDs aller Zeilen, die geändert, eingefügt oder gelöscht wurden.
+        """
+        with self._lock:
+            entries = self._entries.setdefault(table_key, deque(maxlen=self.max_entries))
+            entries.append((stamp_before, stamp_after, frozenset(ids)))
+
+    def changed_ids(self, table_key: str, stamp_from: tuple, stamp_to: tuple):
+        """
+        Gibt die IDs zurück, die sich zwischen zwei Ständen einer Tabelle geändert haben.
+
+        Args:
+            table_key (str): Der Schlüssel der Tabelle.
+            stamp_from (tuple): Der Stempel des älteren Stands.
+            stamp_to (tuple): Der Stempel des neueren Stands.
+
+        Returns:
+            set | None: Die geänderten IDs oder None, wenn der Weg zwischen den Ständen nicht bekannt ist.
+        """
+        ids = set()
+        stamp = stamp_from
+        with self._lock:
+            entries = list(self._entries.get(table_key, ()))
+        successors = {before: (after, changed) for before, after, changed in entries}
+        while stamp != stamp_to:
+            if stamp not in successors:
+                return None
+            stamp, changed = successors.pop(stamp)
+            ids |= changed
+        return ids
+
+
+# Gemeinsames Protokoll für alle Datenablagen im Prozess
+shared_change_log = ClChangeLog()
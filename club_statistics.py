@@ -0,0 +1,369 @@
+import threading
+from collections import Counter
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from change_log import ClChangeLog, shared_change_log
+from derived_columns import MISSING_DATE, date_ordinals, ordinal_years
+from storage_backend import ClStorageBackend
+from table_schema import DATE_FORMAT
+
+# Die Mitgliedsjahre, zu denen ein Jubiläum gefeiert wird
+JUBILEE_YEARS = (25, 40, 50)
+# Breite der Altersgruppen in Jahren
+AGE_GROUP_YEARS = 10
+# Ab so vielen geänderten IDs wird eine Statistik neu aufgebaut, statt jede ID einzeln nachzuschlagen
+MAX_REFRESH_IDS = 1000
+
+
+class _ClMemberStats:
+    """
+    Die Zähler der Mitgliedertabelle.
+
+    Je Mitglied werden Status, Geburtsjahr und Eintrittsdatum als nach ID sortierte Arrays gehalten, damit die
+    bisherigen Werte einer geänderten ID per Binärsuche gefunden und aus den Zählern ausgetragen werden können.
+    Die Eintrittsdaten stehen zusätzlich aufsteigend sortiert mit ihrer ID in eigenen Arrays; die Mitglieder
+    eines Jubiläumszeitraums liegen dort zusammenhängend.
+
+    Attribute:
+        stamp (tuple): Der Stempel der Tabelle, zu dem die Zähler passen.
+        status_counts (Counter): Die Anzahl der Mitglieder je Status.
+        birth_years (Counter): Die Anzahl der Mitglieder je Geburtsjahr (ohne fehlende Geburtsdaten).
+    """
+
+    def __init__(self, stamp: tuple, ids: np.ndarray, status: np.ndarray, birth_years: np.ndarray,
+                 entries: np.ndarray):
+        self.stamp = stamp
+        order = np.argsort(ids, kind='stable')
+        self.ids = ids[order]
+        self.status = status[order]
+        self.birth = birth_years[order]
+        self.entry = entries[order]
+        self.status_counts = Counter(self.status.tolist())
+        self.birth_years = Counter(self.birth[~np.isnan(self.birth)].astype(np.int64).tolist())
+        known = self.entry != MISSING_DATE
+        order = np.argsort(self.entry[known], kind='stable')
+        self.entry_sorted = self.entry[known][order]
+        self.entry_ids = self.ids[known][order]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def remove(self, ids):
+        """
+        Trägt die Mitglieder mit den IDs aus; IDs ohne Mitglied werden übersprungen.
+        """
+        ids = np.asarray(sorted(ids), dtype=self.ids.dtype)
+        positions = np.searchsorted(self.ids, ids)
+        found = positions < len(self.ids)
+        found[found] = self.ids[positions[found]] == ids[found]
+        positions = positions[found]
+        if not len(positions):
+            return
+        self.status_counts.subtract(self.status[positions].tolist())
+        birth = self.birth[positions]
+        self.birth_years.subtract(birth[~np.isnan(birth)].astype(np.int64).tolist())
+
+        # Die Einträge mit gleichem Eintrittsdatum liegen zusammen, darin wird die ID gesucht
+        entry_positions = []
+        for id, entry in zip(self.ids[positions], self.entry[positions]):
+            if entry == MISSING_DATE:
+                continue
+            start = np.searchsorted(self.entry_sorted, entry, side='left')
+            stop = np.searchsorted(self.entry_sorted, entry, side='right')
+            entry_positions.append(start + int(np.flatnonzero(self.entry_ids[start:stop] == id)[0]))
+        self.entry_sorted = np.delete(self.entry_sorted, entry_positions)
+        self.entry_ids = np.delete(self.entry_ids, entry_positions)
+
+        self.ids = np.delete(self.ids, positions)
+        self.status = np.delete(self.status, positions)
+        self.birth = np.delete(self.birth, positions)
+        self.entry = np.delete(self.entry, positions)
+        self._drop_zero_counts()
+
+    def add(self, ids: np.ndarray, status: np.ndarray, birth_years: np.ndarray, entries: np.ndarray):
+        """
+        Trägt neue Mitglieder ein. Die IDs dürfen noch nicht eingetragen sein.
+        """
+        order = np.argsort(ids, kind='stable')
+        ids, status, birth_years, entries = ids[order], status[order], birth_years[order], entries[order]
+        positions = np.searchsorted(self.ids, ids)
+        self.ids = np.insert(self.ids, positions, ids.astype(self.ids.dtype))
+        self.status = np.insert(self.status, positions, status)
+        self.birth = np.insert(self.birth, positions, birth_years)
+        self.entry = np.insert(self.entry, positions, entries)
+        self.status_counts.update(status.tolist())
+        self.birth_years.update(birth_years[~np.isnan(birth_years)].astype(np.int64).tolist())
+
+        known = entries != MISSING_DATE
+        order = np.argsort(entries[known], kind='stable')
+        new_entries, new_ids = entries[known][order], ids[known][order]
+        positions = np.searchsorted(self.entry_sorted, new_entries, side='right')
+        self.entry_sorted = np.insert(self.entry_sorted, positions, new_entries)
+        self.entry_ids = np.insert(self.entry_ids, positions, new_ids.astype(self.entry_ids.dtype))
+
+    def _drop_zero_counts(self):
+        for counter in (self.status_counts, self.birth_years):
+            for key in [key for key, count in counter.items() if count <= 0]:
+                del counter[key]
+
+
+class _ClBoardStats:
+    """
+    Die Zähler der Vorstandstabelle je Posten.
+
+    Die Jahre eines aktiven Postens hängen vom laufenden Jahr ab. Gezählt werden deshalb für beendete Posten die
+    Summe der Jahre und für aktive Posten die Summe der Anfangsjahre; die Jahre ergeben sich bei der Abfrage
+    als Anzahl * laufendes Jahr - Summe der Anfangsjahre.
+
+    Attribute:
+        stamp (tuple): Der Stempel der Tabelle, zu dem die Zähler passen.
+        rows (dict): Je ID die Posten als Tupel (Position, Anfangsjahr, Endjahr); fehlende Jahre sind None.
+        positions (dict): Je Position die Zähler (siehe COUNTERS).
+    """
+
+    COUNTERS = ('posten', 'aktiv', 'ohne_beginn', 'jahre_beendet', 'aktiv_mit_beginn', 'beginn_aktiv')
+
+    def __init__(self, stamp: tuple):
+        self.stamp = stamp
+        self.rows = {}
+        self.positions = {}
+
+    def add(self, id, rows: list):
+        self.rows[id] = rows
+        self._count(rows, 1)
+
+    def remove(self, id):
+        self._count(self.rows.pop(id, ()), -1)
+
+    def _count(self, rows, sign: int):
+        for position, year_from, year_until in rows:
+            counters = self.positions.setdefault(position, dict.fromkeys(self.COUNTERS, 0))
+            counters['posten'] += sign
+            if year_until is None:
+                counters['aktiv'] += sign
+            if year_from is None:
+                counters['ohne_beginn'] += sign
+            elif year_until is None:
+                counters['aktiv_mit_beginn'] += sign
+                counters['beginn_aktiv'] += sign * year_from
+            else:
+                counters['jahre_beendet'] += sign * (year_until - year_from)
+            if counters['posten'] == 0:
+                del self.positions[position]
+
+
+class ClClubStatistics:
+    """
+    Die Vereinsstatistik: Anzahl der Mitglieder je Status, Altersgruppen, anstehende Jubiläen und die
+    Amtszeiten im Vorstand je Posten.
+
+    Die Statistik wird nicht bei jeder Abfrage aus den Tabellen berechnet, sondern als Zähler gehalten. Wie der
+    Suchindex (siehe ClNameSearch) wird sie nach jedem Einfügen, Ändern oder Löschen nur für die IDs
+    fortgeschrieben, die laut Änderungsprotokoll betroffen sind: Die bisherigen Werte dieser IDs werden aus den
+    Zählern ausgetragen und die aktuellen in einer Abfrage über den ID-Index nachgeschlagen und eingetragen. Ist
+    der Weg zwischen den Ständen nicht bekannt oder sind es mehr als MAX_REFRESH_IDS IDs, wird die Statistik neu
+    aufgebaut.
+
+    Die Zähler hängen nicht vom heutigen Datum ab. Alter, Jubiläen und die Jahre aktiver Posten werden erst bei
+    der Abfrage daraus bestimmt; report kostet deshalb unabhängig von der Anzahl der Mitglieder nur die
+    Altersgruppen, Posten und aufgelisteten Jubilare.
+
+    Attribute:
+        members_csv (str): Der Name der Mitgliedertabelle.
+        board_csv (str): Der Name der Vorstandstabelle.
+        change_log (ClChangeLog): Das Protokoll, aus dem die geänderten IDs gelesen werden.
+    """
+
+    def __init__(self, members_csv: str = 'mitglieder.csv', board_csv: str = 'vorstand.csv',
+                 change_log: ClChangeLog = None):
+        self.members_csv = members_csv
+        self.board_csv = board_csv
+        self.change_log = change_log if change_log is not None else shared_change_log
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def report(self, backend: ClStorageBackend, months: int = 3, limit: int = 100, today: date = None) -> dict:
+        """
+        Gibt die Statistik zurück.
+
+        Args:
+            backend (ClStorageBackend): Die Datenablage mit Mitglieder- und Vorstandstabelle.
+            months (int, optional): Jubiläen ab heute in so vielen Monaten. Standard ist 3.
+            limit (int, optional): Die höchste Anzahl aufgelisteter Jubilare. Standard ist 100.
+            today (date, optional): Der Stichtag, Standard ist heute.
+
+        Returns:
+            dict: 'stichtag', 'mitglieder', 'status' (Anzahl je Status), 'alter' (Anzahl je Altersgruppe im
+            laufenden Jahr), 'ohne_geburtsdatum', 'jubilaeen' (mit 'anzahl' und den ersten `limit` Jubilaren
+            nach Datum) und 'vorstand' (je Posten 'posten', 'aktiv', 'jahre' und 'jahre_je_posten').
+
+        Raises:
+            FileNotFoundError: Wenn die Mitgliedertabelle nicht existiert.
+        """
+        today = today if today is not None else date.today()
+        with self._lock:
+            members = self._members(backend)
+            try:
+                board = self._board(backend)
+            except FileNotFoundError:
+                board = None
+            jubilees, total = self._jubilees(members, today, months, limit)
+            return {'stichtag': today.strftime(DATE_FORMAT),
+                    'mitglieder': len(members),
+                    'status': {str(status): count for status, count in sorted(members.status_counts.items(),
+                                                                               key=lambda item: str(item[0]))},
+                    'alter': self._age_groups(members, today.year),
+                    'ohne_geburtsdatum': len(members) - sum(members.birth_years.values()),
+                    'jubilaeen': {'monate': months, 'anzahl': total,
+                                  'mitglieder': self._jubilee_rows(backend, jubilees)},
+                    'vorstand': self._board_report(board, today.year) if board is not None else {}}
+
+    def warm(self, backend: ClStorageBackend):
+        """
+        Baut die Zähler auf, falls sie nicht zum aktuellen Stand der Tabellen passen (z. B. beim Start).
+        """
+        self.report(backend, limit=0)
+
+    def invalidate(self):
+        """
+        Verwirft alle Stände der Statistik.
+        """
+        with self._lock:
+            self._states.clear()
+
+    def _members(self, backend: ClStorageBackend) -> _ClMemberStats:
+        key = backend.table_key(self.members_csv)
+        state = self._states.get(key)
+        stamp = backend.get_stamp(self.members_csv)
+        if state is not None and state.stamp == stamp:
+            return state
+        changed_ids = None
+        if state is not None:
+            changed_ids = self.change_log.changed_ids(key, state.stamp, stamp)
+        if changed_ids is None or len(changed_ids) > MAX_REFRESH_IDS:
+            state = _ClMemberStats(stamp, *self._member_values(backend.read(self.members_csv)))
+        else:
+            state.remove(changed_ids)
+            rows = self._rows_by_ids(backend, self.members_csv, changed_ids)
+            if len(rows):
+                state.add(*self._member_values(rows))
+            state.stamp = stamp
+        self._states[key] = state
+        return state
+
+    def _board(self, backend: ClStorageBackend) -> _ClBoardStats:
+        key = backend.table_key(self.board_csv)
+        state = self._states.get(key)
+        stamp = backend.get_stamp(self.board_csv)
+        if state is not None and state.stamp == stamp:
+            return state
+        changed_ids = None
+        if state is not None:
+            changed_ids = self.change_log.changed_ids(key, state.stamp, stamp)
+        if changed_ids is None or len(changed_ids) > MAX_REFRESH_IDS:
+            state = _ClBoardStats(stamp)
+            df = backend.read(self.board_csv)
+        else:
+            for id in changed_ids:
+                state.remove(id)
+            df = self._rows_by_ids(backend, self.board_csv, changed_ids)
+        if len(df):
+            years_from = ordinal_years(date_ordinals(df['Von']))
+            years_until = ordinal_years(date_ordinals(df['Bis']))
+            board_rows = {}
+            for id, position, year_from, year_until in zip(df['ID'].tolist(), df['Position'].tolist(),
+                                                           years_from.tolist(), years_until.tolist()):
+                board_rows.setdefault(id, []).append((position, None if np.isnan(year_from) else int(year_from),
+                                                      None if np.isnan(year_until) else int(year_until)))
+            for id, rows in board_rows.items():
+                state.add(id, rows)
+        state.stamp = stamp
+        self._states[key] = state
+        return state
+
+    @staticmethod
+    def _rows_by_ids(backend: ClStorageBackend, csv_name: str, ids) -> pd.DataFrame:
+        """
+        Gibt die Zeilen der IDs in einer Abfrage über den ID-Index zurück.
+        """
+        return backend.read(csv_name, [('ID', 'in', [int(id) for id in ids])])
+
+    @staticmethod
+    def _member_values(df: pd.DataFrame) -> tuple:
+        """
+        Gibt IDs, Status, Geburtsjahre und Eintrittsdaten (Tagesordinale) der Zeilen zurück.
+        """
+        status = df['Status'].astype(object)
+        return (df['ID'].to_numpy(dtype=np.int64),
+                status.where(status.notna(), None).to_numpy(dtype=object),
+                ordinal_years(date_ordinals(df['Geburtsdatum'])),
+                date_ordinals(df['Eintrittsdatum']))
+
+    @staticmethod
+    def _age_groups(members: _ClMemberStats, year: int) -> dict:
+        groups = Counter()
+        for birth_year, count in members.birth_years.items():
+            group = max(year - birth_year, 0) // AGE_GROUP_YEARS * AGE_GROUP_YEARS
+            groups[group] += count
+        return {f"{group}-{group + AGE_GROUP_YEARS - 1}": groups[group] for group in sorted(groups)}
+
+    @staticmethod
+    def _jubilees(members: _ClMemberStats, today: date, months: int, limit: int) -> tuple:
+        """
+        Gibt die ersten `limit` Jubiläen ab heute in den nächsten `months` Monaten als Tupel (Datum, Jahre, ID,
+        Eintrittsdatum) und die Anzahl aller Jubiläen im Zeitraum zurück. Je Jubiläum wird der Zeitraum der Eintrittsdaten per
+        Binärsuche bestimmt.
+        """
+        start = pd.Timestamp(today)
+        end = start + pd.DateOffset(months=months)
+        found = []
+        count = 0
+        for years in JUBILEE_YEARS:
+            first, last = date_ordinals(pd.Series([start - pd.DateOffset(years=years),
+                                                   end - pd.DateOffset(years=years)]))
+            low = np.searchsorted(members.entry_sorted, first, side='left')
+            high = np.searchsorted(members.entry_sorted, last, side='left')
+            count += int(high - low)
+            stop = min(high, low + limit)
+            for entry, id in zip(members.entry_sorted[low:stop].tolist(), members.entry_ids[low:stop].tolist()):
+                entry = pd.Timestamp(entry, unit='D')
+                found.append((entry + pd.DateOffset(years=years), years, id, entry))
+        found.sort()
+        return found[:limit], count
+
+    def _jubilee_rows(self, backend: ClStorageBackend, jubilees: list) -> list:
+        """
+        Gibt die Jubilare mit ihren Namen aus der Mitgliedertabelle zurück, nachgeschlagen über den ID-Index.
+        """
+        if not jubilees:
+            return []
+        members = self._rows_by_ids(backend, self.members_csv, {id for _, _, id, _ in jubilees})
+        names = {}
+        for id, first_name, last_name in zip(members['ID'].tolist(), members['Vorname'].tolist(),
+                                             members['Nachname'].tolist()):
+            names[id] = (None if pd.isna(first_name) else first_name, None if pd.isna(last_name) else last_name)
+        rows = []
+        for day, years, id, entry in jubilees:
+            if id in names:
+                rows.append({'ID': id, 'Vorname': names[id][0], 'Nachname': names[id][1],
+                             'Eintrittsdatum': entry.strftime(DATE_FORMAT), 'Jahre': years,
+                             'Datum': day.strftime(DATE_FORMAT)})
+        return rows
+
+    @staticmethod
+    def _board_report(board: _ClBoardStats, year: int) -> dict:
+        report = {}
+        for position in sorted(board.positions, key=str):
+            counters = board.positions[position]
+            dated = counters['posten'] - counters['ohne_beginn']
+            years = counters['jahre_beendet'] + year * counters['aktiv_mit_beginn'] - counters['beginn_aktiv']
+            report[str(position)] = {'posten': counters['posten'], 'aktiv': counters['aktiv'], 'jahre': years,
+                                     'jahre_je_posten': round(years / dated, 1) if dated else None}
+        return report
+
+
+# Die gemeinsame Statistik der Anwendung
+club_statistics = ClClubStatistics()
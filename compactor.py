@@ -0,0 +1,111 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+# Schwellen für das Verdichten, per Umgebungsvariable überschreibbar: Anzahl der Grabsteine einer Tabelle und
+# ihr Anteil an den Zeilen der Datei. MEIN_VEREIN_COMPACT=0 schaltet das Verdichten im Hintergrund ab.
+DEFAULT_MAX_TOMBSTONES = int(os.environ.get('MEIN_VEREIN_COMPACT_TOMBSTONES', '10000'))
+DEFAULT_MAX_RATIO = float(os.environ.get('MEIN_VEREIN_COMPACT_RATIO', '0.2'))
+DEFAULT_ENABLED = os.environ.get('MEIN_VEREIN_COMPACT', '1').lower() not in ('0', 'false', 'no')
+
+logger = logging.getLogger(__name__)
+
+
+class ClCompactor:
+    """
+    Verdichtet Tabellen in einem Hintergrund-Thread.
+
+    Gelöschte Zeilen bleiben zunächst in der CSV-Datei stehen und werden nur als Grabsteine vermerkt (siehe
+    ClCsvBackend.delete_id). Überschreitet eine Tabelle nach einem Löschen eine der Schwellen, wird sie hier
+    vorgemerkt; der Thread schreibt sie dann mit backend.compact ohne die gelöschten Zeilen neu. Angehängte
+    Zeilen und Schnappschuss werden dabei ebenfalls in eine frische Datei übernommen.
+
+    Der Thread wird beim ersten Bedarf gestartet. Jede Tabelle steht höchstens einmal in der Warteschlange.
+    Fehler beim Verdichten werden protokolliert; die Grabsteine bleiben dann gültig, bis das nächste Löschen die
+    Tabelle erneut vormerkt.
+
+    Attribute:
+        max_tombstones (int): Ab so vielen Grabsteinen wird verdichtet.
+        max_ratio (float): Ab diesem Anteil der Grabsteine an den Zeilen der Datei wird verdichtet.
+        enabled (bool): Ob überhaupt im Hintergrund verdichtet wird.
+    """
+
+    def __init__(self, max_tombstones: int = DEFAULT_MAX_TOMBSTONES, max_ratio: float = DEFAULT_MAX_RATIO,
+                 enabled: bool = DEFAULT_ENABLED):
+        self.max_tombstones = max_tombstones
+        self.max_ratio = max_ratio
+        self.enabled = enabled
+        self._pending = OrderedDict()
+        self._running = 0
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def needs_compaction(self, tombstones: int, rows: int) -> bool:
+        """
+        Prüft, ob eine Tabelle mit `tombstones` Grabsteinen bei `rows` Zeilen in der Datei verdichtet werden soll.
+        """
+        return tombstones > 0 and (tombstones >= self.max_tombstones or tombstones >= self.max_ratio * rows)
+
+    def notify(self, backend, csv_name: str, tombstones: int, rows: int) -> bool:
+        """
+        Merkt eine Tabelle zum Verdichten vor, wenn sie eine der Schwellen überschreitet.
+
+        Args:
+            backend (ClStorageBackend): Die Datenablage der Tabelle.
+            csv_name (str): Der Name der Tabelle.
+            tombstones (int): Die Anzahl der Grabsteine.
+            rows (int): Die Anzahl der Zeilen in der Datei einschließlich der gelöschten.
+
+        Returns:
+            bool: Ob die Tabelle vorgemerkt wurde.
+        """
+        if not self.needs_compaction(tombstones, rows):
+            return False
+        return self.request(backend, csv_name)
+
+    def request(self, backend, csv_name: str) -> bool:
+        """
+        Merkt eine Tabelle unabhängig von den Schwellen zum Verdichten vor.
+
+        Returns:
+            bool: Ob die Tabelle vorgemerkt wurde (nicht, wenn das Verdichten abgeschaltet ist).
+        """
+        if not self.enabled:
+            return False
+        with self._condition:
+            self._pending[backend.table_key(csv_name)] = (backend, csv_name)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='mein_verein-compactor', daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+        return True
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Wartet, bis alle vorgemerkten Tabellen verdichtet sind.
+
+        Returns:
+            bool: False, wenn die Wartezeit abgelaufen ist.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._running, timeout)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending)
+                _, (backend, csv_name) = self._pending.popitem(last=False)
+                self._running += 1
+            try:
+                backend.compact(csv_name)
+            except Exception:
+                logger.exception("Verdichten von %s fehlgeschlagen", csv_name)
+            finally:
+                with self._condition:
+                    self._running -= 1
+                    self._condition.notify_all()
+
+
+# Der gemeinsame Verdichter der Anwendung
+shared_compactor = ClCompactor()
@@ -0,0 +1,1119 @@
+import io
+import json
+import os
+import tempfile
+from contextlib import ExitStack
+
+import numpy as np
+import pandas as pd
+from pandas.errors import EmptyDataError
+
+from change_log import ClChangeLog, shared_change_log
+from compactor import ClCompactor, shared_compactor
+from dataframe_cache import ClCacheEntry, ClDataframeCache, shared_cache
+from file_lock import ClTableLock
+from id_allocator import ClIdAllocator
+from id_index import ClIdIndex
+from instrumentation import instrumentation
+from query import ClQuery
+from storage_backend import ClStorageBackend
+from table_schema import DATE_FORMAT, schema_for
+from worker_pool import ClWorkerPool, shared_pool
+
+# Ab dieser Dateigröße wird eine CSV-Datei in Stücken im Prozess-Pool eingelesen, per Umgebungsvariable in MB
+# überschreibbar
+PARALLEL_PARSE_BYTES = int(float(os.environ.get('MEIN_VEREIN_PARALLEL_PARSE_MB', '8')) * 1024 * 1024)
+
+
+class _ClSnapshotReader(io.RawIOBase):
+    """
+    Liest eine geöffnete Datei nur bis zu der Größe, die sie beim Öffnen hatte.
+    Später angehängte Zeilen gehören nicht zum Stand und werden nicht gelesen.
+    """
+
+    def __init__(self, f, size: int):
+        self._f = f
+        self._remaining = size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._f.read(min(len(buffer), self._remaining))
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        self._f.close()
+        super().close()
+
+
+def _parse_byte_range(path: str, start: int, end: int, names: list):
+    """
+    Liest die Zeilen zwischen zwei Zeilenanfängen einer CSV-Datei und wandelt sie in die Datentypen des Schemas
+    um, im Prozess-Pool (siehe ClCsvBackend._parse_csv). Das Umwandeln der Datumsangaben ist der teuerste Teil
+    des Einlesens, und umgewandelte Spalten lassen sich viel schneller an den Hauptprozess übergeben als Texte.
+    Gibt None zurück, wenn das Stück Anführungszeichen enthält, da dann ein Zeilenumbruch innerhalb eines Feldes
+    liegen könnte.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    if b'"' in data:
+        return None
+    return schema_for(path).apply(pd.read_csv(io.BytesIO(data), header=None, names=names))
+
+
+class _ClPendingTable:
+    """
+    Der Arbeitsstand einer Tabelle innerhalb einer Transaktion.
+    """
+
+    def __init__(self, path_csv: str, entry: ClCacheEntry, unique: bool):
+        self.path_csv = path_csv
+        self.df = entry.df.copy()
+        self.unique = unique
+        self.changed_ids = set()
+        self.id_allocator = None
+        # Solange nur gelöscht wird, werden die Zeilen als Grabsteine vermerkt statt die Datei neu zu schreiben;
+        # dafür werden der ID-Index und der Speicherbedarf des Cache-Eintrags fortgeschrieben
+        self.tombstones = entry.tombstones
+        self.id_index = entry.id_index.copy() if entry.id_index is not None else None
+        self.nbytes = entry.nbytes
+        self.rewrite = False
+        self.deleted_rows = []
+        self._file_rows = None
+
+    def delete_positions(self, id: int, positions: np.ndarray):
+        """
+        Entfernt die Zeilen der ID an den Positionen und merkt ihre Nummern in der Datei vor, solange die Tabelle
+        nicht ohnehin neu geschrieben wird.
+        """
+        if not self.rewrite:
+            if self._file_rows is None:
+                self._file_rows = np.delete(np.arange(len(self.df) + len(self.tombstones)), self.tombstones)
+            self.deleted_rows.append(self._file_rows[positions])
+            self._file_rows = np.delete(self._file_rows, positions)
+            if self.id_index is not None:
+                self.id_index.remove(id, positions)
+            self.nbytes = self.nbytes * (len(self.df) - len(positions)) // max(len(self.df), 1)
+        self.df = self.df.drop(self.df.index[positions])
+
+
+class ClCsvBackend(ClStorageBackend):
+    """
+    Die Datenablage in CSV-Dateien, eine Datei je Tabelle.
+
+    Eingelesene Dateien werden in einem gemeinsamen Cache gehalten und nur dann neu eingelesen, wenn sich die
+    Datei geändert hat. Die Schreibmethoden aktualisieren den Cache selbst.
+
+    Jede Tabelle hat eine prozessübergreifende Lese-/Schreibsperre und einen Versionszähler (siehe ClTableLock).
+    Jeder Schreibvorgang wird mit den betroffenen IDs im Änderungsprotokoll vermerkt.
+
+    Transaktionen über mehrere Tabellen (apply) schreiben zuerst alle neuen Dateien als temporäre Dateien und
+    dann ein Journal mit deren Namen. Das Journal ist der Commit-Punkt: Bricht der Prozess danach ab, verschiebt
+    _recover_transaction beim nächsten Zugriff alle verbliebenen temporären Dateien an ihr Ziel.
+
+    Gelöschte Zeilen bleiben zunächst in der CSV-Datei stehen. Ihre Nummern in der Datei werden als Grabsteine an
+    die kleine Datei `<csv>.deleted` angehängt, deren erste Zeile Inode, Größe und Änderungszeit der CSV-Datei
+    enthält. Passen sie nicht mehr, etwa nach einem Neuschreiben oder einer Bearbeitung an Ort und Stelle, gelten
+    die Grabsteine nicht mehr: Die Datei wird vollständig eingelesen und zum Verdichten vorgemerkt. Beim
+    Einlesen werden die gelöschten Zeilen mit einer Maske entfernt. Ein Löschen kostet so unabhängig von der Größe
+    der Tabelle nur das Anhängen einiger Bytes; jedes Neuschreiben (Änderung, Transaktion mit Einfügungen oder
+    Änderungen, compact) entfernt die gelöschten Zeilen endgültig. Überschreiten die Grabsteine eine Schwelle, schreibt der
+    Verdichter (siehe ClCompactor) die Tabelle im Hintergrund neu.
+
+    Attribute:
+        file_path (str): Der Dateipfad des Ordners, in dem sich die CSV-Dateien befinden.
+        cache (ClDataframeCache): Der Cache für die eingelesenen DataFrames.
+        change_log (ClChangeLog): Das Protokoll der Schreibvorgänge.
+        compactor (ClCompactor): Der Verdichter für Tabellen mit vielen Grabsteinen.
+        pool (ClWorkerPool): Die Worker, mit denen große Dateien in Stücken eingelesen werden.
+    """
+
+    JOURNAL_NAME = '_transaction.journal'
+    TOMBSTONE_SUFFIX = '.deleted'
+
+    def __init__(self, file_path: str, cache: ClDataframeCache = None, change_log: ClChangeLog = None,
+                 compactor: ClCompactor = None, pool: ClWorkerPool = None):
+        if not file_path:
+            raise ValueError("file_path darf nicht leer sein.")
+        self.file_path = file_path
+        self.cache = cache if cache is not None else shared_cache
+        self.change_log = change_log if change_log is not None else shared_change_log
+        self.compactor = compactor if compactor is not None else shared_compactor
+        self.pool = pool if pool is not None else shared_pool
+
+    @staticmethod
+    def _stamp(path: str) -> tuple:
+        """
+        Gibt den Validierungsstempel für den Cache zurück: Dateistempel und Versionszähler der Tabelle.
+        """
+        return ClDataframeCache.file_stamp(path) + (ClTableLock(path).read_version(),)
+
+    def _load_entry(self, path: str, locked: bool = False) -> ClCacheEntry:
+        """
+        Gibt den Cache-Eintrag einer CSV-Datei zurück und liest die Datei nur bei Bedarf ein.
+        Der DataFrame des Eintrags gehört dem Cache und darf nicht verändert werden.
+        Mit locked=True hält der Aufrufer bereits die Sperre der Tabelle.
+        """
+        if not locked:
+            self._recover_transaction()
+        entry = self.cache.get(path, self._stamp(path))
+        if entry is not None:
+            return entry
+
+        if locked:
+            return self._read_entry(path)
+        with ClTableLock(path).shared():
+            return self._read_entry(path)
+
+    def _read_entry(self, path: str) -> ClCacheEntry:
+        ClCsvBackend._recover_append(path)
+        # Der Stempel wird vor dem Lesen ermittelt, damit eine gleichzeitige Änderung beim nächsten Zugriff auffällt
+        stamp = self._stamp(path)
+        df = self._parse_csv(path)
+        df, tombstones = self._drop_tombstones(path, schema_for(path).apply(df))
+        return self.cache.put(path, df, stamp, tombstones=tombstones)
+
+    def _parse_csv(self, path: str) -> pd.DataFrame:
+        """
+        Liest eine CSV-Datei vollständig ein. Ab PARALLEL_PARSE_BYTES und mit einem Prozess-Pool (siehe
+        ClWorkerPool.multiprocess) wird die Datei an Zeilenanfängen in ein Stück je Worker geteilt, und die Stücke
+        werden im Prozess-Pool gelesen und schon dort in die Datentypen des Schemas umgewandelt; der Aufrufer wendet
+        das Schema trotzdem an, z. B. für die Kategorien, die je Stück verschieden sind.
+
+        Enthält ein Stück Anführungszeichen, passen die Datumsspalten der Stücke nicht zusammen (ungültige Angabe)
+        oder wurde die Datei währenddessen ersetzt, wird sie wie bei kleinen Dateien am Stück gelesen. Der Index
+        zählt in beiden Fällen die Zeilen der Datei (siehe _drop_tombstones).
+        """
+        with instrumentation.timer('csv_parse') as timer:
+            size = os.path.getsize(path)
+            df = None
+            if self.pool.multiprocess and size >= PARALLEL_PARSE_BYTES:
+                stamp = ClDataframeCache.file_stamp(path)
+                names, ranges = self._byte_ranges(path, size, self.pool.workers)
+                parts = self.pool.map_processes(_parse_byte_range, [path] * len(ranges),
+                                                [start for start, _ in ranges], [end for _, end in ranges],
+                                                [names] * len(ranges))
+                if self._parts_match(parts) and ClDataframeCache.file_stamp(path) == stamp:
+                    df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=names)
+            if df is None:
+                df = pd.read_csv(path)
+            timer.count(len(df), size)
+        return df
+
+    @staticmethod
+    def _parts_match(parts: list) -> bool:
+        """
+        Prüft, ob alle Stücke gelesen wurden und ihre Spalten entweder überall oder nirgends Datumsspalten sind.
+        """
+        if any(part is None for part in parts):
+            return False
+        for column in parts[0].columns if parts else ():
+            if len({pd.api.types.is_datetime64_any_dtype(part[column]) for part in parts}) > 1:
+                return False
+        return True
+
+    @staticmethod
+    def _byte_ranges(path: str, size: int, count: int) -> tuple:
+        """
+        Gibt die Spaltennamen aus der Kopfzeile und bis zu `count` Bereiche (Anfang, Ende) der Datei zurück, die
+        jeweils an einem Zeilenanfang beginnen.
+        """
+        with open(path, 'rb') as f:
+            header = f.readline()
+            starts = [f.tell()]
+            for k in range(1, count):
+                f.seek(max(starts[0] + (size - starts[0]) * k // count - 1, starts[-1]))
+                f.readline()
+                if f.tell() >= size:
+                    break
+                if f.tell() > starts[-1]:
+                    starts.append(f.tell())
+        names = pd.read_csv(io.BytesIO(header), nrows=0).columns.tolist()
+        ends = starts[1:] + [size]
+        return names, [(start, end) for start, end in zip(starts, ends) if end > start]
+
+    def _drop_tombstones(self, path_csv: str, df: pd.DataFrame) -> tuple:
+        """
+        Entfernt die als gelöscht vermerkten Zeilen aus dem eingelesenen Inhalt einer CSV-Datei. Passen die
+        Grabsteine nicht mehr zur Datei, gilt der vollständig eingelesene Inhalt, und die Tabelle wird zum
+        Verdichten vorgemerkt, das die veralteten Grabsteine entfernt.
+
+        Returns:
+            tuple: (DataFrame ohne die gelöschten Zeilen, sortierte Nummern der gelöschten Zeilen)
+        """
+        tombstones = self._read_tombstones(path_csv)
+        if tombstones is None:
+            self.compactor.request(self, os.path.basename(path_csv))
+            tombstones = np.empty(0, dtype=np.int64)
+        tombstones = tombstones[tombstones < len(df)]
+        if len(tombstones):
+            keep = np.ones(len(df), dtype=bool)
+            keep[tombstones] = False
+            df = df[keep].reset_index(drop=True)
+        return df, tombstones
+
+    @staticmethod
+    def _tombstone_header(path_csv: str) -> bytes:
+        """
+        Gibt die erste Zeile der Grabsteine zur aktuellen Fassung der CSV-Datei zurück: Inode, Größe und
+        Änderungszeit. Nur solange alle drei passen, zeigen die Nummern der Grabsteine auf die gelöschten Zeilen.
+        """
+        mtime_ns, size, ino = ClDataframeCache.file_stamp(path_csv)
+        return b'%d %d %d\n' % (ino, size, mtime_ns)
+
+    @classmethod
+    def _read_tombstones(cls, path_csv: str):
+        """
+        Liest die Grabsteine einer CSV-Datei. Eine beim Schreiben abgebrochene letzte Zeile wird ignoriert.
+
+        Returns:
+            np.ndarray | None: Die sortierten, eindeutigen Nummern der gelöschten Zeilen oder None, wenn die
+                Grabsteine zu einer anderen Fassung der Datei gehören, z. B. weil sie neu geschrieben oder an Ort
+                und Stelle bearbeitet wurde.
+        """
+        try:
+            with open(path_csv + cls.TOMBSTONE_SUFFIX, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return np.empty(0, dtype=np.int64)
+        valid = content[:content.rfind(b'\n') + 1]
+        header = cls._tombstone_header(path_csv)
+        if not valid.startswith(header):
+            return None
+        return np.unique(np.array(valid[len(header):].split()).astype(np.int64))
+
+    @classmethod
+    def _write_tombstones(cls, path_csv: str, rows):
+        """
+        Hängt Grabsteine für die Zeilennummern `rows` dauerhaft an. Darf nur unter der exklusiven Sperre der
+        Tabelle aufgerufen werden. Veraltete Grabsteine einer früheren Fassung der Datei werden dabei verworfen.
+        """
+        header = cls._tombstone_header(path_csv)
+        fd = os.open(path_csv + cls.TOMBSTONE_SUFFIX, os.O_RDWR | os.O_CREAT, 0o644)
+        with open(fd, 'r+b') as f:
+            content = f.read()
+            valid = content[:content.rfind(b'\n') + 1]
+            if not valid.startswith(header):
+                f.seek(0)
+                f.truncate()
+                f.write(header)
+            elif len(valid) != len(content):
+                f.truncate(len(valid))
+                f.seek(0, os.SEEK_END)
+            f.write(b''.join(b'%d\n' % row for row in rows))
+            f.flush()
+            os.fsync(f.fileno())
+
+    @classmethod
+    def _restamp_tombstones(cls, path_csv: str, header_before: bytes):
+        """
+        Überträgt die Grabsteine auf die aktuelle Fassung der CSV-Datei, nachdem Zeilen angehängt oder ein
+        abgebrochenes Anhängen zurückgeschnitten wurde. Die vorhandenen Zeilen und damit die Nummern der
+        Grabsteine sind dabei unverändert geblieben. Grabsteine, die nicht zu `header_before` gehören, bleiben
+        veraltet.
+        """
+        path_tombstones = path_csv + cls.TOMBSTONE_SUFFIX
+        try:
+            with open(path_tombstones, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return
+        if not content.startswith(header_before):
+            return
+        content = cls._tombstone_header(path_csv) + content[len(header_before):content.rfind(b'\n') + 1]
+        fd, path_temp = tempfile.mkstemp(prefix=os.path.basename(path_tombstones) + '.', suffix='.tmp',
+                                         dir=os.path.dirname(os.path.abspath(path_csv)))
+        try:
+            with open(fd, 'wb') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path_temp, path_tombstones)
+        except Exception as e:
+            os.remove(path_temp)
+            raise e
+
+    @classmethod
+    def _remove_tombstones(cls, path_csv: str):
+        """
+        Entfernt die Grabsteine nach einem Neuschreiben der CSV-Datei.
+        """
+        try:
+            os.remove(path_csv + cls.TOMBSTONE_SUFFIX)
+        except FileNotFoundError:
+            pass
+
+    def _id_index(self, path: str, entry: ClCacheEntry) -> ClIdIndex:
+        """
+        Gibt den ID-Index eines Cache-Eintrags zurück und baut ihn beim ersten Zugriff auf.
+        """
+        if entry.id_index is None:
+            if 'ID' not in entry.df.columns:
+                raise ValueError("Die Spalte 'ID' existiert nicht in der CSV-Datei.")
+            unique = os.path.basename(path) in self.UNIQUE_ID_TABLES
+            entry.id_index = ClIdIndex.from_dataframe(entry.df, unique)
+        return entry.id_index
+
+    def _id_allocator(self, path: str, entry: ClCacheEntry) -> ClIdAllocator:
+        """
+        Gibt die ID-Vergabe eines Cache-Eintrags zurück und baut sie beim ersten Zugriff auf.
+        """
+        if entry.id_allocator is None:
+            entry.id_allocator = ClIdAllocator(list(self._id_index(path, entry).ids()))
+        return entry.id_allocator
+
+    def _write(self, path_csv: str, df: pd.DataFrame, changed_ids, id_index: ClIdIndex = None,
+               id_allocator: ClIdAllocator = None):
+        """
+        Schreibt einen DataFrame atomar über eine temporäre Datei und übernimmt ihn in den Cache.
+        Ein übergebener ID-Index und eine ID-Vergabe müssen zum neuen DataFrame passen und werden mit übernommen.
+        Die IDs der geänderten Zeilen werden im Änderungsprotokoll vermerkt.
+        """
+        stamp_before = self._stamp(path_csv)
+        path_temp, df = self._write_temp(path_csv, df)
+        try:
+            os.replace(path_temp, path_csv)
+        except Exception as e:
+            os.remove(path_temp)
+            raise e
+        # Die neue Datei enthält die gelöschten Zeilen nicht mehr
+        self._remove_tombstones(path_csv)
+        self._publish(path_csv, df, changed_ids, stamp_before, id_index, id_allocator)
+
+    @staticmethod
+    def _write_temp(path_csv: str, df: pd.DataFrame, sync: bool = False) -> tuple:
+        """
+        Schreibt einen DataFrame in eine temporäre Datei neben der CSV-Datei.
+        Mit sync=True liegt die Datei danach sicher auf dem Datenträger.
+
+        Returns:
+            tuple: (Pfad der temporären Datei, DataFrame mit den Datentypen eines erneuten Einlesens)
+        """
+        # Eindeutiger Name, damit sich gleichzeitige Schreiber nicht die temporäre Datei überschreiben
+        fd, path_temp = tempfile.mkstemp(prefix=os.path.basename(path_csv) + '.', suffix='.tmp',
+                                         dir=os.path.dirname(os.path.abspath(path_csv)))
+        # Index und Datentypen so angleichen, wie sie ein erneutes Einlesen der Datei liefern würde
+        df = df.reset_index(drop=True).infer_objects()
+        try:
+            with open(fd, 'w', encoding='utf-8', newline='') as f:
+                df.to_csv(f, index=False, date_format=DATE_FORMAT)
+                if sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+        except Exception as e:
+            os.remove(path_temp)
+            raise e
+        return path_temp, df
+
+    def _publish(self, path_csv: str, df: pd.DataFrame, changed_ids, stamp_before: tuple,
+                 id_index: ClIdIndex = None, id_allocator: ClIdAllocator = None, tombstones: np.ndarray = None,
+                 nbytes: int = None):
+        """
+        Erhöht nach dem Schreiben die Version, übernimmt den neuen Inhalt in den Cache und vermerkt die
+        geänderten IDs im Änderungsprotokoll. `tombstones` sind die Grabsteine, die in der Datei noch gelten,
+        `nbytes` ist der bereits bekannte Speicherbedarf von df.
+        """
+        ClTableLock(path_csv).bump_version()
+        stamp = self._stamp(path_csv)
+        self.cache.put(path_csv, df, stamp, nbytes, id_index, id_allocator, tombstones)
+        self.change_log.record(self.table_key(os.path.basename(path_csv)), stamp_before, stamp, changed_ids)
+
+    def _append(self, path_csv: str, df: pd.DataFrame, df_new: pd.DataFrame, id_index: ClIdIndex = None,
+                id_allocator: ClIdAllocator = None, tombstones: np.ndarray = None):
+        """
+        Hängt neue Zeilen an die CSV-Datei an, ohne die vorhandenen Zeilen neu zu schreiben. Die Grabsteine der
+        Datei bleiben gültig, weil sich die Nummern der vorhandenen Zeilen nicht ändern; sie werden danach auf die
+        neue Größe und Änderungszeit der Datei übertragen.
+
+        Vor dem Schreiben wird die bisherige Fassung der Datei (Kopfzeile der Grabsteine, siehe _tombstone_header)
+        in einer Markierungsdatei gesichert. Bricht das Anhängen ab, schneidet _recover_append die Datei beim
+        nächsten Einlesen wieder auf die bisherige Größe zurück.
+        Der neue Inhalt (df + df_new) wird mit einem einzigen concat gebildet und in den Cache übernommen.
+        """
+        stamp_before = self._stamp(path_csv)
+        path_marker = path_csv + '.append'
+        header_before = self._tombstone_header(path_csv)
+        size = os.path.getsize(path_csv)
+        with open(path_marker, 'wb') as f:
+            f.write(header_before)
+            f.flush()
+            os.fsync(f.fileno())
+
+        try:
+            # Fehlt der Zeilenumbruch am Dateiende, würde die erste neue Zeile an die letzte vorhandene angehängt
+            needs_newline = False
+            if size > 0:
+                with open(path_csv, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    needs_newline = f.read(1) != b'\n'
+            with open(path_csv, 'a', encoding='utf-8', newline='') as f:
+                if needs_newline:
+                    f.write('\n')
+                df_new.to_csv(f, index=False, header=False, columns=list(df.columns), lineterminator='\n',
+                              date_format=DATE_FORMAT)
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            ClCsvBackend._recover_append(path_csv)
+            raise e
+        self._restamp_tombstones(path_csv, header_before)
+        os.remove(path_marker)
+
+        self._publish(path_csv, schema_for(path_csv).concat(df, df_new), df_new['ID'], stamp_before,
+                      id_index, id_allocator, tombstones)
+
+    @staticmethod
+    def _recover_append(path_csv: str):
+        """
+        Schneidet eine CSV-Datei nach einem abgebrochenen Anhängen auf ihre vorherige Größe zurück und überträgt
+        die Grabsteine auf die zurückgeschnittene Datei.
+        """
+        path_marker = path_csv + '.append'
+        try:
+            with open(path_marker, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return
+        # Eine unvollständige Markierung wurde vor dem Anhängen geschrieben, die Datei ist unverändert
+        if content.endswith(b'\n'):
+            with open(path_csv, 'r+b') as f:
+                f.truncate(int(content.split()[1]))
+                f.flush()
+                os.fsync(f.fileno())
+            ClCsvBackend._restamp_tombstones(path_csv, content)
+        try:
+            os.remove(path_marker)
+        except FileNotFoundError:
+            # Ein anderer Leser hat die Datei bereits wiederhergestellt
+            pass
+
+    def _recover_transaction(self):
+        """
+        Schließt eine abgebrochene Transaktion ab, falls ihr Journal noch vorhanden ist.
+        Darf nur aufgerufen werden, solange keine Sperre gehalten wird.
+        """
+        path_journal = os.path.join(self.file_path, self.JOURNAL_NAME)
+        if not os.path.exists(path_journal):
+            return
+        with ClTableLock(path_journal).exclusive():
+            self._roll_forward()
+
+    def _roll_forward(self):
+        """
+        Verschiebt alle im Journal genannten temporären Dateien an ihr Ziel und löscht das Journal.
+        Der Aufrufer hält die Sperre des Journals, aber keine Sperre einer Tabelle.
+        """
+        path_journal = os.path.join(self.file_path, self.JOURNAL_NAME)
+        try:
+            with open(path_journal, encoding='utf-8') as f:
+                journal = json.load(f)
+        except FileNotFoundError:
+            # Ein anderer Prozess hat die Transaktion bereits abgeschlossen
+            return
+        targets = {os.path.join(self.file_path, csv_name): os.path.join(self.file_path, temp_name)
+                   for csv_name, temp_name in journal['tables'].items()}
+        tombstones = {os.path.join(self.file_path, csv_name): rows
+                      for csv_name, rows in journal.get('tombstones', {}).items()}
+        with ExitStack() as stack:
+            for path_csv in sorted(set(targets) | set(tombstones)):
+                stack.enter_context(ClTableLock(path_csv).exclusive())
+            for path_csv, path_temp in targets.items():
+                if os.path.exists(path_temp):
+                    os.replace(path_temp, path_csv)
+                    self._remove_tombstones(path_csv)
+                # Auch bereits verschobene Dateien bekommen eine neue Version, eine Erhöhung zu viel schadet nicht
+                ClTableLock(path_csv).bump_version()
+            for path_csv, rows in tombstones.items():
+                # Bereits angehängte Grabsteine werden doppelt vermerkt, das schadet nicht
+                self._write_tombstones(path_csv, rows)
+                ClTableLock(path_csv).bump_version()
+            os.remove(path_journal)
+
+    def _journal_tables(self) -> set:
+        """
+        Gibt die Namen der Tabellen im Journal einer abgebrochenen oder laufenden Transaktion zurück, leer ohne
+        Journal.
+        """
+        try:
+            with open(os.path.join(self.file_path, self.JOURNAL_NAME), encoding='utf-8') as f:
+                journal = json.load(f)
+        except FileNotFoundError:
+            return set()
+        return set(journal['tables']) | set(journal.get('tombstones', {}))
+
+    def _write_journal(self, temp_names: dict, tombstones: dict = None):
+        """
+        Schreibt das Journal einer Transaktion atomar und dauerhaft. Danach gilt die Transaktion als committet.
+        Neben den temporären Dateien enthält es die Grabsteine der Tabellen, in denen nur gelöscht wurde.
+        """
+        path_journal = os.path.join(self.file_path, self.JOURNAL_NAME)
+        fd, path_temp = tempfile.mkstemp(prefix=self.JOURNAL_NAME + '.', suffix='.tmp', dir=self.file_path)
+        try:
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump({'tables': temp_names, 'tombstones': tombstones or {}}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path_temp, path_journal)
+        except Exception as e:
+            if os.path.exists(path_temp):
+                os.remove(path_temp)
+            raise e
+
+    def read(self, csv_name: str, filter_conditions: dict = None) -> pd.DataFrame:
+        """
+        Liest die CSV-Datei über den Cache. Filter auf die ID werden über den ID-Index beantwortet.
+        """
+        path = os.path.join(self.file_path, csv_name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Die Datei {path} existiert nicht.")
+
+        try:
+            entry = self._load_entry(path)
+        except EmptyDataError:
+            raise EmptyDataError("Die CSV-Datei ist leer.")
+
+        df = entry.df
+        query = ClQuery(filter_conditions)
+        if query.conditions:
+            # Punktabfragen auf die ID über den Index statt über einen Vergleich mit jeder Zeile
+            id_index = self._id_index(path, entry) if query.uses_id_index() and 'ID' in df.columns else None
+            df = query.select(df, id_index)
+        else:
+            # Der Aufrufer darf den DataFrame verändern, ohne den Cache zu beschädigen
+            df = df.copy()
+        return df
+
+    def iter_chunks(self, csv_name: str, filter_conditions: dict = None, chunksize: int = 10000):
+        """
+        Liest die CSV-Datei stückweise an Cache und Index vorbei, damit auch große Dateien nie vollständig im
+        Speicher liegen. Gelesen wird der Stand beim Öffnen: Ein atomares Neuschreiben ersetzt nur den
+        Verzeichniseintrag, angehängte Zeilen liegen hinter der gemerkten Größe, und die Grabsteine werden
+        zusammen mit dem Öffnen gelesen.
+        """
+        path = os.path.join(self.file_path, csv_name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Die Datei {path} existiert nicht.")
+
+        self._recover_transaction()
+        with ClTableLock(path).shared():
+            ClCsvBackend._recover_append(path)
+            f = open(path, 'rb')
+            size = os.fstat(f.fileno()).st_size
+            tombstones = self._read_tombstones(path)
+        if tombstones is None:
+            # Wie beim vollständigen Einlesen gilt der Inhalt der Datei, die veralteten Grabsteine entfernt der
+            # Verdichter
+            self.compactor.request(self, csv_name)
+            tombstones = np.empty(0, dtype=np.int64)
+        with io.TextIOWrapper(io.BufferedReader(_ClSnapshotReader(f, size)), encoding='utf-8') as text:
+            try:
+                reader = pd.read_csv(text, chunksize=chunksize)
+            except EmptyDataError:
+                raise EmptyDataError("Die CSV-Datei ist leer.")
+            with reader:
+                for chunk in reader:
+                    # Der Index der Stücke zählt die Zeilen der Datei fortlaufend
+                    if len(tombstones):
+                        chunk = chunk[~chunk.index.isin(tombstones)]
+                    yield self.filter_dataframe(chunk, filter_conditions)
+
+    def id_exists(self, csv_name: str, id: int) -> bool:
+        """
+        Prüft über den ID-Index, ob die ID in der CSV-Datei vorkommt.
+        """
+        path = os.path.join(self.file_path, csv_name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Die Datei {path} existiert nicht.")
+
+        return id in self._id_index(path, self._load_entry(path))
+
+    def warm(self, csv_name: str):
+        """
+        Liest die CSV-Datei in den Cache und baut ihren ID-Index auf, ohne den DataFrame zu kopieren.
+        """
+        path = os.path.join(self.file_path, csv_name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Die Datei {path} existiert nicht.")
+
+        self._id_index(path, self._load_entry(path))
+
+    def get_rows_by_id(self, csv_name: str, id: int) -> pd.DataFrame:
+        """
+        Gibt alle Zeilen mit der angegebenen ID über den ID-Index zurück.
+        """
+        path = os.path.join(self.file_path, csv_name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Die Datei {path} existiert nicht.")
+
+        entry = self._load_entry(path)
+        return entry.df.take(self._id_index(path, entry).positions(id))
+
+    def get_version(self, csv_name: str) -> int:
+        """
+        Gibt den Versionszähler aus der Sperrdatei der Tabelle zurück.
+        """
+        return ClTableLock(os.path.join(self.file_path, csv_name)).read_version()
+
+    def get_stamp(self, csv_name: str) -> tuple:
+        """
+        Gibt Dateistempel und Versionszähler der CSV-Datei zurück.
+        """
+        return self._stamp(os.path.join(self.file_path, csv_name))
+
+    def table_key(self, csv_name: str) -> str:
+        """
+        Gibt den absoluten Pfad der CSV-Datei zurück.
+        """
+        return os.path.abspath(os.path.join(self.file_path, csv_name))
+
+    def tombstone_count(self, csv_name: str) -> int:
+        """
+        Gibt die Anzahl der gelöschten, aber noch nicht aus der CSV-Datei entfernten Zeilen zurück.
+        """
+        path = os.path.join(self.file_path, csv_name)
+        entry = self.cache.get(path, self._stamp(path))
+        if entry is not None:
+            return len(entry.tombstones)
+        tombstones = self._read_tombstones(path)
+        return len(tombstones) if tombstones is not None else 0
+
+    def reload(self, csv_name: str):
+        """
+        Liest eine CSV-Datei neu ein, die außerhalb dieses Prozesses geändert wurde (z. B. von Hand in einer
+        Tabellenkalkulation), und vergleicht sie mit dem bisherigen Stand im Cache.
+
+        Die geänderten IDs werden im Änderungsprotokoll vermerkt, sodass Sichten und Suchindex nur diese Zeilen
+        neu berechnen. Ist die Folge der IDs unverändert (nur Werte wurden bearbeitet), werden ID-Index und
+        ID-Vergabe übernommen statt neu aufgebaut.
+
+        Returns:
+            set | None: Die IDs der geänderten, neuen und gelöschten Zeilen (leer, wenn der Cache aktuell ist)
+                oder None, wenn die Tabelle noch nicht im Cache lag.
+        """
+        path = os.path.join(self.file_path, csv_name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Die Datei {path} existiert nicht.")
+
+        self._recover_transaction()
+        with ClTableLock(path).shared():
+            old = self.cache.peek(path)
+            if old is None:
+                return None
+            if old.stamp == self._stamp(path):
+                return set()
+            new = self._read_entry(path)
+            changed_ids = self.diff_ids(old.df, new.df)
+            if np.array_equal(old.df['ID'].to_numpy(), new.df['ID'].to_numpy()):
+                new.id_index = old.id_index
+                new.id_allocator = old.id_allocator
+            self.change_log.record(self.table_key(csv_name), old.stamp, new.stamp, changed_ids)
+        return changed_ids
+
+    @staticmethod
+    def diff_ids(df_old: pd.DataFrame, df_new: pd.DataFrame) -> set:
+        """
+        Vergleicht zwei Stände einer Tabelle über die ID und einen Hash je Zeile.
+
+        Die Zeilen werden je ID in ihrer Reihenfolge gepaart (erste mit erster usw.); eine ID gilt als geändert,
+        wenn sich ein Hash unterscheidet oder eine Zeile nur in einem der beiden Stände vorkommt.
+
+        Returns:
+            set: Die IDs der geänderten, neuen und gelöschten Zeilen.
+        """
+        def row_hashes(df):
+            hashes = pd.DataFrame({'ID': df['ID'].to_numpy(),
+                                   'Hash': pd.util.hash_pandas_object(df, index=False).to_numpy()})
+            hashes['Nr'] = hashes.groupby('ID').cumcount()
+            return hashes
+
+        if list(df_old.columns) != list(df_new.columns):
+            return set(df_old['ID']) | set(df_new['ID'])
+        merged = row_hashes(df_old).merge(row_hashes(df_new), on=['ID', 'Nr'], how='outer',
+                                          suffixes=('_alt', '_neu'))
+        changed = merged['Hash_alt'] != merged['Hash_neu']
+        return set(merged.loc[changed, 'ID'].tolist())
+
+    def update(self, csv_name: str, id: int, updated_data: dict, base_version: int = None):
+        """
+        Aktualisiert die erste Zeile mit der ID und schreibt die Datei atomar neu.
+        """
+        path_csv = os.path.join(self.file_path, csv_name)
+        if not os.path.exists(path_csv):
+            raise FileNotFoundError(f"Die Datei {path_csv} existiert nicht.")
+
+        self._recover_transaction()
+        lock = ClTableLock(path_csv)
+        with lock.exclusive(base_version):
+            entry = self._load_entry(path_csv, locked=True)
+            df = entry.df
+            # Leser, die noch den alten Eintrag verwenden, dürfen die Änderungen am Index nicht sehen
+            id_index = self._id_index(path_csv, entry).copy()
+            position = id_index.first(id)
+            if position is None:
+                raise ValueError(f"Keine Zeilen mit der ID {id} gefunden.")
+            for column in updated_data:
+                if column not in df.columns:
+                    raise ValueError(f"Spalte {column} existiert nicht in der CSV-Datei.")
+
+            row_data = df.iloc[position].to_dict()
+            row_data.update(updated_data)
+            schema = schema_for(path_csv)
+            row = schema.apply(self.normalize_rows(pd.DataFrame([row_data]), df.columns))
+            new_id = row.at[0, 'ID']
+            if new_id != id and id_index.unique and new_id in id_index:
+                raise ValueError(f"Die ID {new_id} existiert bereits.")
+
+            id_allocator = self._id_allocator(path_csv, entry)
+            df = df.copy()
+            schema.set_values(df, position, row, updated_data)
+            # Index und ID-Vergabe werden vor dem Veröffentlichen angepasst und bei einem Fehler zurückgesetzt
+            reserved = released = False
+            if new_id != id:
+                reserved = new_id not in id_index
+                id_index.move(id, new_id, position)
+                id_allocator.reserve(new_id)
+                released = id not in id_index
+                if released:
+                    id_allocator.release(id)
+            try:
+                self._write(path_csv, df, {id, new_id}, id_index, id_allocator)
+            except Exception as e:
+                if released:
+                    id_allocator.reserve(id)
+                if reserved:
+                    id_allocator.release(new_id)
+                raise e
+
+    def get_first_unused_id(self, csv_name: str):
+        """
+        Gibt die kleinste freie ID aus der ID-Vergabe zurück.
+        """
+        path = os.path.join(self.file_path, csv_name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Die Datei {path} existiert nicht.")
+
+        try:
+            entry = self._load_entry(path)
+            if entry.df.empty or 'ID' not in entry.df.columns:
+                return 1
+            return self._id_allocator(path, entry).peek()
+
+        except EmptyDataError:
+            return 1
+
+    def insert(self, csv_name: str, rows_data: list, base_version: int = None):
+        """
+        Hängt die Zeilen an die Datei an. Die IDs für Zeilen mit ID 0 werden in einem Schritt reserviert.
+        """
+        path_csv = os.path.join(self.file_path, csv_name)
+
+        # Überprüfen, ob die Datei existiert
+        if not os.path.exists(path_csv):
+            raise FileNotFoundError(f"Die Datei {path_csv} existiert nicht.")
+
+        self._recover_transaction()
+        lock = ClTableLock(path_csv)
+        with lock.exclusive(base_version):
+            # Lesen der vorhandenen CSV-Daten
+            entry = self._load_entry(path_csv, locked=True)
+            df = entry.df
+            if not df.empty and 'ID' not in df.columns:
+                raise ValueError("Die CSV-Datei muss eine 'ID'-Spalte enthalten.")
+
+            # Überprüfen, ob die Spalten in row_data mit den Spalten der CSV-Datei übereinstimmen
+            if rows_data and set(rows_data[0].keys()) != set(df.columns):
+                raise ValueError(
+                    "Die Schlüsselnamen von rows_data müssen mit den Spalten der CSV-Datei übereinstimmen.")
+
+            # Leser, die noch den alten Eintrag verwenden, dürfen die Änderungen am Index nicht sehen
+            id_index = self._id_index(path_csv, entry).copy()
+            id_allocator = self._id_allocator(path_csv, entry)
+
+            # Generieren der IDs für die neuen Zeilen in einem Schritt, die IDs sind damit sofort reserviert
+            rows_without_id = [row_data for row_data in rows_data if row_data['ID'] == 0]
+            new_ids = id_allocator.allocate(len(rows_without_id))
+            for row_data, new_id in zip(rows_without_id, new_ids):
+                row_data['ID'] = new_id
+
+            reserved = set(new_ids)
+            try:
+                # Die neuen Zeilen werden nur angehängt, die vorhandenen Zeilen bleiben unverändert in der Datei
+                df_new = self.normalize_rows(pd.DataFrame(rows_data), df.columns)
+                if id_index.unique and (df_new['ID'].duplicated().any() or df_new['ID'].isin(id_index.ids()).any()):
+                    raise ValueError("Die IDs der neuen Zeilen existieren bereits in der CSV-Datei.")
+                if df_new.empty:
+                    return
+                # Index und ID-Vergabe werden vor dem Veröffentlichen angepasst
+                for position, new_id in enumerate(df_new['ID'], len(df)):
+                    if new_id not in id_index:
+                        reserved.add(new_id)
+                    id_index.add(new_id, position)
+                    id_allocator.reserve(new_id)
+                self._append(path_csv, df, df_new, id_index, id_allocator, entry.tombstones)
+            except Exception as e:
+                for new_id in reserved:
+                    id_allocator.release(new_id)
+                raise e
+
+    def apply(self, operations: list, base_versions: dict = None):
+        """
+        Führt die Vorgänge einer Transaktion aus: Jede Tabelle wird unter ihrer exklusiven Sperre einmal gelesen,
+        alle Vorgänge werden im Speicher angewendet und jede geänderte Tabelle wird einmal geschrieben.
+
+        Nur eine Transaktion über mehrere Tabellen braucht das Journal, über das ihre Änderungen gemeinsam wirksam
+        werden, und damit die Sperre des Journals. Sie wird wie in _recover_transaction vor den Tabellen
+        genommen. Eine Transaktion über eine Tabelle schreibt diese wie update atomar (os.replace bzw.
+        Grabsteine) und hält nur die Sperre dieser Tabelle, sodass sie Schreiber anderer Tabellen nicht aufhält.
+        """
+        base_versions = base_versions or {}
+        csv_names = sorted({csv_name for _, csv_name, _ in operations} | set(base_versions))
+        for csv_name in csv_names:
+            path_csv = os.path.join(self.file_path, csv_name)
+            if not os.path.exists(path_csv):
+                raise FileNotFoundError(f"Die Datei {path_csv} existiert nicht.")
+
+        # Veraltete Basisversionen scheitern sofort, nicht erst nach dem Warten auf die Sperren
+        for csv_name, base_version in base_versions.items():
+            ClTableLock(os.path.join(self.file_path, csv_name)).check_version(base_version)
+        journaled = len(csv_names) > 1
+        while True:
+            self._recover_transaction()
+            with ExitStack() as stack:
+                if journaled:
+                    stack.enter_context(ClTableLock(os.path.join(self.file_path, self.JOURNAL_NAME)).exclusive())
+                    self._roll_forward()
+                for csv_name in csv_names:
+                    stack.enter_context(ClTableLock(os.path.join(self.file_path, csv_name))
+                                        .exclusive(base_versions.get(csv_name)))
+                if not journaled and set(csv_names) & self._journal_tables():
+                    # Eine abgebrochene Transaktion über diese Tabelle zuerst abschließen
+                    continue
+                tables = {}
+                for csv_name in csv_names:
+                    path_csv = os.path.join(self.file_path, csv_name)
+                    entry = self._load_entry(path_csv, locked=True)
+                    if 'ID' not in entry.df.columns:
+                        raise ValueError(f"Die Spalte 'ID' existiert nicht in der CSV-Datei {csv_name}.")
+                    tables[csv_name] = _ClPendingTable(path_csv, entry, csv_name in self.UNIQUE_ID_TABLES)
+
+                for action, csv_name, args in operations:
+                    getattr(self, '_apply_' + action)(tables[csv_name], *args)
+                self._commit(list(tables.values()), journaled)
+                return
+
+    def _commit(self, tables: list, journaled: bool):
+        """
+        Schreibt die geänderten Tabellen einer Transaktion, mit `journaled` über das Journal.
+        Der Aufrufer hält die Sperren aller Tabellen und bei `journaled` die des Journals.
+        """
+        # Tabellen, in denen nur gelöscht wurde, bekommen Grabsteine statt einer neuen Datei
+        changed = [table for table in tables if table.changed_ids]
+        if not changed:
+            return
+        stamps_before = {table.path_csv: self._stamp(table.path_csv) for table in changed}
+        deleted = {table.path_csv: np.concatenate(table.deleted_rows or [np.empty(0, dtype=np.int64)])
+                   for table in changed if not table.rewrite}
+        temps = {}
+        try:
+            for table in changed:
+                if table.rewrite:
+                    temps[table.path_csv] = self._write_temp(table.path_csv, table.df, sync=journaled)
+            if journaled:
+                self._write_journal({os.path.basename(path_csv): os.path.basename(path_temp)
+                                     for path_csv, (path_temp, _) in temps.items()},
+                                    {os.path.basename(path_csv): rows.tolist() for path_csv, rows in deleted.items()})
+        except Exception as e:
+            for path_temp, _ in temps.values():
+                os.remove(path_temp)
+            raise e
+
+        for table in changed:
+            if table.rewrite:
+                path_temp, df = temps[table.path_csv]
+                os.replace(path_temp, table.path_csv)
+                self._remove_tombstones(table.path_csv)
+                # ID-Index und ID-Vergabe werden beim nächsten Zugriff neu aufgebaut
+                self._publish(table.path_csv, df, table.changed_ids, stamps_before[table.path_csv])
+            else:
+                rows = deleted[table.path_csv]
+                self._write_tombstones(table.path_csv, rows)
+                tombstones = np.union1d(table.tombstones, rows)
+                self._publish(table.path_csv, table.df.reset_index(drop=True), table.changed_ids,
+                              stamps_before[table.path_csv], table.id_index, tombstones=tombstones,
+                              nbytes=table.nbytes)
+                self.compactor.notify(self, os.path.basename(table.path_csv), len(tombstones),
+                                      len(table.df) + len(tombstones))
+        if journaled:
+            os.remove(os.path.join(self.file_path, self.JOURNAL_NAME))
+
+    def _apply_update(self, table: _ClPendingTable, id: int, updated_data: dict):
+        df = table.df
+        positions = np.flatnonzero((df['ID'] == id).to_numpy())
+        if len(positions) == 0:
+            raise ValueError(f"Keine Zeilen mit der ID {id} gefunden.")
+        for column in updated_data:
+            if column not in df.columns:
+                raise ValueError(f"Spalte {column} existiert nicht in der CSV-Datei.")
+
+        row_data = df.iloc[positions[0]].to_dict()
+        row_data.update(updated_data)
+        schema = schema_for(table.path_csv)
+        row = schema.apply(self.normalize_rows(pd.DataFrame([row_data]), df.columns))
+        new_id = row.at[0, 'ID']
+        if new_id != id and table.unique and (df['ID'] == new_id).any():
+            raise ValueError(f"Die ID {new_id} existiert bereits.")
+        schema.set_values(df, positions[0], row, updated_data)
+        table.changed_ids.update((id, new_id))
+        table.rewrite = True
+
+    def _apply_update_rows(self, table: _ClPendingTable, rows_data: list):
+        df = table.df
+        if not rows_data:
+            return
+        columns = [column for column in rows_data[0] if column != 'ID']
+        for column in columns:
+            if column not in df.columns:
+                raise ValueError(f"Spalte {column} existiert nicht in der CSV-Datei.")
+
+        # Position der ersten Zeile je ID, für alle IDs in einem Schritt
+        ids = pd.Index([row_data['ID'] for row_data in rows_data])
+        first_positions = pd.Series(np.arange(len(df)), index=df['ID'].to_numpy())
+        first_positions = first_positions[~first_positions.index.duplicated()]
+        positions = first_positions.reindex(ids)
+        if positions.isna().any():
+            missing = ', '.join(str(id) for id in ids[positions.isna().to_numpy()][:10])
+            raise ValueError(f"Keine Zeilen mit den IDs {missing} gefunden.")
+
+        schema = schema_for(table.path_csv)
+        rows = schema.apply(self.normalize_rows(pd.DataFrame(rows_data, columns=columns), columns))
+        schema.set_rows(df, positions.to_numpy(dtype=np.int64), rows, columns)
+        table.changed_ids.update(ids)
+        table.rewrite = True
+
+    def _apply_insert(self, table: _ClPendingTable, rows_data: list):
+        df = table.df
+        if not rows_data:
+            return
+        if set(rows_data[0].keys()) != set(df.columns):
+            raise ValueError("Die Schlüsselnamen von rows_data müssen mit den Spalten der CSV-Datei übereinstimmen.")
+
+        if table.id_allocator is None:
+            table.id_allocator = ClIdAllocator(df['ID'].dropna().unique())
+        rows_without_id = [row_data for row_data in rows_data if row_data['ID'] == 0]
+        for row_data, new_id in zip(rows_without_id, table.id_allocator.allocate(len(rows_without_id))):
+            row_data['ID'] = new_id
+
+        df_new = self.normalize_rows(pd.DataFrame(rows_data), df.columns)
+        if table.unique and (df_new['ID'].duplicated().any() or df_new['ID'].isin(df['ID']).any()):
+            raise ValueError("Die IDs der neuen Zeilen existieren bereits in der CSV-Datei.")
+        for new_id in df_new['ID']:
+            table.id_allocator.reserve(new_id)
+        table.df = schema_for(table.path_csv).concat(df, df_new)
+        table.changed_ids.update(df_new['ID'])
+        table.rewrite = True
+
+    def _apply_delete_id(self, table: _ClPendingTable, id: int):
+        positions = np.flatnonzero((table.df['ID'] == id).to_numpy())
+        if len(positions):
+            table.delete_positions(id, positions)
+            table.changed_ids.add(id)
+            if table.id_allocator is not None:
+                table.id_allocator.release(id)
+
+    def _apply_delete_id_row(self, table: _ClPendingTable, id: int, row_nr: int):
+        positions = np.flatnonzero((table.df['ID'] == id).to_numpy())
+        if len(positions) == 0:
+            raise ValueError(f"Keine Zeilen mit ID {id} gefunden.")
+        if row_nr < 1 or row_nr > len(positions):
+            raise ValueError(f"Ungültige Reihenummer {row_nr} für ID {id}.")
+        table.delete_positions(id, positions[row_nr - 1:row_nr])
+        table.changed_ids.add(id)
+        if table.id_allocator is not None and len(positions) == 1:
+            table.id_allocator.release(id)
+
+    def compact(self, csv_name: str):
+        """
+        Schreibt die CSV-Datei vollständig und atomar neu und entfernt dabei die gelöschten Zeilen.
+        """
+        path_csv = os.path.join(self.file_path, csv_name)
+        if not os.path.exists(path_csv):
+            raise FileNotFoundError(f"Die Datei {path_csv} existiert nicht.")
+
+        self._recover_transaction()
+        lock = ClTableLock(path_csv)
+        with lock.exclusive():
+            entry = self._load_entry(path_csv, locked=True)
+            self._write(path_csv, entry.df, (), entry.id_index, entry.id_allocator)
+
+    def _delete_rows(self, path_csv: str, entry: ClCacheEntry, positions: np.ndarray, id: int,
+                     id_allocator: ClIdAllocator):
+        """
+        Löscht die Zeilen der ID an den Positionen, ohne die Datei neu zu schreiben: Ihre Nummern in der Datei
+        werden als Grabsteine angehängt, der Cache bekommt den Inhalt ohne diese Zeilen. Darf nur unter der
+        exklusiven Sperre der Tabelle aufgerufen werden.
+        """
+        stamp_before = self._stamp(path_csv)
+        file_rows = np.delete(np.arange(len(entry.df) + len(entry.tombstones)), entry.tombstones)
+        rows = file_rows[positions]
+        self._write_tombstones(path_csv, rows)
+
+        keep = np.ones(len(entry.df), dtype=bool)
+        keep[positions] = False
+        tombstones = np.union1d(entry.tombstones, rows)
+        # Leser, die noch den alten Eintrag verwenden, dürfen die Änderungen am Index nicht sehen
+        id_index = self._id_index(path_csv, entry).copy()
+        id_index.remove(id, positions)
+        nbytes = entry.nbytes * (len(entry.df) - len(positions)) // max(len(entry.df), 1)
+        self._publish(path_csv, entry.df[keep].reset_index(drop=True), (id,), stamp_before, id_index,
+                      id_allocator, tombstones, nbytes)
+        self.compactor.notify(self, os.path.basename(path_csv), len(tombstones), len(file_rows))
+
+    def delete_id(self, csv_name: str, id: int, base_version: int = None):
+        """
+        Löscht alle Zeilen mit der ID über Grabsteine, ohne die Datei neu zu schreiben.
+        """
+        path_csv = os.path.join(self.file_path, csv_name)
+        if not os.path.exists(path_csv):
+            raise FileNotFoundError(f"Die Datei {path_csv} existiert nicht.")
+
+        self._recover_transaction()
+        lock = ClTableLock(path_csv)
+        with lock.exclusive(base_version):
+            entry = self._load_entry(path_csv, locked=True)
+            if 'ID' not in entry.df.columns:
+                raise ValueError(f"Die Spalte 'ID' existiert nicht in der CSV-Datei {csv_name}.")
+            positions = self._id_index(path_csv, entry).positions(id)
+            if len(positions) == 0:
+                # raise ValueError(f"Keine Zeilen mit der ID {id} gefunden in der CSV-Datei {csv_name}.")
+                return
+
+            id_allocator = self._id_allocator(path_csv, entry)
+            self._delete_rows(path_csv, entry, positions, id, id_allocator)
+            id_allocator.release(id)
+
+    def delete_id_row(self, csv_name: str, id: int, row_nr: int, base_version: int = None):
+        """
+        Löscht die row_nr-te Zeile mit der ID über einen Grabstein, ohne die Datei neu zu schreiben.
+        """
+        path_csv = os.path.join(self.file_path, csv_name)
+        if not os.path.exists(path_csv):
+            raise FileNotFoundError(f"Die Datei {path_csv} existiert nicht.")
+
+        self._recover_transaction()
+        lock = ClTableLock(path_csv)
+        with lock.exclusive(base_version):
+            entry = self._load_entry(path_csv, locked=True)
+            positions = self._id_index(path_csv, entry).positions(id)
+            if len(positions) == 0:
+                raise ValueError(f"Keine Zeilen mit ID {id} gefunden.")
+            if row_nr < 1 or row_nr > len(positions):
+                raise ValueError(f"Ungültige Reihenummer {row_nr} für ID {id}.")
+
+            id_allocator = self._id_allocator(path_csv, entry)
+            self._delete_rows(path_csv, entry, positions[row_nr - 1:row_nr], id, id_allocator)
+            if len(positions) == 1:
+                id_allocator.release(id)
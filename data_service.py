@@ -0,0 +1,170 @@
+import os
+import time
+
+from club_statistics import ClClubStatistics, club_statistics
+from csv_backend import ClCsvBackend
+from dataframe_cache import ClDataframeCache, shared_cache
+from dataframe_helper import ClDataframeHelper
+from derived_columns import ClBoardTenure, ClBoardView, ClMembershipYears, board_view, membership_years
+from file_watcher import ClChangeEvent, ClFileWatcher
+from name_search import ClNameSearch, member_search
+from page_cache import ClPageCache, shared_page_cache
+
+# Schlüssel in app.config bzw. gleichnamige Umgebungsvariablen
+CONFIG_DATA_DIR = 'MEIN_VEREIN_DATA_DIR'
+CONFIG_BACKEND = 'MEIN_VEREIN_BACKEND'
+CONFIG_CACHE_MB = 'MEIN_VEREIN_CACHE_MB'
+CONFIG_WARM = 'MEIN_VEREIN_WARM'
+CONFIG_WATCH = 'MEIN_VEREIN_WATCH'
+
+
+class ClDataService:
+    """
+    Der Datendienst der Anwendung: einmal beim Start angelegt, für alle Anfragen gemeinsam.
+
+    Er besitzt die Datenablage mit ihrem Cache der eingelesenen Tabellen, ID-Indizes und ID-Vergabe, die
+    materialisierten Sichten, den Suchindex, die Vereinsstatistik und den Cache der gerenderten Seiten. Jede
+    Anfrage bekommt über view() eine leichte ClShowTable, die nur auf diese gemeinsamen Objekte verweist.
+    from_config legt Sichten, Suchindex, Statistik und Seiten-Cache für jede Anwendung neu an; ohne Angabe
+    verwendet der Konstruktor die prozessweiten Objekte der Module (z. B. für ClShowTable ohne Datendienst).
+
+    warm() liest beim Start alle Tabellen gleichzeitig (siehe ClDataframeHelper.load_tables) und baut Indizes,
+    Sichten, Suchindex und Statistik auf, damit schon die erste Anfrage nach einem Neustart keine CSV-Datei mehr
+    parsen muss.
+
+    Bei der CSV-Ablage beobachtet ein ClFileWatcher die Tabellen. Werden sie von außen geändert, übernimmt er
+    die geänderten Zeilen; der Datendienst verwirft dann die gerenderten Seiten und frischt Sichten, Suchindex
+    und Statistik im Hintergrund auf, statt das der nächsten Anfrage zu überlassen.
+
+    Eingestellt wird über app.config oder gleichnamige Umgebungsvariablen (app.config hat Vorrang):
+        MEIN_VEREIN_DATA_DIR    Ordner der Tabellen (Standard: 'daten' neben main.py)
+        MEIN_VEREIN_BACKEND     'csv', 'sqlite' oder 'snapshot' (siehe ClDataframeHelper)
+        MEIN_VEREIN_CACHE_MB    Speicherbudget des Tabellen-Caches in MB (Standard: 256)
+        MEIN_VEREIN_WARM        '0', um das Aufwärmen beim Start abzuschalten
+        MEIN_VEREIN_WATCH       '0', um die Tabellen nicht auf Änderungen von außen zu beobachten
+
+    Attribute:
+        file_path (str): Der Ordner der Tabellen.
+        helper (ClDataframeHelper): Der Zugriff auf die Datenablage, u. a. zum gleichzeitigen Laden der Tabellen.
+        backend (ClStorageBackend): Die Datenablage.
+        cache (ClDataframeCache): Der Cache der eingelesenen Tabellen.
+        membership_years (ClMembershipYears): Die Sicht der Mitglieder mit Jahren.
+        board_view (ClBoardView): Die Vorstandsübersicht.
+        member_search (ClNameSearch): Der Suchindex über die Namen.
+        statistics (ClClubStatistics): Die Vereinsstatistik.
+        page_cache (ClPageCache): Der Cache der gerenderten Seiten.
+        watcher (ClFileWatcher | None): Der Beobachter der Tabellen, sobald er gestartet wurde.
+    """
+
+    # Die Tabellen, die beim Aufwärmen gelesen werden
+    TABLES = ('mitglieder.csv', 'vorstand.csv')
+
+    def __init__(self, file_path: str = 'daten', backend=None, cache: ClDataframeCache = None,
+                 membership_years: ClMembershipYears = membership_years, board_view: ClBoardView = board_view,
+                 member_search: ClNameSearch = member_search, page_cache: ClPageCache = shared_page_cache,
+                 statistics: ClClubStatistics = club_statistics):
+        self.file_path = file_path
+        self.cache = cache if cache is not None else shared_cache
+        self.helper = ClDataframeHelper(file_path, self.cache, backend)
+        self.backend = self.helper.backend
+        self.membership_years = membership_years
+        self.board_view = board_view
+        self.member_search = member_search
+        self.page_cache = page_cache
+        self.statistics = statistics
+        self.watcher = None
+
+    @classmethod
+    def from_config(cls, config: dict, root_path: str = '.') -> 'ClDataService':
+        """
+        Erzeugt den Datendienst aus app.config und den Umgebungsvariablen, mit eigenen Sichten, eigenem
+        Suchindex, eigener Statistik und eigenem Seiten-Cache. Zwei Anwendungen in einem Prozess (z. B. in Tests)
+        teilen sich damit nur noch den Tabellen-Cache, dessen Einträge nach Dateipfad getrennt sind.
+
+        Args:
+            config (dict): Die Konfiguration, z. B. app.config.
+            root_path (str, optional): Der Ordner, gegen den ein relativer Datenordner aufgelöst wird.
+        """
+        def setting(name, default=None):
+            value = config.get(name)
+            return value if value is not None else os.environ.get(name, default)
+
+        file_path = os.path.join(root_path, setting(CONFIG_DATA_DIR, 'daten'))
+        # Die Umgebungsvariable MEIN_VEREIN_CACHE_MB gilt bereits für den gemeinsamen Cache, ein Wert in
+        # app.config legt einen eigenen Cache an
+        cache_mb = config.get(CONFIG_CACHE_MB)
+        cache = ClDataframeCache(int(cache_mb) * 1024 * 1024) if cache_mb is not None else None
+        return cls(file_path, setting(CONFIG_BACKEND), cache, membership_years=ClMembershipYears(),
+                   board_view=ClBoardView(ClBoardTenure()), member_search=ClNameSearch('mitglieder.csv'),
+                   page_cache=ClPageCache(), statistics=ClClubStatistics())
+
+    def init_app(self, app):
+        """
+        Legt den Datendienst in app.extensions ab, wärmt ihn auf, wenn MEIN_VEREIN_WARM nicht '0' ist, und
+        beobachtet die Tabellen, wenn MEIN_VEREIN_WATCH nicht '0' ist.
+
+        Vorher wird der Prozess-Pool gestartet, solange noch keine Threads laufen (siehe ClWorkerPool.start);
+        sonst könnten große Tabellen und Gruppierungen nicht auf mehrere Prozesse verteilt werden.
+        """
+        app.extensions['mein_verein'] = self
+        self.helper.pool.start()
+        if self._enabled(app.config, CONFIG_WARM):
+            for step, seconds in self.warm().items():
+                app.logger.info("Aufgewärmt: %s in %.1f ms", step, seconds * 1000)
+        if self._enabled(app.config, CONFIG_WATCH) and isinstance(self.backend, ClCsvBackend):
+            self.watch()
+
+    @staticmethod
+    def _enabled(config: dict, name: str) -> bool:
+        value = config.get(name, os.environ.get(name, '1'))
+        return str(value).lower() not in ('0', 'false', 'no')
+
+    def watch(self) -> ClFileWatcher:
+        """
+        Startet den Beobachter der Tabellen (siehe ClFileWatcher) und meldet on_change bei ihm an.
+        """
+        if self.watcher is None:
+            self.watcher = ClFileWatcher(self.backend, self.TABLES)
+            self.watcher.subscribe(self.on_change)
+        self.watcher.start()
+        return self.watcher
+
+    def on_change(self, event: ClChangeEvent):
+        """
+        Verwirft nach einer Änderung von außen die gerenderten Seiten und frischt Sichten, Suchindex und
+        Statistik auf.
+        """
+        self.page_cache.invalidate()
+        self.warm()
+
+    def warm(self) -> dict:
+        """
+        Liest alle Tabellen gleichzeitig und baut ID-Indizes, ID-Vergabe, Sichten, Suchindex und Statistik auf.
+        Fehlende Tabellen werden übersprungen, sie werden beim ersten Zugriff gemeldet.
+
+        Returns:
+            dict: Die Dauer in Sekunden je Schritt; die Tabellen werden parallel gelesen, ihre Zeiten überlappen.
+        """
+        timings = {f"{csv_name} und ID-Index": seconds
+                   for csv_name, seconds in self.helper.load_tables(self.TABLES).items()}
+        steps = [("ID-Vergabe", lambda: self.backend.get_first_unused_id('mitglieder.csv')),
+                 ("Mitgliedsjahre", lambda: self.membership_years.get(self.backend)),
+                 ("Vorstandsübersicht", lambda: self.board_view.get(self.backend)),
+                 ("Namenssuche", lambda: self.member_search.warm(self.backend)),
+                 ("Statistik", lambda: self.statistics.warm(self.backend))]
+        for step, run in steps:
+            start = time.perf_counter()
+            try:
+                run()
+            except FileNotFoundError:
+                continue
+            timings[step] = time.perf_counter() - start
+        return timings
+
+    def view(self):
+        """
+        Gibt eine neue ClShowTable für eine Anfrage zurück, die die gemeinsamen Objekte dieses Dienstes verwendet.
+        """
+        # Erst hier importiert, weil show_table selbst den Datendienst verwendet
+        from show_table import ClShowTable
+        return ClShowTable(self)
@@ -0,0 +1,177 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Standard-Speicherbudget des gemeinsamen Caches (256 MB), per Umgebungsvariable überschreibbar
+DEFAULT_MAX_BYTES = int(os.environ.get('MEIN_VEREIN_CACHE_MB', '256')) * 1024 * 1024
+
+
+class ClCacheEntry:
+    """
+    Ein Eintrag im DataFrame-Cache.
+
+    Attribute:
+        df (pd.DataFrame): Der eingelesene DataFrame. Er darf vom Aufrufer nicht verändert werden.
+        stamp (tuple): (mtime_ns, size, inode) der Datei zum Zeitpunkt des Einlesens.
+        nbytes (int): Der geschätzte Speicherbedarf des DataFrames in Bytes.
+        id_index (ClIdIndex | None): Der Index über die Spalte 'ID', sobald er aufgebaut wurde.
+        id_allocator (ClIdAllocator | None): Die Vergabe freier IDs, sobald sie aufgebaut wurde.
+        tombstones (np.ndarray): Die sortierten Nummern der Zeilen in der Datei (ab 0, ohne Kopfzeile), die
+            gelöscht, aber noch nicht aus der Datei entfernt sind. Sie fehlen bereits in df.
+    """
+
+    def __init__(self, df: pd.DataFrame, stamp: tuple, nbytes: int = None):
+        self.df = df
+        self.stamp = stamp
+        self.nbytes = nbytes if nbytes is not None else int(df.memory_usage(index=True, deep=True).sum())
+        self.id_index = None
+        self.id_allocator = None
+        self.tombstones = np.empty(0, dtype=np.int64)
+
+
+class ClDataframeCache:
+    """
+    Ein prozessweiter LRU-Cache für eingelesene CSV-Dateien.
+
+    Die Einträge werden über den absoluten Dateipfad angesprochen und bei jedem Zugriff anhand von
+    mtime, Größe und Inode der Datei validiert. Wird die Datei außerhalb dieses Caches geändert,
+    wird der Eintrag verworfen und die Datei beim nächsten Lesen neu eingelesen.
+
+    Attribute:
+        max_bytes (int): Das Speicherbudget in Bytes. Wird es überschritten, werden die am längsten
+            nicht benutzten Einträge verdrängt.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def file_stamp(path: str) -> tuple:
+        """
+        Ermittelt den Validierungsstempel einer Datei.
+
+        Args:
+            path (str): Der Pfad der Datei.
+
+        Returns:
+            tuple: (mtime_ns, size, inode) der Datei.
+        """
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def get(self, path: str, stamp: tuple = None):
+        """
+        Gibt den gültigen Cache-Eintrag für eine Datei zurück.
+
+        Args:
+            path (str): Der Pfad der Datei.
+            stamp (tuple, optional): Der aktuelle Stempel der Datei. Standard ist der Stempel aus file_stamp.
+
+        Returns:
+            ClCacheEntry | None: Der Eintrag oder None, wenn keiner existiert oder die Datei sich geändert hat.
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if stamp is None:
+                try:
+                    stamp = self.file_stamp(key)
+                except OSError:
+                    stamp = None
+            if stamp != entry.stamp:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def peek(self, path: str):
+        """
+        Gibt den Cache-Eintrag für eine Datei ohne Prüfung des Stempels zurück, z. B. um einen veralteten Stand
+        mit dem neuen Inhalt der Datei zu vergleichen.
+
+        Returns:
+            ClCacheEntry | None: Der Eintrag oder None, wenn keiner existiert.
+        """
+        with self._lock:
+            return self._entries.get(os.path.abspath(path))
+
+    def put(self, path: str, df: pd.DataFrame, stamp: tuple = None, nbytes: int = None, id_index=None,
+            id_allocator=None, tombstones: np.ndarray = None):
+        """
+        Legt einen DataFrame für eine Datei im Cache ab. ID-Index, ID-Vergabe und Grabsteine werden vor dem
+        Ablegen gesetzt, sodass andere Threads den Eintrag nur vollständig sehen.
+
+        Args:
+            path (str): Der Pfad der Datei.
+            df (pd.DataFrame): Der Inhalt der Datei.
+            stamp (tuple, optional): Der Stempel, zu dem der Inhalt gehört. Standard ist der aktuelle Stempel der Datei.
+            nbytes (int, optional): Der bereits bekannte Speicherbedarf. Standard ist die (bei Texten langsame)
+                Messung mit memory_usage.
+            id_index (ClIdIndex, optional): Der zu df passende ID-Index.
+            id_allocator (ClIdAllocator, optional): Die zu df passende ID-Vergabe.
+            tombstones (np.ndarray, optional): Die noch in der Datei stehenden gelöschten Zeilen.
+
+        Returns:
+            ClCacheEntry: Der neue Eintrag. Er wird auch zurückgegeben, wenn er das Budget übersteigt und
+                deshalb nicht gespeichert wird.
+        """
+        key = os.path.abspath(path)
+        if stamp is None:
+            stamp = self.file_stamp(key)
+        entry = ClCacheEntry(df, stamp, nbytes)
+        entry.id_index = id_index
+        entry.id_allocator = id_allocator
+        if tombstones is not None:
+            entry.tombstones = tombstones
+        with self._lock:
+            self._remove(key)
+            if entry.nbytes > self.max_bytes:
+                return entry
+            self._entries[key] = entry
+            self._total_bytes += entry.nbytes
+            self._evict()
+        return entry
+
+    def invalidate(self, path: str):
+        """
+        Entfernt den Eintrag einer Datei aus dem Cache.
+
+        Args:
+            path (str): Der Pfad der Datei.
+        """
+        with self._lock:
+            self._remove(os.path.abspath(path))
+
+    def clear(self):
+        """
+        Leert den Cache vollständig.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.nbytes
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.nbytes
+
+
+# Gemeinsamer Cache für alle Instanzen von ClDataframeHelper im Prozess
+shared_cache = ClDataframeCache()
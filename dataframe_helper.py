@@ -1,21 +1,67 @@
+import itertools
 import os
+import time
 import pandas as pd
 from pandas.errors import EmptyDataError
 
+from csv_backend import ClCsvBackend
+from dataframe_cache import ClDataframeCache
+from instrumentation import instrumentation
+from storage_backend import ClStorageBackend
+from table_schema import DATE_FORMAT, format_dates
+from transaction import ClTransaction
+from worker_pool import ClWorkerPool, shared_pool
+
+# Standard-Ablage für alle Instanzen: 'csv', 'sqlite' oder 'snapshot'
+DEFAULT_BACKEND = os.environ.get('MEIN_VEREIN_BACKEND', 'csv')
+
+# Zeilen je Stück beim gestreamten Export und die möglichen Exportformate
+DEFAULT_CHUNKSIZE = 10000
+EXPORT_FORMATS = ('csv', 'ndjson', 'json')
+
 
 class ClDataframeHelper:
     """
     Eine Klasse, die beim Lesen, Bearbeiten und Löschen von Daten aus einer CSV-Datei hilft.
 
+    Die Daten liegen in einer austauschbaren Ablage (ClStorageBackend). Standard sind die CSV-Dateien im Ordner
+    `file_path` (ClCsvBackend); mit backend='sqlite' oder MEIN_VEREIN_BACKEND=sqlite wird stattdessen die
+    SQLite-Datenbank `mein_verein.db` in diesem Ordner verwendet (ClSqliteBackend). Mit backend='snapshot'
+    bleiben es die CSV-Dateien, ein Kaltstart liest aber binäre Schnappschüsse (ClSnapshotBackend, benötigt
+    pyarrow). Die Tabellen werden in allen Fällen über den Namen ihrer CSV-Datei angesprochen.
+
+    Jede Tabelle hat einen Versionszähler. Wird einer Schreibmethode `base_version` übergeben, schlägt sie mit
+    ClVersionConflictError fehl, falls die Tabelle seit dem Lesen dieser Version geändert wurde.
+
+    Mehrere Tabellen lassen sich mit load_tables gleichzeitig in den Cache laden (siehe ClWorkerPool).
+
     Attribute:
         file_path (str): Der Dateipfad des Ordners, in dem sich die CSV-Dateien befinden.
+        backend (ClStorageBackend): Die Datenablage.
+        pool (ClWorkerPool): Die Worker, mit denen load_tables die Tabellen liest.
     """
 
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, cache: ClDataframeCache = None, backend=None, pool: ClWorkerPool = None):
         if not file_path:
             raise ValueError("file_path darf nicht leer sein.")
         self.file_path = file_path
-
+        if backend is None:
+            backend = DEFAULT_BACKEND
+        if backend == 'csv':
+            backend = ClCsvBackend(file_path, cache)
+        elif backend == 'sqlite':
+            from sqlite_backend import ClSqliteBackend
+            backend = ClSqliteBackend(os.path.join(file_path, ClSqliteBackend.DEFAULT_DB_NAME), cache)
+        elif backend == 'snapshot':
+            from snapshot_backend import ClSnapshotBackend
+            backend = ClSnapshotBackend(file_path, cache)
+        elif not isinstance(backend, ClStorageBackend):
+            raise ValueError(f"Ungültige Datenablage: {backend}. "
+                             "Erlaubt sind 'csv', 'sqlite', 'snapshot' oder ein ClStorageBackend.")
+        self.backend = backend
+        self.pool = pool if pool is not None else shared_pool
+
+    @instrumentation.timed('read_csv')
     def read_csv(self, csv_name: str, filter_conditions: dict = None, return_format: str = 'DataFrame'):
         """
         Liest eine CSV-Datei und wendet optional Filterbedingungen an.
@@ -36,28 +82,88 @@ class ClDataframeHelper:
             ValueError: Wenn ein ungültiges `return_format` angegeben wird.
             pd.errors.EmptyDataError: Wenn die CSV-Datei leer ist.
         """
-        path = os.path.join(self.file_path, csv_name)
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"Die Datei {path} existiert nicht.")
-
         try:
-            df = pd.read_csv(path)
+            df = self.backend.read(csv_name, filter_conditions)
         except EmptyDataError:
             raise EmptyDataError("Die CSV-Datei ist leer.")
 
-        if filter_conditions is not None:
-            df = ClDataframeHelper.filter_dataframe(df, filter_conditions)
-
         if return_format == 'DataFrame':
             return df
         elif return_format == 'dict':
-            return df.to_dict(orient='records')
+            return self.to_records(df)
         elif return_format == 'json':
-            return df.to_json(orient='records')
+            return format_dates(df).to_json(orient='records')
         else:
             raise ValueError(f"Ungültiges Rückgabeformat: {return_format}. Erlaubt sind 'DataFrame', 'dict', 'json'.")
 
+    @instrumentation.timed('stream_csv')
+    def stream_csv(self, csv_name: str, filter_conditions: dict = None, return_format: str = 'csv',
+                   chunksize: int = DEFAULT_CHUNKSIZE):
+        """
+        Liest eine CSV-Datei stückweise und gibt sie als Folge von Textstücken im gewünschten Format zurück,
+        z. B. für eine gestreamte Flask-Antwort. Die Filterbedingungen werden auf jedes Stück angewendet.
+
+        Das erste Stück wird sofort gelesen, damit ungültige Filterbedingungen oder eine fehlende Datei hier
+        auffallen und nicht erst während der Übertragung.
+
+        Args:
+            csv_name (str): Der Name der zu lesenden CSV-Datei.
+            filter_conditions (dict, optional): Ein Wörterbuch mit Filterbedingungen.
+            return_format (str, optional): 'csv', 'ndjson' oder 'json'. Standard ist 'csv'.
+            chunksize (int, optional): Die Anzahl der Zeilen je Stück. Standard ist DEFAULT_CHUNKSIZE.
+
+        Returns:
+            Iterator[str]: Die Textstücke.
+
+        Raises:
+            FileNotFoundError: Wenn die CSV-Datei nicht gefunden wird.
+            ValueError: Wenn eine Spalte in den Filterbedingungen nicht existiert oder das Format ungültig ist.
+        """
+        if return_format not in EXPORT_FORMATS:
+            raise ValueError(f"Ungültiges Exportformat: {return_format}. Erlaubt sind {', '.join(EXPORT_FORMATS)}.")
+        chunks = self.backend.iter_chunks(csv_name, filter_conditions, chunksize)
+        first = next(chunks)
+        # Gemessen wird hier bis zum ersten Stück, die Übertragung als eigener Schritt
+        return instrumentation.stream('stream_csv_body',
+                                      self.format_chunks(itertools.chain([first], chunks), return_format))
+
+    @staticmethod
+    def format_chunks(chunks, return_format: str = 'csv'):
+        """
+        Wandelt eine Folge von DataFrames in Textstücke um: 'csv' mit Kopfzeile aus dem ersten Stück, 'ndjson'
+        mit einem JSON-Objekt je Zeile oder 'json' als ein einziges Array wie read_csv(return_format='json').
+
+        Args:
+            chunks (Iterable[pd.DataFrame]): Die Stücke mit gleichen Spalten.
+            return_format (str, optional): 'csv', 'ndjson' oder 'json'. Standard ist 'csv'.
+
+        Returns:
+            Iterator[str]: Die Textstücke.
+        """
+        if return_format == 'csv':
+            header = True
+            for chunk in chunks:
+                if header or not chunk.empty:
+                    yield chunk.to_csv(index=False, header=header, lineterminator='\n', date_format=DATE_FORMAT)
+                header = False
+        elif return_format == 'ndjson':
+            for chunk in chunks:
+                if not chunk.empty:
+                    yield format_dates(chunk).to_json(orient='records', lines=True)
+        elif return_format == 'json':
+            yield '['
+            separator = ''
+            for chunk in chunks:
+                if not chunk.empty:
+                    # Die Klammern des Arrays jedes Stücks entfernen
+                    yield separator + format_dates(chunk).to_json(orient='records')[1:-1]
+                    separator = ','
+            yield ']'
+        else:
+            raise ValueError(f"Ungültiges Exportformat: {return_format}. Erlaubt sind {', '.join(EXPORT_FORMATS)}.")
+
     @staticmethod
+    @instrumentation.timed('filter_dataframe')
     def filter_dataframe(df: pd.DataFrame, filter_conditions: dict) -> pd.DataFrame:
         """
         Filtert einen DataFrame basierend auf den angegebenen Bedingungen.
@@ -72,53 +178,168 @@ class ClDataframeHelper:
         Raises:
             ValueError: Wenn eine Spalte in den Filterbedingungen nicht im DataFrame existiert.
         """
-        if filter_conditions is not None:
-            for column, value in filter_conditions.items():
+        return ClStorageBackend.filter_dataframe(df, filter_conditions)
+
+    @staticmethod
+    @instrumentation.timed('page_records')
+    def page_records(df: pd.DataFrame, page: int = 1, limit: int = None, sort: str = None, columns: list = None):
+        """
+        Sortiert, blättert und projiziert einen DataFrame und wandelt nur die angezeigten Zeilen in Dictionaries um.
+
+        Für die Sortierung wird nur die Reihenfolge der Sortierspalte berechnet, der DataFrame selbst wird nicht
+        umsortiert. Zeilen außerhalb der Seite werden nie in Python-Objekte umgewandelt.
+
+        Args:
+            df (pd.DataFrame): Der vollständige (gefilterte) DataFrame.
+            page (int, optional): Die Seitennummer, beginnend bei 1. Standard ist 1.
+            limit (int, optional): Die Anzahl der Zeilen je Seite. None liefert alle Zeilen.
+            sort (str, optional): Die Sortierspalte, mit vorangestelltem '-' absteigend. Standard ist die Dateireihenfolge.
+            columns (list, optional): Die anzuzeigenden Spalten in dieser Reihenfolge. Standard sind alle Spalten.
+
+        Returns:
+            tuple: (list der Zeilen als Dictionaries, Gesamtzahl der Zeilen)
+
+        Raises:
+            ValueError: Wenn die Sortierspalte oder eine angeforderte Spalte nicht im DataFrame existiert.
+        """
+        total = len(df)
+        start = (max(page, 1) - 1) * limit if limit else 0
+        stop = start + limit if limit else total
+
+        if sort:
+            column = sort.lstrip('-')
+            if column not in df.columns:
+                raise ValueError(f"Spalte {column} existiert nicht im DataFrame.")
+            order = df[column].reset_index(drop=True).sort_values(ascending=not sort.startswith('-'),
+                                                                   kind='stable', na_position='last').index
+            df_page = df.take(order[start:stop])
+        else:
+            df_page = df.iloc[start:stop]
+
+        if columns:
+            for column in columns:
                 if column not in df.columns:
                     raise ValueError(f"Spalte {column} existiert nicht im DataFrame.")
-                df = df[df[column] == value]
-        return df
+            df_page = df_page[list(columns)]
 
-    def update_csv(self, csv_name: str, id: int, updated_data: dict):
+        return ClDataframeHelper.to_records(df_page), total
+
+    @staticmethod
+    @instrumentation.timed('to_records')
+    def to_records(df: pd.DataFrame) -> list:
         """
-        Aktualisiert eine Zeile in der CSV-Datei basierend auf der ID.
+        Wandelt einen DataFrame für die Anzeige in eine Liste von Dictionaries um. Datumsspalten werden dabei
+        wie in den CSV-Dateien als dd.mm.yyyy ausgegeben.
+
+        Args:
+            df (pd.DataFrame): Der DataFrame.
+
+        Returns:
+            list: Die Zeilen als Dictionaries.
+        """
+        return format_dates(df).to_dict('records')
+
+    @instrumentation.timed('load_tables')
+    def load_tables(self, csv_names) -> dict:
+        """
+        Liest mehrere Tabellen gleichzeitig im Thread-Pool in den Cache und baut ihre ID-Indizes auf, z. B. vor
+        einer Ansicht, die Mitglieder und Vorstand braucht. Bereits aktuelle Tabellen kosten nur die Prüfung
+        ihres Stempels.
+
+        Fehlende Tabellen werden übersprungen, sie werden beim eigentlichen Zugriff gemeldet.
+
+        Args:
+            csv_names (Iterable[str]): Die Namen der CSV-Dateien.
+
+        Returns:
+            dict: Die Dauer in Sekunden je gelesener Tabelle.
+
+        Raises:
+            Exception: Wenn sich eine vorhandene Tabelle nicht lesen lässt (z. B. ein Parserfehler).
+        """
+        def load(csv_name):
+            start = time.perf_counter()
+            try:
+                self.backend.warm(csv_name)
+            except FileNotFoundError:
+                return None
+            return time.perf_counter() - start
+
+        csv_names = list(csv_names)
+        timings = zip(csv_names, self.pool.map_threads(load, csv_names))
+        return {csv_name: seconds for csv_name, seconds in timings if seconds is not None}
+
+    @instrumentation.timed('id_exists')
+    def id_exists(self, csv_name: str, id: int) -> bool:
+        """
+        Prüft über den ID-Index, ob die ID in der CSV-Datei vorkommt.
 
         Args:
             csv_name (str): Der Name der CSV-Datei.
-            id (int): Die ID der Zeile, die aktualisiert werden soll.
-            updated_data (dict): Die neuen Daten als Dictionary.
+            id (int): Die gesuchte ID.
+
+        Returns:
+            bool: True, wenn mindestens eine Zeile die ID hat.
 
         Raises:
             FileNotFoundError: Wenn die CSV-Datei nicht existiert.
-            ValueError: Wenn die ID nicht in der CSV-Datei gefunden wird oder die Spaltennamen in updated_data nicht stimmen.
+            ValueError: Wenn die Spalte ID nicht vorhanden ist.
         """
-        path_csv = os.path.join(self.file_path, csv_name)
-        if not os.path.exists(path_csv):
-            raise FileNotFoundError(f"Die Datei {path_csv} existiert nicht.")
+        return self.backend.id_exists(csv_name, id)
 
-        path_temp = os.path.join(self.file_path, csv_name + '.tmp')
+    @instrumentation.timed('get_rows_by_id')
+    def get_rows_by_id(self, csv_name: str, id: int) -> pd.DataFrame:
+        """
+        Gibt alle Zeilen mit der angegebenen ID über den ID-Index zurück.
 
-        try:
-            df = pd.read_csv(path_csv)
-            if 'ID' not in df.columns:
-                raise ValueError("Die Spalte 'ID' existiert nicht in der CSV-Datei.")
-            if id not in df['ID'].values:
-                raise ValueError(f"Keine Zeilen mit der ID {id} gefunden.")
-
-            index_to_update = df[df['ID'] == id].index[0]
-            for column, value in updated_data.items():
-                if column not in df.columns:
-                    raise ValueError(f"Spalte {column} existiert nicht in der CSV-Datei.")
-                df.at[index_to_update, column] = value
+        Args:
+            csv_name (str): Der Name der CSV-Datei.
+            id (int): Die gesuchte ID.
+
+        Returns:
+            pd.DataFrame: Die Zeilen der ID in der Reihenfolge der Datei, leer wenn die ID nicht existiert.
 
-            df.to_csv(path_temp, index=False)
-            os.replace(path_temp, path_csv)
+        Raises:
+            FileNotFoundError: Wenn die CSV-Datei nicht existiert.
+            ValueError: Wenn die Spalte ID nicht vorhanden ist.
+        """
+        return self.backend.get_rows_by_id(csv_name, id)
 
-        except Exception as e:
-            if os.path.exists(path_temp):
-                os.remove(path_temp)
-            raise e
+    @instrumentation.timed('get_version')
+    def get_version(self, csv_name: str) -> int:
+        """
+        Gibt den Versionszähler einer Tabelle zurück. Er wird bei jedem Schreibvorgang erhöht.
 
+        Die Version muss vor den Daten gelesen werden, auf denen eine Änderung beruht. Sie kann dann als
+        `base_version` an die Schreibmethoden übergeben werden.
+
+        Args:
+            csv_name (str): Der Name der CSV-Datei.
+
+        Returns:
+            int: Die aktuelle Version der Tabelle.
+        """
+        return self.backend.get_version(csv_name)
+
+    @instrumentation.timed('update_csv')
+    def update_csv(self, csv_name: str, id: int, updated_data: dict, base_version: int = None):
+        """
+        Aktualisiert eine Zeile in der CSV-Datei basierend auf der ID.
+
+        Args:
+            csv_name (str): Der Name der CSV-Datei.
+            id (int): Die ID der Zeile, die aktualisiert werden soll.
+            updated_data (dict): Die neuen Daten als Dictionary.
+            base_version (int, optional): Die Version der Tabelle, auf der die Änderung beruht (siehe get_version).
+
+        Raises:
+            FileNotFoundError: Wenn die CSV-Datei nicht existiert.
+            ValueError: Wenn die ID nicht in der CSV-Datei gefunden wird oder die Spaltennamen in updated_data nicht stimmen.
+            ClVersionConflictError: Wenn `base_version` angegeben ist und die Tabelle inzwischen geändert wurde.
+        """
+        self.backend.update(csv_name, id, updated_data, base_version)
+
+    @instrumentation.timed('get_first_unused_id')
     def get_first_unused_id(self, csv_name: str):
         """
         Gibt die erste unbenutzte ID in der CSV-Datei zurück.
@@ -132,24 +353,10 @@ class ClDataframeHelper:
         Raises:
             FileNotFoundError: Wenn die CSV-Datei nicht existiert.
         """
-        path = os.path.join(self.file_path, csv_name)
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"Die Datei {path} existiert nicht.")
-
-        try:
-            df = pd.read_csv(path)
-            if df.empty or 'ID' not in df.columns:
-                return 1
-            used_ids = set(df['ID'])
-            unused_id = 1
-            while unused_id in used_ids:
-                unused_id += 1
-            return unused_id
-
-        except EmptyDataError:
-            return 1
+        return self.backend.get_first_unused_id(csv_name)
 
-    def insert_csv(self, csv_name: str, rows_data: list):
+    @instrumentation.timed('insert_csv')
+    def insert_csv(self, csv_name: str, rows_data: list, base_version: int = None):
         """
         Fügt mehrere neue Zeilen in die CSV-Datei ein und generiert für jede Zeile, deren ID auf 0 gesetzt ist, eine eindeutige ID.
 
@@ -157,10 +364,12 @@ class ClDataframeHelper:
             csv_name (str): Der Name der CSV-Datei, in die die Daten eingefügt werden sollen.
             rows_data (list): Eine Liste von Dictionaries, die die einzufügenden Zeilen repräsentieren.
                               Jede Zeile muss den Schlüssel 'ID' enthalten, der initial auf 0 gesetzt sein kann.
+            base_version (int, optional): Die Version der Tabelle, auf der die Änderung beruht (siehe get_version).
 
         Raises:
             FileNotFoundError: Wenn die CSV-Datei nicht existiert.
             ValueError: Wenn die Spaltennamen in `rows_data` nicht mit den Spalten der CSV-Datei übereinstimmen oder die Daten inkonsistent sind.
+            ClVersionConflictError: Wenn `base_version` angegeben ist und die Tabelle inzwischen geändert wurde.
 
         Returns:
             None: Die Methode gibt nichts zurück, schreibt aber die neuen Daten in die CSV-Datei.
@@ -169,90 +378,61 @@ class ClDataframeHelper:
             Diese Methode fügt mehrere Zeilen in die angegebene CSV-Datei ein. Jede Zeile muss ein Dictionary sein, das die
             Spaltennamen als Schlüssel und die entsprechenden Werte enthält. Wenn der Wert der ID in einer Zeile auf 0 gesetzt ist,
             wird eine neue, einzigartige ID generiert, die noch nicht in der CSV-Datei verwendet wurde.
+            Die Zeilen werden an das Dateiende angehängt und mit fsync gesichert, die Datei wird nicht neu geschrieben.
         """
-        path_csv = os.path.join(self.file_path, csv_name)
+        self.backend.insert(csv_name, rows_data, base_version)
 
-        # Überprüfen, ob die Datei existiert
-        if not os.path.exists(path_csv):
-            raise FileNotFoundError(f"Die Datei {path_csv} existiert nicht.")
+    @instrumentation.timed('compact_csv')
+    def compact_csv(self, csv_name: str):
+        """
+        Schreibt die CSV-Datei vollständig und atomar neu.
 
-        path_temp = os.path.join(self.file_path, csv_name + '.tmp')
+        Nach vielen angehängten Zeilen wird die Datei dadurch wieder in eine einheitliche Form gebracht, und
+        gelöschte Zeilen (Grabsteine) werden endgültig entfernt. Tabellen mit vielen Grabsteinen verdichtet der
+        Verdichter (siehe ClCompactor) selbst im Hintergrund; die Methode ist für den periodischen Aufruf gedacht,
+        z. B. in einem Wartungsjob.
 
-        try:
-            # Lesen der vorhandenen CSV-Daten
-            df = pd.read_csv(path_csv)
-            if not df.empty and 'ID' not in df.columns:
-                raise ValueError("Die CSV-Datei muss eine 'ID'-Spalte enthalten.")
-
-            # Überprüfen, ob die Spalten in row_data mit den Spalten der CSV-Datei übereinstimmen
-            if rows_data and set(rows_data[0].keys()) != set(df.columns):
-                raise ValueError(
-                    "Die Schlüsselnamen von rows_data müssen mit den Spalten der CSV-Datei übereinstimmen.")
-
-            # Set zur Nachverfolgung der bereits verwendeten IDs
-            used_ids = set(df['ID']) if not df.empty else set()
-
-            # Generieren und Hinzufügen der neuen Zeilen
-            for row_data in rows_data:
-                if row_data['ID'] == 0:
-                    # Generiere eine neue ID
-                    new_id = 1
-                    while new_id in used_ids:
-                        new_id += 1
-                    row_data['ID'] = new_id
-                    used_ids.add(new_id)
-
-                # Füge die neue Zeile dem DataFrame hinzu
-                df = pd.concat([df, pd.DataFrame([row_data])], ignore_index=True)
-
-            # Speichern der aktualisierten Daten in einer temporären Datei
-            df.to_csv(path_temp, index=False)
-
-            # Ersetzen der Originaldatei durch die temporäre Datei
-            os.replace(path_temp, path_csv)
-
-        except Exception as e:
-            # Löschen der temporären Datei im Fehlerfall
-            if os.path.exists(path_temp):
-                os.remove(path_temp)
-            raise e
-
-    def delete_id_csv(self, csv_name: str, id: int):
+        Args:
+            csv_name (str): Der Name der CSV-Datei.
+
+        Raises:
+            FileNotFoundError: Wenn die CSV-Datei nicht existiert.
+        """
+        self.backend.compact(csv_name)
+
+    def transaction(self, base_versions: dict = None) -> ClTransaction:
+        """
+        Beginnt eine Transaktion, die Änderungen, Löschungen und Einfügungen über mehrere CSV-Dateien sammelt
+        und gemeinsam ausführt: jede Datei wird einmal gelesen und einmal geschrieben, und entweder werden alle
+        Änderungen wirksam oder keine.
+
+        Args:
+            base_versions (dict, optional): Die erwarteten Versionen je CSV-Datei, z. B. {'mitglieder.csv': 7}.
+
+        Returns:
+            ClTransaction: Die Transaktion, am besten als Kontextmanager verwendet.
+        """
+        return ClTransaction(self.backend, base_versions)
+
+    @instrumentation.timed('delete_id_csv')
+    def delete_id_csv(self, csv_name: str, id: int, base_version: int = None):
         """
         Löscht alle Zeilen mit der angegebenen ID aus der CSV-Datei.
 
         Args:
             csv_name (str): Der Name der CSV-Datei.
             id (int): Die ID der Zeile, die gelöscht werden soll.
+            base_version (int, optional): Die Version der Tabelle, auf der die Änderung beruht (siehe get_version).
 
         Raises:
             FileNotFoundError: Wenn die CSV-Datei nicht existiert.
             ValueError: Wenn die Spalte ID nicht vorhanden ist.
+            ClVersionConflictError: Wenn `base_version` angegeben ist und die Tabelle inzwischen geändert wurde.
         """
-        path_csv = os.path.join(self.file_path, csv_name)
-        if not os.path.exists(path_csv):
-            raise FileNotFoundError(f"Die Datei {path_csv} existiert nicht.")
+        self.backend.delete_id(csv_name, id, base_version)
 
-        path_temp = os.path.join(self.file_path, csv_name + '.tmp')
-
-        try:
-            df = pd.read_csv(path_csv)
-            if 'ID' not in df.columns:
-                raise ValueError(f"Die Spalte 'ID' existiert nicht in der CSV-Datei {csv_name}.")
-            if id not in df['ID'].values:
-                # raise ValueError(f"Keine Zeilen mit der ID {id} gefunden in der CSV-Datei {csv_name}.")
-                return
-
-            df_cleaned = df[df['ID'] != id]
-
-            df_cleaned.to_csv(path_temp, index=False)
-            os.replace(path_temp, path_csv)
-        except Exception as e:
-            if os.path.exists(path_temp):
-                os.remove(path_temp)
-            raise e
-
-    def delete_id_row_csv(self, csv_name: str, id: int, row_nr: int):
+    @instrumentation.timed('delete_id_row_csv')
+    def delete_id_row_csv(self, csv_name: str, id: int, row_nr: int, base_version: int = None):
         """
         Löscht eine Zeile mit der angegebenen ID und Reihenummer aus der CSV-Datei.
 
@@ -260,37 +440,14 @@ class ClDataframeHelper:
             csv_name (str): Der Name der CSV-Datei.
             id (int): Die ID der Zeile, die gelöscht werden soll.
             row_nr (int): Die Nummer der zu löschenden Zeile mit der angegebenen ID (beginnend bei 1).
+            base_version (int, optional): Die Version der Tabelle, auf der die Änderung beruht (siehe get_version).
 
         Raises:
             FileNotFoundError: Wenn die CSV-Datei nicht existiert.
             ValueError: Wenn die ID nicht in der CSV-Datei gefunden wird oder row_nr ungültig ist.
+            ClVersionConflictError: Wenn `base_version` angegeben ist und die Tabelle inzwischen geändert wurde.
         """
-        path_csv = os.path.join(self.file_path, csv_name)
-        if not os.path.exists(path_csv):
-            raise FileNotFoundError(f"Die Datei {path_csv} existiert nicht.")
-
-        path_temp = os.path.join(self.file_path, csv_name + '.tmp')
-
-        try:
-            df = pd.read_csv(path_csv)
-            if 'ID' not in df.columns:
-                raise ValueError("Die Spalte 'ID' existiert nicht in der CSV-Datei.")
-
-            matching_rows = df[df['ID'] == id]
-            if matching_rows.empty:
-                raise ValueError(f"Keine Zeilen mit ID {id} gefunden.")
-            if row_nr < 1 or row_nr > len(matching_rows):
-                raise ValueError(f"Ungültige Reihenummer {row_nr} für ID {id}.")
-
-            index_to_delete = matching_rows.index[row_nr - 1]
-            df_cleaned = df.drop(index_to_delete)
-
-            df_cleaned.to_csv(path_temp, index=False)
-            os.replace(path_temp, path_csv)
-        except Exception as e:
-            if os.path.exists(path_temp):
-                os.remove(path_temp)
-            raise e
+        self.backend.delete_id_row(csv_name, id, row_nr, base_version)
 
 
 if __name__ == "__main__":
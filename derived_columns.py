@@ -0,0 +1,477 @@
+import os
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from change_log import ClChangeLog, shared_change_log
+from query import ClQuery
+from storage_backend import ClStorageBackend
+from worker_pool import ClWorkerPool, shared_pool
+
+# Tagesordinal für ein fehlendes oder ungültiges Datum
+MISSING_DATE = np.iinfo(np.int64).min
+
+# Ab so vielen Zeilen werden Summen je ID im Prozess-Pool gebildet, per Umgebungsvariable überschreibbar
+PARALLEL_GROUP_ROWS = int(os.environ.get('MEIN_VEREIN_PARALLEL_ROWS', '1000000'))
+
+
+def date_ordinals(values) -> np.ndarray:
+    """
+    Wandelt Datumsangaben im Format dd.mm.yyyy in Tagesordinale (Tage seit dem 01.01.1970) um.
+
+    Args:
+        values: Die Datumsangaben als Texte oder als datetime64-Spalte (siehe table_schema).
+
+    Returns:
+        np.ndarray: Die Tagesordinale als int64, MISSING_DATE für fehlende oder ungültige Angaben.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        parsed = values
+    else:
+        parsed = pd.to_datetime(pd.Series(values, dtype=object), format='%d.%m.%Y', errors='coerce')
+    return parsed.to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+
+def ordinal_years(ordinals: np.ndarray) -> np.ndarray:
+    """
+    Gibt das Kalenderjahr je Tagesordinal zurück.
+
+    Args:
+        ordinals (np.ndarray): Die Tagesordinale aus date_ordinals.
+
+    Returns:
+        np.ndarray: Die Jahre als float, NaN für fehlende Daten.
+    """
+    years = ordinals.astype('datetime64[D]').astype('datetime64[Y]').astype(np.int64) + 1970
+    return np.where(ordinals == MISSING_DATE, np.nan, years)
+
+
+def _group_sum(values: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    return pd.Series(values).groupby(ids, sort=False).transform('sum').to_numpy(dtype=float)
+
+
+def group_sum(values: np.ndarray, ids: np.ndarray, pool: ClWorkerPool = None) -> np.ndarray:
+    """
+    Gibt für jede Zeile die Summe der Werte aller Zeilen mit derselben ID zurück; fehlende Werte zählen als 0.
+
+    Ab PARALLEL_GROUP_ROWS Zeilen und mit einem Prozess-Pool (siehe ClWorkerPool.multiprocess) werden die Zeilen
+    nach dem Hash der ID auf die Worker verteilt, sodass alle Zeilen einer ID im selben Teil liegen, und die Teile
+    im Prozess-Pool summiert.
+
+    Args:
+        values (np.ndarray): Die Werte als float.
+        ids (np.ndarray): Die ID je Zeile.
+        pool (ClWorkerPool, optional): Die Worker, Standard ist der gemeinsame Pool.
+
+    Returns:
+        np.ndarray: Die Summen als float, in der Reihenfolge der Zeilen.
+    """
+    pool = pool if pool is not None else shared_pool
+    if not pool.multiprocess or len(ids) < PARALLEL_GROUP_ROWS:
+        return _group_sum(values, ids)
+    part = pd.util.hash_array(np.asarray(ids)) % np.uint64(pool.workers)
+    rows = [np.flatnonzero(part == k) for k in range(pool.workers)]
+    totals = np.empty(len(ids), dtype=float)
+    for positions, part_totals in zip(rows, pool.map_processes(_group_sum, [values[r] for r in rows],
+                                                                 [ids[r] for r in rows])):
+        totals[positions] = part_totals
+    return totals
+
+
+class _ClViewState:
+    """
+    Der materialisierte Stand einer Sicht für eine Tabelle.
+    """
+
+    def __init__(self, stamp: tuple, year: int, df: pd.DataFrame, ordinals: dict, derived: dict):
+        self.stamp = stamp
+        self.year = year
+        self.df = df
+        self.ordinals = ordinals
+        self.derived = derived
+        self.lookups = {}
+
+
+class ClDerivedView:
+    """
+    Eine materialisierte Sicht: die Zeilen einer Tabelle mit zusätzlich berechneten Spalten.
+
+    Die Datumsspalten werden nur einmal eingelesen und als Tagesordinale gehalten. Nach einem Schreibvorgang
+    werden nur die Zeilen der IDs gelesen und neu berechnet, die laut Änderungsprotokoll betroffen sind; alle
+    anderen Zeilen stehen in der neuen Tabelle unverändert in derselben Reihenfolge und werden mit ihren Werten
+    aus der bisherigen Sicht übernommen. Ist der Weg zwischen altem und neuem Stand nicht bekannt, wird die
+    Sicht vollständig neu aufgebaut. Beim Jahreswechsel
+    werden die berechneten Spalten einmal aus den Tagesordinalen neu bestimmt, ohne erneutes Einlesen.
+
+    Unterklassen legen fest, welche Datumsspalten eingelesen werden (_parse) und wie die zusätzlichen Spalten
+    daraus berechnet werden (_derive). Die Berechnung bekommt immer alle Zeilen einer ID zusammen.
+
+    Attribute:
+        csv_name (str): Der Name der Tabelle, z. B. 'mitglieder.csv'.
+        change_log (ClChangeLog): Das Protokoll, aus dem die geänderten IDs gelesen werden.
+    """
+
+    def __init__(self, csv_name: str, change_log: ClChangeLog = None):
+        self.csv_name = csv_name
+        self.change_log = change_log if change_log is not None else shared_change_log
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _parse(self, df_rows: pd.DataFrame) -> dict:
+        """
+        Gibt die Tagesordinale der Datumsspalten der Zeilen zurück, je Spaltenname ein Array.
+        """
+        raise NotImplementedError
+
+    def _derive(self, ordinals: dict, ids: np.ndarray, year: int) -> dict:
+        """
+        Berechnet die zusätzlichen Spalten für die Zeilen (je Spaltenname ein float-Array, NaN für unbekannt).
+        """
+        raise NotImplementedError
+
+    def get(self, backend: ClStorageBackend) -> pd.DataFrame:
+        """
+        Gibt die Sicht für die Tabelle der Datenablage zurück und aktualisiert sie bei Bedarf.
+
+        Args:
+            backend (ClStorageBackend): Die Datenablage, aus der die Tabelle gelesen wird.
+
+        Returns:
+            pd.DataFrame: Die Tabelle mit den berechneten Spalten. Der DataFrame gehört der Sicht und darf
+            nicht verändert werden.
+        """
+        return self._state(backend).df
+
+    def query(self, backend: ClStorageBackend, filter_conditions) -> pd.DataFrame:
+        """
+        Gibt die Zeilen der Sicht zurück, die die Filterbedingungen erfüllen (siehe ClQuery), z. B.
+        [('Jahre', '>=', 25)]. Das Ergebnis wird bis zur nächsten Änderung der Tabelle zwischengespeichert.
+
+        Raises:
+            ValueError: Wenn eine Spalte nicht in der Sicht existiert.
+        """
+        state = self._state(backend)
+        query = ClQuery(filter_conditions)
+        key = query.key()
+        df = state.lookups.get(key)
+        if df is None:
+            df = query.select(state.df)
+            state.lookups[key] = df
+        return df
+
+    def filter_equal(self, backend: ClStorageBackend, column: str, value) -> pd.DataFrame:
+        """
+        Gibt die Zeilen der Sicht zurück, in denen die Spalte den Wert hat (siehe query).
+        """
+        return self.query(backend, {column: value})
+
+    def invalidate(self):
+        """
+        Verwirft alle materialisierten Stände der Sicht.
+        """
+        with self._lock:
+            self._states.clear()
+
+    def _state(self, backend: ClStorageBackend) -> _ClViewState:
+        key = backend.table_key(self.csv_name)
+        year = date.today().year
+        with self._lock:
+            state = self._states.get(key)
+            # Der Stempel wird vor dem Lesen ermittelt; eine gleichzeitige Änderung wird beim nächsten Zugriff
+            # erneut berechnet, was für die betroffenen IDs dasselbe Ergebnis liefert
+            stamp = backend.get_stamp(self.csv_name)
+            if state is None or state.stamp != stamp:
+                new_state = None
+                if state is not None:
+                    changed_ids = self.change_log.changed_ids(key, state.stamp, stamp)
+                    if changed_ids is not None:
+                        new_state = self._refresh(backend, state, stamp, changed_ids)
+                if new_state is None:
+                    new_state = self._build(backend.read(self.csv_name), stamp, year)
+                state = new_state
+            if state.year != year:
+                state = self._rederive(state, year)
+            self._states[key] = state
+            return state
+
+    def _build(self, source: pd.DataFrame, stamp: tuple, year: int) -> _ClViewState:
+        ordinals = self._parse(source)
+        derived = self._derive(ordinals, source['ID'].to_numpy(), year)
+        return _ClViewState(stamp, year, self._assemble(source, derived), ordinals, derived)
+
+    def _refresh(self, backend: ClStorageBackend, state: _ClViewState, stamp: tuple, changed_ids: set):
+        """
+        Liest nur die Zeilen der geänderten IDs, berechnet sie und setzt sie an ihren Positionen in der neuen
+        Tabelle zwischen die unveränderten Zeilen der bisherigen Sicht. Gibt None zurück, wenn die Positionen
+        oder die Datentypen nicht zur bisherigen Sicht passen.
+        """
+        changed_ids = [int(id) for id in changed_ids]
+        # Der Index der gelesenen Zeilen sind ihre Positionen in der neuen Tabelle (siehe ClStorageBackend.read)
+        rows = backend.read(self.csv_name, [('ID', 'in', changed_ids)])
+        kept = ~state.df['ID'].isin(changed_ids).to_numpy()
+        size = int(kept.sum()) + len(rows)
+        positions = rows.index.to_numpy()
+        if len(positions) and (positions.min() < 0 or positions.max() >= size):
+            return None
+        changed = np.zeros(size, dtype=bool)
+        changed[positions] = True
+        if changed.sum() != len(rows):
+            return None
+
+        df_old = state.df
+        for column in rows.columns:
+            dtype, dtype_old = rows[column].dtype, df_old[column].dtype
+            if dtype == dtype_old:
+                continue
+            # Geänderte Kategorien gelten auch für die übernommenen Zeilen, deren Werte müssen darin vorkommen
+            if not (isinstance(dtype, pd.CategoricalDtype) and isinstance(dtype_old, pd.CategoricalDtype)):
+                return None
+            values = df_old[column].astype(dtype)
+            if (values.isna() & df_old[column].notna()).to_numpy()[kept].any():
+                return None
+            if df_old is state.df:
+                df_old = df_old.copy(deep=False)
+            df_old[column] = values
+
+        ordinals_changed = self._parse(rows)
+        derived_changed = self._derive(ordinals_changed, rows['ID'].to_numpy(), state.year)
+        if size == len(df_old) and np.array_equal(np.flatnonzero(~kept), positions):
+            # Die Zeilen stehen an denselben Positionen wie bisher (z. B. nach Änderungen): nur diese ersetzen
+            ordinals = {name: self._replace(values, positions, ordinals_changed[name])
+                        for name, values in state.ordinals.items()}
+            derived = {name: self._replace(values, positions, derived_changed[name])
+                       for name, values in state.derived.items()}
+            # Nur Spalten mit geänderten Werten werden kopiert, die übrigen teilt der neue DataFrame mit dem alten
+            df = df_old.copy(deep=False)
+            for column in rows.columns:
+                values = rows[column].array
+                if not df_old[column].array[positions].equals(values):
+                    df[column] = self._replace(df_old[column].array, positions, values)
+        else:
+            ordinals = {name: self._merge(values[kept], ordinals_changed[name], changed)
+                        for name, values in state.ordinals.items()}
+            derived = {name: self._merge(values[kept], derived_changed[name], changed)
+                       for name, values in state.derived.items()}
+            # Neue Reihenfolge: die übernommenen Zeilen der bisherigen Sicht, dahinter die gelesenen Zeilen
+            order = np.empty(size, dtype=np.int64)
+            order[~changed] = np.flatnonzero(kept)
+            order[changed] = len(df_old) + np.arange(len(rows))
+            df = pd.concat([df_old[rows.columns], rows], ignore_index=True).take(order)
+            df.index = pd.RangeIndex(size)
+        for name, values in derived.items():
+            df[name] = self._column(values)
+        return _ClViewState(stamp, state.year, df, ordinals, derived)
+
+    def _rederive(self, state: _ClViewState, year: int) -> _ClViewState:
+        derived = self._derive(state.ordinals, state.df['ID'].to_numpy(), year)
+        df = self._assemble(state.df.drop(columns=list(derived)), derived)
+        return _ClViewState(state.stamp, year, df, state.ordinals, derived)
+
+    @staticmethod
+    def _replace(values, positions: np.ndarray, changed_values):
+        values = values.copy()
+        values[positions] = changed_values
+        return values
+
+    @staticmethod
+    def _merge(kept_values: np.ndarray, changed_values: np.ndarray, changed: np.ndarray) -> np.ndarray:
+        values = np.empty(len(changed), dtype=kept_values.dtype)
+        values[~changed] = kept_values
+        values[changed] = changed_values
+        return values
+
+    @classmethod
+    def _assemble(cls, source: pd.DataFrame, derived: dict) -> pd.DataFrame:
+        df = source.reset_index(drop=True)
+        for name, values in derived.items():
+            df[name] = cls._column(values)
+        return df
+
+    @staticmethod
+    def _column(values: np.ndarray):
+        # Ganzzahlig wie bisher, nur bei fehlenden Daten als Int64 mit <NA>
+        if np.isnan(values).any():
+            return pd.array(values, dtype='Int64')
+        return values.astype(np.int64)
+
+
+class ClMembershipYears(ClDerivedView):
+    """
+    Die Mitglieder mit der Spalte 'Jahre' (Kalenderjahre seit dem Eintrittsdatum).
+    """
+
+    def __init__(self, csv_name: str = 'mitglieder.csv', change_log: ClChangeLog = None):
+        super().__init__(csv_name, change_log)
+
+    def _parse(self, df_rows: pd.DataFrame) -> dict:
+        return {'Eintrittsdatum': date_ordinals(df_rows['Eintrittsdatum'])}
+
+    def _derive(self, ordinals: dict, ids: np.ndarray, year: int) -> dict:
+        return {'Jahre': year - ordinal_years(ordinals['Eintrittsdatum'])}
+
+
+class ClBoardTenure(ClDerivedView):
+    """
+    Die Vorstandsposten mit den Spalten 'Jahre' (je Posten) und 'Gesamtjahre' (Summe je ID).
+    Ein Posten ohne gültiges Bis-Datum gilt als aktiv und zählt bis zum laufenden Jahr.
+    Die Gesamtjahre werden bei vielen Zeilen im Worker-Pool summiert (siehe group_sum).
+    """
+
+    def __init__(self, csv_name: str = 'vorstand.csv', change_log: ClChangeLog = None, pool: ClWorkerPool = None):
+        super().__init__(csv_name, change_log)
+        self.pool = pool
+
+    def _parse(self, df_rows: pd.DataFrame) -> dict:
+        return {'Von': date_ordinals(df_rows['Von']), 'Bis': date_ordinals(df_rows['Bis'])}
+
+    def _derive(self, ordinals: dict, ids: np.ndarray, year: int) -> dict:
+        years_until = ordinal_years(ordinals['Bis'])
+        years_until[np.isnan(years_until)] = year
+        years = years_until - ordinal_years(ordinals['Von'])
+        return {'Jahre': years, 'Gesamtjahre': group_sum(years, ids, self.pool)}
+
+
+class _ClBoardState:
+    """
+    Der materialisierte Stand der Vorstandsübersicht.
+    """
+
+    def __init__(self, tenure: _ClViewState, members_stamp: tuple, names: dict, df: pd.DataFrame):
+        self.tenure = tenure
+        self.members_stamp = members_stamp
+        self.names = names
+        self.df = df
+        self.lookups = {}
+
+
+class ClBoardView:
+    """
+    Die Vorstandsübersicht: die Posten aus ClBoardTenure mit Vor- und Nachnamen der Mitglieder.
+
+    Die Namen werden als Spalten parallel zu den Zeilen der Vorstandssicht gehalten, sodass für eine Anfrage
+    kein Join nötig ist. Ändert sich eine der beiden Tabellen, werden die Namen nur für die Zeilen der IDs neu
+    nachgeschlagen, die laut Änderungsprotokoll in einer der Tabellen betroffen sind. Ist der Weg zwischen
+    den Ständen nicht bekannt, werden die Namen einmal vollständig per Join übernommen.
+
+    Attribute:
+        tenure (ClBoardTenure): Die Sicht auf die Vorstandsposten.
+        members_csv (str): Der Name der Mitgliedertabelle.
+        change_log (ClChangeLog): Das Protokoll, aus dem die geänderten IDs gelesen werden.
+    """
+
+    NAME_COLUMNS = ['Vorname', 'Nachname']
+    COLUMNS = ['ID', 'Vorname', 'Nachname', 'Position', 'Von', 'Bis', 'Jahre', 'Gesamtjahre']
+
+    def __init__(self, tenure: ClBoardTenure, members_csv: str = 'mitglieder.csv', change_log: ClChangeLog = None):
+        self.tenure = tenure
+        self.members_csv = members_csv
+        self.change_log = change_log if change_log is not None else shared_change_log
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def get(self, backend: ClStorageBackend) -> pd.DataFrame:
+        """
+        Gibt die Vorstandsübersicht zurück und aktualisiert sie bei Bedarf.
+
+        Args:
+            backend (ClStorageBackend): Die Datenablage mit Mitglieder- und Vorstandstabelle.
+
+        Returns:
+            pd.DataFrame: Die Spalten COLUMNS, 'Bis' bleibt bei aktiven Posten leer. Der DataFrame gehört der
+            Sicht und darf nicht verändert werden.
+        """
+        return self._state(backend).df
+
+    def query(self, backend: ClStorageBackend, filter_conditions) -> pd.DataFrame:
+        """
+        Gibt die Zeilen zurück, die die Filterbedingungen erfüllen (siehe ClQuery), z. B.
+        [('Gesamtjahre', '>=', 25)] oder [ClPeriodCondition('Von', 'Bis', '01.01.1990', '31.12.1990')].
+        Das Ergebnis wird bis zur nächsten Änderung einer der beiden Tabellen zwischengespeichert.
+
+        Raises:
+            ValueError: Wenn eine Spalte nicht in der Übersicht existiert.
+        """
+        state = self._state(backend)
+        query = ClQuery(filter_conditions)
+        key = query.key()
+        df = state.lookups.get(key)
+        if df is None:
+            df = query.select(state.df)
+            state.lookups[key] = df
+        return df
+
+    def filter_equal(self, backend: ClStorageBackend, column: str, value) -> pd.DataFrame:
+        """
+        Gibt die Zeilen zurück, in denen die Spalte den Wert hat, z. B. ('Gesamtjahre', 25) (siehe query).
+        """
+        return self.query(backend, {column: value})
+
+    def invalidate(self):
+        """
+        Verwirft alle materialisierten Stände der Übersicht.
+        """
+        with self._lock:
+            self._states.clear()
+
+    def _state(self, backend: ClStorageBackend) -> _ClBoardState:
+        tenure_state = self.tenure._state(backend)
+        members_key = backend.table_key(self.members_csv)
+        key = (members_key, backend.table_key(self.tenure.csv_name))
+        with self._lock:
+            state = self._states.get(key)
+            members_stamp = backend.get_stamp(self.members_csv)
+            if state is not None and state.tenure is tenure_state and state.members_stamp == members_stamp:
+                return state
+
+            names = None
+            if state is not None:
+                board_ids = self.change_log.changed_ids(key[1], state.tenure.stamp, tenure_state.stamp)
+                member_ids = self.change_log.changed_ids(members_key, state.members_stamp, members_stamp)
+                if board_ids is not None and member_ids is not None:
+                    names = self._refresh_names(backend, state, tenure_state.df, board_ids | member_ids)
+            if names is None:
+                names = self._join_names(backend, tenure_state.df)
+
+            df = tenure_state.df.copy()
+            for column in self.NAME_COLUMNS:
+                df[column] = names[column]
+            state = _ClBoardState(tenure_state, members_stamp, names, df[self.COLUMNS])
+            self._states[key] = state
+            return state
+
+    def _join_names(self, backend: ClStorageBackend, df_board: pd.DataFrame) -> dict:
+        members = backend.read(self.members_csv)[['ID'] + self.NAME_COLUMNS]
+        merged = df_board[['ID']].merge(members, on='ID', how='left')
+        return {column: merged[column].to_numpy(dtype=object) for column in self.NAME_COLUMNS}
+
+    def _refresh_names(self, backend: ClStorageBackend, state: _ClBoardState, df_board: pd.DataFrame,
+                       changed_ids: set):
+        """
+        Übernimmt die Namen aller nicht betroffenen Zeilen und schlägt nur die geänderten IDs über den ID-Index
+        der Mitgliedertabelle nach. Gibt None zurück, wenn die nicht betroffenen Zeilen nicht zusammenpassen.
+        """
+        changed_ids = list(changed_ids)
+        changed = df_board['ID'].isin(changed_ids).to_numpy()
+        kept = ~state.df['ID'].isin(changed_ids).to_numpy()
+        if (~changed).sum() != kept.sum():
+            return None
+
+        lookup = {}
+        for id in pd.unique(df_board['ID'].to_numpy()[changed]):
+            rows = backend.get_rows_by_id(self.members_csv, id)
+            lookup[id] = rows.iloc[0] if len(rows) else None
+        changed_rows = df_board['ID'].to_numpy()[changed]
+        names = {}
+        for column in self.NAME_COLUMNS:
+            values = np.array([np.nan if lookup[id] is None else lookup[id][column] for id in changed_rows],
+                              dtype=object)
+            names[column] = ClDerivedView._merge(state.names[column][kept], values, changed)
+        return names
+
+
+# Gemeinsame Sichten für alle Anfragen im Prozess
+membership_years = ClMembershipYears()
+board_tenure = ClBoardTenure()
+board_view = ClBoardView(board_tenure)
@@ -0,0 +1,133 @@
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: nur Sperren innerhalb des Prozesses
+    fcntl = None
+
+
+class ClVersionConflictError(ValueError):
+    """
+    Wird ausgelöst, wenn eine Tabelle seit dem Lesen der Basisversion von einem anderen Schreiber geändert wurde.
+    """
+
+
+class ClTableLock:
+    """
+    Eine Lese-/Schreibsperre für eine Tabelle über mehrere Prozesse hinweg.
+
+    Die Sperre verwendet fcntl.flock auf der Datei `<csv>.lock`. Jede Anforderung öffnet die Datei neu,
+    damit sich auch Threads desselben Prozesses gegenseitig sperren. Die Sperrdatei enthält außerdem einen
+    Versionszähler, der bei jedem Schreibvorgang unter der exklusiven Sperre erhöht wird.
+    Ohne fcntl (Windows) wird nur innerhalb des Prozesses exklusiv gesperrt.
+
+    Attribute:
+        path_lock (str): Der Pfad der Sperrdatei.
+    """
+
+    _VERSION_WIDTH = 20
+    _thread_locks = {}
+    _thread_locks_guard = threading.Lock()
+
+    def __init__(self, path_csv: str):
+        self.path_lock = os.path.abspath(path_csv) + '.lock'
+
+    @contextmanager
+    def shared(self):
+        """
+        Hält eine gemeinsame Lesesperre, solange der Block ausgeführt wird.
+        """
+        with self._acquire(fcntl.LOCK_SH if fcntl else None):
+            yield
+
+    @contextmanager
+    def exclusive(self, base_version=None):
+        """
+        Hält eine exklusive Schreibsperre, solange der Block ausgeführt wird.
+
+        Mit `base_version` wird die Version schon vor dem Warten auf die Sperre geprüft: Ein Schreiber mit
+        veralteter Basisversion scheitert sofort, statt sich hinter den anderen Schreibern einzureihen. Unter der
+        Sperre wird erneut geprüft, denn bis dahin kann ein anderer Schreiber die Tabelle geändert haben.
+
+        Args:
+            base_version (int | None): Die beim Lesen ermittelte Version. None überspringt die Prüfung.
+
+        Raises:
+            ClVersionConflictError: Wenn die aktuelle Version von der Basisversion abweicht.
+        """
+        self.check_version(base_version)
+        with self._acquire(fcntl.LOCK_EX if fcntl else None):
+            self.check_version(base_version)
+            yield
+
+    def read_version(self) -> int:
+        """
+        Gibt den aktuellen Versionszähler der Tabelle zurück.
+
+        Returns:
+            int: Die Version, 0 wenn die Tabelle noch nie über die Sperre geschrieben wurde.
+        """
+        try:
+            with open(self.path_lock, 'rb') as f:
+                content = f.read(self._VERSION_WIDTH).strip()
+        except FileNotFoundError:
+            return 0
+        return int(content) if content else 0
+
+    def bump_version(self) -> int:
+        """
+        Erhöht den Versionszähler. Darf nur unter der exklusiven Sperre aufgerufen werden.
+
+        Returns:
+            int: Die neue Version.
+        """
+        version = self.read_version() + 1
+        fd = os.open(self.path_lock, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, str(version).rjust(self._VERSION_WIDTH).encode())
+        finally:
+            os.close(fd)
+        return version
+
+    def check_version(self, base_version):
+        """
+        Prüft, ob die Tabelle seit der Basisversion unverändert ist. Verbindlich ist das Ergebnis nur unter der
+        exklusiven Sperre; ohne Sperre dient die Prüfung dem frühen Abbruch (siehe exclusive).
+
+        Args:
+            base_version (int | None): Die beim Lesen ermittelte Version. None überspringt die Prüfung.
+
+        Raises:
+            ClVersionConflictError: Wenn die aktuelle Version von der Basisversion abweicht.
+        """
+        if base_version is None:
+            return
+        version = self.read_version()
+        if version != int(base_version):
+            raise ClVersionConflictError(
+                f"Die Daten wurden zwischenzeitlich geändert (Version {version} statt {base_version}).")
+
+    @contextmanager
+    def _acquire(self, operation):
+        if fcntl is None:
+            with self._thread_lock():
+                yield
+            return
+
+        fd = os.open(self.path_lock, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, operation)
+            yield
+        finally:
+            # Ausdrücklich freigeben: Ein per fork gestarteter Worker (siehe ClWorkerPool) hält eine Kopie des
+            # Deskriptors, dann gäbe das Schließen allein die Sperre nicht frei
+            try:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+
+    def _thread_lock(self):
+        with self._thread_locks_guard:
+            return self._thread_locks.setdefault(self.path_lock, threading.RLock())
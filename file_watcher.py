@@ -0,0 +1,137 @@
+import logging
+import os
+import threading
+
+from csv_backend import ClCsvBackend
+
+# Abstand der Prüfungen in Sekunden, per Umgebungsvariable überschreibbar
+DEFAULT_INTERVAL = float(os.environ.get('MEIN_VEREIN_WATCH_INTERVAL', '1.0'))
+
+logger = logging.getLogger(__name__)
+
+
+class ClChangeEvent:
+    """
+    Die Meldung einer von außen geänderten Tabelle.
+
+    Attribute:
+        csv_name (str): Der Name der Tabelle.
+        table_key (str): Der Schlüssel der Tabelle (siehe ClStorageBackend.table_key).
+        ids (set | None): Die geänderten, neuen und gelöschten IDs oder None, wenn die Tabelle noch nicht
+            geladen war und daher nicht verglichen werden konnte.
+        stamp (tuple): Der Stempel des neuen Stands.
+    """
+
+    def __init__(self, csv_name: str, table_key: str, ids, stamp: tuple):
+        self.csv_name = csv_name
+        self.table_key = table_key
+        self.ids = ids
+        self.stamp = stamp
+
+    def __repr__(self) -> str:
+        ids = 'alle' if self.ids is None else sorted(self.ids)
+        return f"ClChangeEvent({self.csv_name!r}, ids={ids})"
+
+
+class ClFileWatcher:
+    """
+    Beobachtet die CSV-Dateien im Datenordner und übernimmt Änderungen von außen, z. B. wenn der Vorstand
+    mitglieder.csv direkt in einer Tabellenkalkulation bearbeitet.
+
+    Ein Hintergrund-Thread prüft in festen Abständen die Stempel der Tabellen (Dateistempel und Version, siehe
+    ClStorageBackend.get_stamp). Hat sich eine Tabelle geändert, ohne dass der Cache dieses Prozesses den neuen
+    Stand schon kennt, liest ClCsvBackend.reload sie neu ein und vergleicht sie je ID und Zeilen-Hash mit dem
+    bisherigen Stand. Nur die geänderten IDs landen im Änderungsprotokoll; Sichten und Suchindex berechnen
+    damit nur diese Zeilen neu. Danach wird ein ClChangeEvent an alle Abonnenten verteilt.
+
+    Eine Datei, die gerade geschrieben wird und sich nicht lesen lässt, wird bei der nächsten Prüfung erneut
+    gelesen. Die Abonnenten werden im Thread des Beobachters aufgerufen, ohne dass eine Sperre gehalten wird.
+
+    Gelöschte Zeilen stehen bis zum Verdichten noch in der CSV-Datei (siehe ClCsvBackend); wer die Datei dann
+    von Hand bearbeitet, würde sie wieder einfügen. Eine Tabelle mit Grabsteinen, die seit der letzten Prüfung
+    nicht geändert wurde, wird deshalb dem Verdichter übergeben, sodass die Datei kurz nach dem Löschen wieder
+    genau den Stand der Anwendung zeigt.
+
+    Attribute:
+        backend (ClCsvBackend): Die Datenablage der Tabellen.
+        tables (tuple): Die Namen der beobachteten Tabellen.
+        interval (float): Der Abstand der Prüfungen in Sekunden.
+    """
+
+    def __init__(self, backend: ClCsvBackend, tables=('mitglieder.csv', 'vorstand.csv'),
+                 interval: float = DEFAULT_INTERVAL):
+        self.backend = backend
+        self.tables = tuple(tables)
+        self.interval = interval
+        self._subscribers = []
+        self._stamps = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback):
+        """
+        Meldet eine Funktion an, die für jede Änderung mit einem ClChangeEvent aufgerufen wird.
+        """
+        self._subscribers.append(callback)
+
+    def check(self) -> list:
+        """
+        Prüft alle Tabellen einmal und übernimmt Änderungen.
+
+        Returns:
+            list: Die verteilten ClChangeEvent.
+        """
+        events = []
+        for csv_name in self.tables:
+            try:
+                stamp = self.backend.get_stamp(csv_name)
+                if self._stamps.get(csv_name) == stamp:
+                    if self.backend.tombstone_count(csv_name):
+                        self.backend.compactor.request(self.backend, csv_name)
+                    continue
+                ids = self.backend.reload(csv_name)
+            except FileNotFoundError:
+                continue
+            except Exception:
+                # Z. B. eine halb geschriebene Datei: bei der nächsten Prüfung erneut versuchen
+                logger.warning("%s konnte nicht neu eingelesen werden", csv_name, exc_info=True)
+                continue
+            self._stamps[csv_name] = stamp
+            if ids is None or ids:
+                events.append(ClChangeEvent(csv_name, self.backend.table_key(csv_name), ids, stamp))
+
+        for event in events:
+            for callback in self._subscribers:
+                try:
+                    callback(event)
+                except Exception:
+                    logger.exception("Fehler beim Verteilen von %r", event)
+        return events
+
+    def start(self):
+        """
+        Startet den Hintergrund-Thread, falls er noch nicht läuft. Der aktuelle Stand gilt als bekannt.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        for csv_name in self.tables:
+            try:
+                self._stamps[csv_name] = self.backend.get_stamp(csv_name)
+            except FileNotFoundError:
+                pass
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='mein_verein-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Beendet den Hintergrund-Thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
@@ -0,0 +1,141 @@
+import bisect
+import threading
+
+import numpy as np
+
+
+class ClIdAllocator:
+    """
+    Vergibt freie IDs einer Tabelle, beginnend mit der kleinsten unbenutzten ID.
+
+    Die Lücken unterhalb der höchsten vergebenen ID werden als sortierte, halboffene Intervalle [Start, Ende)
+    gehalten, alle IDs ab `next_id` sind frei. Aufgebrauchte Intervalle am Anfang werden nur übersprungen und
+    erst entfernt, wenn sie die Hälfte der Listen ausmachen. Die Vergabe der kleinsten freien ID kostet damit
+    amortisiert O(1) statt O(max ID), und auch eine einzelne sehr große ID belegt nur ein Intervall statt eines
+    Eintrags je übersprungener ID. reserve und release finden das Intervall mit bisect in O(log Lücken); teilen
+    sie ein Intervall oder fügen eines ein, verschiebt das Einfügen in die Listen O(Lücken) Einträge.
+    Reservierungen sind über eine Sperre gegen gleichzeitige Zugriffe mehrerer Threads geschützt.
+
+    Attribute:
+        next_id (int): Die kleinste ID, ab der alle IDs frei sind.
+    """
+
+    def __init__(self, ids=()):
+        ids = np.asarray(ids, dtype=float)
+        ids = np.unique(ids[~np.isnan(ids)].astype(np.int64))
+        ids = ids[ids > 0]
+        self.next_id = int(ids[-1]) + 1 if len(ids) else 1
+        # Eine Lücke liegt zwischen zwei aufeinanderfolgenden belegten IDs mit Abstand > 1
+        bounds = np.concatenate(([0], ids))
+        gaps = np.flatnonzero(np.diff(bounds) > 1)
+        self._starts = (bounds[gaps] + 1).tolist()
+        self._stops = bounds[gaps + 1].tolist()
+        # Position des ersten noch nicht aufgebrauchten Intervalls
+        self._first = 0
+        self._lock = threading.Lock()
+
+    def peek(self) -> int:
+        """
+        Gibt die kleinste freie ID zurück, ohne sie zu reservieren.
+
+        Returns:
+            int: Die kleinste freie ID.
+        """
+        with self._lock:
+            return self._starts[self._first] if self._first < len(self._starts) else self.next_id
+
+    def allocate(self, count: int = 1) -> list:
+        """
+        Reserviert die kleinsten freien IDs.
+
+        Args:
+            count (int, optional): Die Anzahl der benötigten IDs. Standard ist 1.
+
+        Returns:
+            list: Die reservierten IDs in aufsteigender Reihenfolge.
+        """
+        allocated = []
+        with self._lock:
+            while len(allocated) < count and self._first < len(self._starts):
+                start, stop = self._starts[self._first], self._stops[self._first]
+                end = min(stop, start + count - len(allocated))
+                allocated.extend(range(start, end))
+                if end < stop:
+                    self._starts[self._first] = end
+                else:
+                    self._first += 1
+            if self._first * 2 > len(self._starts):
+                del self._starts[:self._first], self._stops[:self._first]
+                self._first = 0
+            missing = count - len(allocated)
+            if missing > 0:
+                allocated.extend(range(self.next_id, self.next_id + missing))
+                self.next_id += missing
+        return allocated
+
+    def reserve(self, id: int):
+        """
+        Markiert eine explizit vergebene ID als belegt.
+
+        Args:
+            id (int): Die belegte ID.
+        """
+        id = int(id)
+        if id <= 0:
+            return
+        with self._lock:
+            if id >= self.next_id:
+                if id > self.next_id:
+                    self._add(self.next_id, id)
+                self.next_id = id + 1
+                return
+            k = self._interval(id)
+            if k is None:
+                return
+            start, stop = self._starts[k], self._stops[k]
+            if start == id and stop == id + 1:
+                del self._starts[k], self._stops[k]
+            elif start == id:
+                self._starts[k] = id + 1
+            elif stop == id + 1:
+                self._stops[k] = id
+            else:
+                # Das Intervall wird an der ID geteilt
+                self._stops[k] = id
+                self._starts.insert(k + 1, id + 1)
+                self._stops.insert(k + 1, stop)
+
+    def release(self, id: int):
+        """
+        Gibt eine ID wieder frei, z. B. nachdem alle Zeilen mit dieser ID gelöscht wurden.
+
+        Args:
+            id (int): Die freigegebene ID.
+        """
+        id = int(id)
+        if id <= 0:
+            return
+        with self._lock:
+            if id < self.next_id and self._interval(id) is None:
+                self._add(id, id + 1)
+
+    def _interval(self, id: int):
+        """
+        Gibt die Position des Intervalls zurück, das die ID enthält, oder None, wenn die ID belegt ist.
+        """
+        k = bisect.bisect_right(self._starts, id, self._first) - 1
+        return k if k >= self._first and id < self._stops[k] else None
+
+    def _add(self, start: int, stop: int):
+        """
+        Fügt das freie Intervall [start, stop) ein und verbindet es mit angrenzenden Intervallen.
+        """
+        k = bisect.bisect_left(self._starts, start, self._first)
+        if k < len(self._starts) and self._starts[k] == stop:
+            stop = self._stops[k]
+            del self._starts[k], self._stops[k]
+        if k > self._first and self._stops[k - 1] == start:
+            self._stops[k - 1] = stop
+        else:
+            self._starts.insert(k, start)
+            self._stops.insert(k, stop)
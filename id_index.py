@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+
+class ClIdIndex:
+    """
+    Ein Hash-Index über die Spalte 'ID' eines DataFrames.
+
+    Der Index ordnet jeder ID die Positionen (iloc) ihrer Zeilen zu. Bei Tabellen mit eindeutiger ID
+    (z. B. mitglieder.csv) gehört zu jeder ID genau eine Zeile, bei anderen Tabellen (z. B. vorstand.csv)
+    eine Gruppe von Zeilen in der Reihenfolge der Datei.
+
+    Gespeichert werden die Positionen beim Aufbau (Basispositionen). Entfernte Zeilen (remove) werden nur als
+    sortierte Basispositionen vermerkt; die Positionen der folgenden Zeilen werden beim Abfragen um die Anzahl
+    der davor entfernten Zeilen verringert, statt den Index neu aufzubauen.
+
+    Attribute:
+        unique (bool): True, wenn jede ID höchstens einmal vorkommen darf.
+    """
+
+    _EMPTY = np.empty(0, dtype=np.int64)
+
+    def __init__(self, ids, unique: bool = False):
+        self.unique = unique
+        self._removed = self._EMPTY
+        if len(ids) == 0:
+            self._positions = {}
+        else:
+            self._positions = pd.DataFrame({'ID': ids}).groupby('ID', sort=False).indices
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, unique: bool = False):
+        """
+        Baut den Index für einen DataFrame auf.
+
+        Args:
+            df (pd.DataFrame): Der DataFrame mit der Spalte 'ID'.
+            unique (bool, optional): True, wenn die ID eindeutig sein muss.
+
+        Returns:
+            ClIdIndex: Der neue Index.
+        """
+        return cls(df['ID'].to_numpy(), unique)
+
+    def __contains__(self, id) -> bool:
+        return id in self._positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def positions(self, id) -> np.ndarray:
+        """
+        Gibt die Positionen aller Zeilen mit der angegebenen ID zurück.
+
+        Args:
+            id: Die gesuchte ID.
+
+        Returns:
+            np.ndarray: Die aufsteigend sortierten Zeilenpositionen, leer wenn die ID nicht existiert.
+        """
+        positions = self._positions.get(id, self._EMPTY)
+        if len(self._removed) and len(positions):
+            positions = positions - np.searchsorted(self._removed, positions)
+        return positions
+
+    def first(self, id):
+        """
+        Gibt die Position der ersten Zeile mit der angegebenen ID zurück.
+
+        Args:
+            id: Die gesuchte ID.
+
+        Returns:
+            int | None: Die Zeilenposition oder None, wenn die ID nicht existiert.
+        """
+        positions = self.positions(id)
+        if len(positions) == 0:
+            return None
+        return int(positions[0])
+
+    def copy(self):
+        """
+        Gibt eine Kopie des Index zurück, die unabhängig vom Original geändert werden kann.
+
+        Die Positions-Arrays werden nicht kopiert, da add, move und remove sie nur ersetzen und nie verändern.
+        """
+        clone = ClIdIndex.__new__(ClIdIndex)
+        clone.unique = self.unique
+        clone._positions = dict(self._positions)
+        clone._removed = self._removed
+        return clone
+
+    def ids(self):
+        """
+        Gibt alle IDs im Index zurück.
+        """
+        return self._positions.keys()
+
+    def add(self, id, position: int):
+        """
+        Nimmt eine neu angehängte Zeile in den Index auf.
+
+        Args:
+            id: Die ID der Zeile.
+            position (int): Die Position der Zeile. Sie muss hinter allen bisherigen Positionen der ID liegen.
+
+        Raises:
+            ValueError: Wenn der Index eindeutig ist und die ID bereits existiert.
+        """
+        position = int(self._to_base([position])[0])
+        positions = self._positions.get(id)
+        if positions is None:
+            self._positions[id] = np.array([position], dtype=np.int64)
+        elif self.unique:
+            raise ValueError(f"Die ID {id} existiert bereits.")
+        else:
+            self._positions[id] = np.append(positions, position)
+
+    def move(self, old_id, new_id, position: int):
+        """
+        Ordnet eine Zeile nach einer Änderung ihrer ID der neuen ID zu.
+
+        Args:
+            old_id: Die bisherige ID der Zeile.
+            new_id: Die neue ID der Zeile.
+            position (int): Die Position der Zeile.
+
+        Raises:
+            ValueError: Wenn der Index eindeutig ist und die neue ID bereits existiert.
+        """
+        if old_id == new_id:
+            return
+        if self.unique and new_id in self._positions:
+            raise ValueError(f"Die ID {new_id} existiert bereits.")
+        position = int(self._to_base([position])[0])
+        remaining = self._positions[old_id][self._positions[old_id] != position]
+        if len(remaining) == 0:
+            del self._positions[old_id]
+        else:
+            self._positions[old_id] = remaining
+        positions = np.append(self._positions.get(new_id, self._EMPTY), position)
+        positions.sort()
+        self._positions[new_id] = positions
+
+    def remove(self, id, positions):
+        """
+        Entfernt gelöschte Zeilen aus dem Index. Die folgenden Zeilen rücken auf, ohne dass der Index neu
+        aufgebaut wird.
+
+        Args:
+            id: Die ID der Zeilen.
+            positions: Die aktuellen Positionen der gelöschten Zeilen, die alle zu dieser ID gehören.
+        """
+        base = self._to_base(positions)
+        remaining = self._positions[id][~np.isin(self._positions[id], base)]
+        if len(remaining) == 0:
+            del self._positions[id]
+        else:
+            self._positions[id] = remaining
+        self._removed = np.union1d(self._removed, base)
+
+    def _to_base(self, positions) -> np.ndarray:
+        """
+        Rechnet aktuelle Positionen in Basispositionen um.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        if not len(self._removed):
+            return positions
+        # Die k-te entfernte Zeile liegt aktuell vor der Position removed[k] - k
+        return positions + np.searchsorted(self._removed - np.arange(len(self._removed)), positions, side='right')
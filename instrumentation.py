@@ -0,0 +1,366 @@
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+import pandas as pd
+
+# Adressen, von denen der Metrik-Endpunkt abgefragt werden darf
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+
+class ClHistogram:
+    """
+    Ein Histogramm von Dauern in Sekunden mit festen Klassengrenzen wie in Prometheus.
+
+    Attribute:
+        buckets (tuple): Die oberen Grenzen der Klassen (einschließlich), aufsteigend.
+        counts (list): Die Anzahl je Klasse, die letzte für Werte über allen Grenzen.
+        sum (float): Die Summe aller Werte.
+        count (int): Die Anzahl aller Werte.
+    """
+
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class ClTimer:
+    """
+    Misst die Dauer eines Blocks, siehe ClInstrumentation.timer. Zeilen und Bytes können im Block gezählt werden.
+    """
+
+    def __init__(self, instrumentation, name: str):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.rows = None
+        self.size = None
+        self._start = None
+
+    def count(self, rows: int = None, size: int = None):
+        """
+        Zählt Zeilen und/oder Bytes, die der Block verarbeitet hat.
+        """
+        if rows is not None:
+            self.rows = (self.rows or 0) + rows
+        if size is not None:
+            self.size = (self.size or 0) + size
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.instrumentation.observe(self.name, time.perf_counter() - self._start, self.rows, self.size)
+        return False
+
+
+class _ClNullTimer:
+    """
+    Ersatz für ClTimer bei abgeschalteter Messung, ohne Aufwand.
+    """
+
+    def count(self, rows: int = None, size: int = None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NULL_TIMER = _ClNullTimer()
+
+
+class ClInstrumentation:
+    """
+    Optionale Messung der Zeit in den einzelnen Schritten einer Anfrage.
+
+    Markierte Funktionen (timed) und Blöcke (timer) werden gemessen, wenn die Messung eingeschaltet ist; sonst
+    kostet die Markierung nur eine Abfrage. Jede Messung landet
+      - in der laufenden Anfrage: die Summen je Schritt werden als Header Server-Timing zurückgegeben und sind
+        so in den Entwicklerwerkzeugen des Browsers sichtbar,
+      - in Histogrammen und Zählern je Schritt, die render_metrics im Textformat von Prometheus ausgibt.
+    Das Rendern der Jinja-Vorlagen wird über die Signale von Flask gemessen.
+
+    Mit `slow_ms` wird ein Anteil `profile_rate` der Anfragen mit cProfile aufgezeichnet; dauert eine davon
+    mindestens `slow_ms` Millisekunden, wird das Profil in `profile_dir` gespeichert (auswertbar z. B. mit
+    `python -m pstats` oder snakeviz). Es wird immer nur eine Anfrage gleichzeitig aufgezeichnet.
+
+    Eingestellt wird über Umgebungsvariablen (siehe from_env):
+        MEIN_VEREIN_INSTRUMENTATION=1        Messung einschalten
+        MEIN_VEREIN_PROFILE_SLOW_MS=500      Profile von Anfragen ab 500 ms speichern
+        MEIN_VEREIN_PROFILE_RATE=0.1         nur jede zehnte Anfrage aufzeichnen (Standard: alle)
+        MEIN_VEREIN_PROFILE_DIR=profile      Ordner der Profile
+
+    Attribute:
+        enabled (bool): Ob gemessen wird.
+        slow_ms (float): Die Dauer, ab der ein Profil gespeichert wird, oder None ohne Profile.
+        profile_dir (str): Der Ordner der Profile.
+        profile_rate (float): Der Anteil der aufgezeichneten Anfragen zwischen 0 und 1.
+    """
+
+    def __init__(self, enabled: bool = False, slow_ms: float = None, profile_dir: str = 'profile',
+                 profile_rate: float = 1.0):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.profile_dir = profile_dir
+        self.profile_rate = profile_rate
+        self._lock = threading.Lock()
+        self._operations = {}
+        self._requests = {}
+        self._counters = {}
+        self._local = threading.local()
+        self._profile_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'ClInstrumentation':
+        """
+        Erzeugt die Messung mit den Einstellungen aus den Umgebungsvariablen.
+        """
+        slow_ms = os.environ.get('MEIN_VEREIN_PROFILE_SLOW_MS')
+        return cls(enabled=os.environ.get('MEIN_VEREIN_INSTRUMENTATION', '').lower() in ('1', 'true', 'yes'),
+                   slow_ms=float(slow_ms) if slow_ms else None,
+                   profile_dir=os.environ.get('MEIN_VEREIN_PROFILE_DIR', 'profile'),
+                   profile_rate=float(os.environ.get('MEIN_VEREIN_PROFILE_RATE', '1')))
+
+    def timed(self, name: str, count=None):
+        """
+        Dekorator, der jeden Aufruf einer Funktion als Schritt `name` misst.
+
+        Args:
+            name (str): Der Name des Schritts, z. B. 'read_csv'.
+            count (optional): Eine Funktion, die aus dem Ergebnis (Zeilen, Bytes) bestimmt.
+                Standard ist count_result.
+        """
+        count = count or count_result
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                result = func(*args, **kwargs)
+                rows, size = count(result)
+                self.observe(name, time.perf_counter() - start, rows, size)
+                return result
+            return wrapper
+        return decorator
+
+    def timer(self, name: str):
+        """
+        Gibt einen Kontextmanager zurück, der die Dauer eines Blocks als Schritt `name` misst, z. B.
+            with instrumentation.timer('csv_parse') as timer:
+                df = pd.read_csv(path)
+                timer.count(rows=len(df))
+        """
+        return ClTimer(self, name) if self.enabled else _NULL_TIMER
+
+    def stream(self, name: str, chunks):
+        """
+        Zählt die Bytes einer gestreamten Antwort und misst die Dauer bis zum letzten Stück.
+        """
+        if not self.enabled:
+            return chunks
+        return self._count_stream(name, chunks)
+
+    def _count_stream(self, name: str, chunks):
+        start = time.perf_counter()
+        size = 0
+        try:
+            for chunk in chunks:
+                size += len(chunk.encode('utf-8')) if isinstance(chunk, str) else len(chunk)
+                yield chunk
+        finally:
+            self.observe(name, time.perf_counter() - start, None, size)
+
+    def observe(self, name: str, seconds: float, rows: int = None, size: int = None):
+        """
+        Vermerkt eine Messung des Schritts `name` in der laufenden Anfrage und in den Histogrammen.
+        """
+        timings = getattr(self._local, 'timings', None)
+        if timings is not None:
+            timing = timings.setdefault(name, [0.0, 0])
+            timing[0] += seconds
+            timing[1] += 1
+        with self._lock:
+            histogram = self._operations.get(name)
+            if histogram is None:
+                histogram = self._operations[name] = ClHistogram()
+            histogram.observe(seconds)
+            if rows is not None:
+                self._add('mein_verein_operation_rows_total', name, rows)
+            if size is not None:
+                self._add('mein_verein_operation_bytes_total', name, size)
+
+    def _add(self, metric: str, operation: str, value: int):
+        key = (metric, 'operation', operation)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def init_app(self, app):
+        """
+        Verbindet die Messung mit einer Flask-Anwendung: Anfragen, Vorlagen, Server-Timing und Profile.
+        """
+        from flask import before_render_template, template_rendered
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+
+    def _before_request(self):
+        if not self.enabled:
+            return
+        self._local.timings = {}
+        self._local.start = time.perf_counter()
+        self._local.profiler = None
+        if self.slow_ms is not None and random.random() < self.profile_rate \
+                and self._profile_lock.acquire(blocking=False):
+            self._local.profiler = cProfile.Profile()
+            self._local.profiler.enable()
+
+    def _after_request(self, response):
+        timings = getattr(self._local, 'timings', None)
+        if not self.enabled or timings is None:
+            return response
+        entries = []
+        for name, (seconds, calls) in timings.items():
+            desc = f';desc="{calls}x"' if calls > 1 else ''
+            entries.append(f"{name}{desc};dur={seconds * 1000:.2f}")
+        entries.append(f"total;dur={(time.perf_counter() - self._local.start) * 1000:.2f}")
+        response.headers['Server-Timing'] = ', '.join(entries)
+        if not response.is_streamed:
+            self._count_request('mein_verein_response_bytes_total', response.calculate_content_length() or 0)
+        return response
+
+    def _teardown_request(self, exc=None):
+        timings = getattr(self._local, 'timings', None)
+        if not self.enabled or timings is None:
+            return
+        seconds = time.perf_counter() - self._local.start
+        profiler = self._local.profiler
+        self._local.timings = None
+        self._local.profiler = None
+        if profiler is not None:
+            profiler.disable()
+            try:
+                if seconds * 1000 >= self.slow_ms:
+                    self._dump_profile(profiler, seconds)
+            finally:
+                self._profile_lock.release()
+        with self._lock:
+            histogram = self._requests.get(self._endpoint())
+            if histogram is None:
+                histogram = self._requests[self._endpoint()] = ClHistogram()
+            histogram.observe(seconds)
+        if self.slow_ms is not None and seconds * 1000 >= self.slow_ms:
+            self._count_request('mein_verein_slow_requests_total', 1)
+
+    def _dump_profile(self, profiler: cProfile.Profile, seconds: float):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}_{self._endpoint()}_{seconds * 1000:.0f}ms_{os.getpid()}.prof"
+        profiler.dump_stats(os.path.join(self.profile_dir, name))
+
+    def _count_request(self, metric: str, value: int):
+        key = (metric, 'endpoint', self._endpoint())
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    @staticmethod
+    def _endpoint() -> str:
+        from flask import request
+        return request.endpoint or 'unbekannt'
+
+    def _before_render(self, sender, template, context, **extra):
+        if self.enabled:
+            self._local.render_start = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        start = getattr(self._local, 'render_start', None)
+        if self.enabled and start is not None:
+            self._local.render_start = None
+            self.observe('render_template', time.perf_counter() - start)
+
+    def render_metrics(self) -> str:
+        """
+        Gibt alle Histogramme und Zähler im Textformat von Prometheus zurück.
+        """
+        lines = []
+        with self._lock:
+            for metric, label, histograms in (('mein_verein_operation_seconds', 'operation', self._operations),
+                                              ('mein_verein_request_seconds', 'endpoint', self._requests)):
+                lines.append(f"# TYPE {metric} histogram")
+                for value, histogram in sorted(histograms.items()):
+                    labels = f'{label}="{_escape(value)}"'
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {cumulative}')
+                    lines.append(f"{metric}_sum{{{labels}}} {histogram.sum!r}")
+                    lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+            metrics = sorted(set(key[0] for key in self._counters))
+            for metric in metrics:
+                lines.append(f"# TYPE {metric} counter")
+                for (name, label, value), count in sorted(self._counters.items()):
+                    if name == metric:
+                        lines.append(f'{metric}{{{label}="{_escape(value)}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def metrics_response(self, request):
+        """
+        Gibt die Antwort des Metrik-Endpunkts zurück: nur bei eingeschalteter Messung und nur von diesem Rechner.
+        """
+        from flask import Response
+        if not self.enabled:
+            return Response("Die Messung ist nicht eingeschaltet (MEIN_VEREIN_INSTRUMENTATION=1).", status=404,
+                            mimetype='text/plain')
+        if request.remote_addr not in LOCAL_ADDRESSES:
+            return Response("Die Metriken sind nur lokal abrufbar.", status=403, mimetype='text/plain')
+        return Response(self.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    def reset(self):
+        """
+        Verwirft alle Histogramme und Zähler.
+        """
+        with self._lock:
+            self._operations.clear()
+            self._requests.clear()
+            self._counters.clear()
+
+
+def count_result(result) -> tuple:
+    """
+    Bestimmt (Zeilen, Bytes) aus dem Ergebnis einer gemessenen Funktion: Zeilen eines DataFrames oder einer Liste,
+    Bytes eines Textes. Bei (Liste, Anzahl) wie von page_records zählt die Liste.
+    """
+    if isinstance(result, (pd.DataFrame, list)):
+        return len(result), None
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        return len(result[0]), None
+    if isinstance(result, str):
+        return None, len(result.encode('utf-8'))
+    return None, None
+
+
+def _escape(value: str) -> str:
+    return re.sub(r'(["\\])', r'\\\1', str(value)).replace('\n', '\\n')
+
+
+# Die gemeinsame Messung der Anwendung
+instrumentation = ClInstrumentation.from_env()
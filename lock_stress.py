@@ -0,0 +1,73 @@
+"""
+Belastungstest für die Sperren und Versionszähler von ClDataframeHelper.
+
+Mehrere Prozesse erhöhen gleichzeitig einen Zähler in derselben Zeile (optimistisch mit base_version und
+Wiederholung bei ClVersionConflictError) und fügen neue Mitglieder mit ID 0 ein. Am Ende darf keine
+Änderung verloren gegangen und keine ID doppelt vergeben sein.
+
+Aufruf: python lock_stress.py [Prozesse] [Durchläufe je Prozess]
+"""
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+
+from dataframe_helper import ClDataframeHelper
+from file_lock import ClVersionConflictError
+
+CSV_NAME = 'mitglieder.csv'
+COUNTER_ID = 1
+
+
+def worker(file_path: str, iterations: int, worker_nr: int):
+    o_helper = ClDataframeHelper(file_path)
+    conflicts = 0
+    for i in range(iterations):
+        # Zähler optimistisch erhöhen: erst die Version, dann die Daten lesen
+        while True:
+            version = o_helper.get_version(CSV_NAME)
+            status = int(o_helper.read_csv(CSV_NAME, {'ID': COUNTER_ID}).iloc[0]['Status'])
+            try:
+                o_helper.update_csv(CSV_NAME, COUNTER_ID, {'Status': status + 1}, base_version=version)
+                break
+            except ClVersionConflictError:
+                conflicts += 1
+
+        o_helper.insert_csv(CSV_NAME, [{'ID': 0, 'Vorname': f'Stress{worker_nr}', 'Nachname': str(i),
+                                        'Geburtsdatum': '01.01.2000', 'Eintrittsdatum': '01.01.2024',
+                                        'Status': 2}])
+    return conflicts
+
+
+def main(processes: int = 4, iterations: int = 50) -> bool:
+    file_path = tempfile.mkdtemp(prefix='mein_verein_stress_')
+    try:
+        shutil.copy(os.path.join('daten', CSV_NAME), file_path)
+        df_start = pd.read_csv(os.path.join(file_path, CSV_NAME))
+        status_start = int(df_start.loc[df_start['ID'] == COUNTER_ID, 'Status'].iloc[0])
+
+        with multiprocessing.Pool(processes) as pool:
+            conflicts = pool.starmap(worker, [(file_path, iterations, nr) for nr in range(processes)])
+
+        df_end = pd.read_csv(os.path.join(file_path, CSV_NAME))
+        status_end = int(df_end.loc[df_end['ID'] == COUNTER_ID, 'Status'].iloc[0])
+        inserted = df_end[df_end['Vorname'].str.startswith('Stress')]
+
+        expected = processes * iterations
+        ok = (status_end - status_start == expected and len(inserted) == expected
+              and not df_end['ID'].duplicated().any())
+        print(f"Prozesse: {processes}, Durchläufe: {iterations}, Versionskonflikte: {sum(conflicts)}")
+        print(f"Zähler: {status_end - status_start} von {expected}, eingefügt: {len(inserted)} von {expected}, "
+              f"doppelte IDs: {int(df_end['ID'].duplicated().sum())}")
+        print("OK" if ok else "FEHLER: Änderungen gingen verloren")
+        return ok
+    finally:
+        shutil.rmtree(file_path)
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    sys.exit(0 if main(*args) else 1)
@@ -1,8 +1,14 @@
 # A very simple Flask Hello World app for you to get started with...
 from flask import Flask, render_template, request
-from show_table import ClShowTable
+from data_service import ClDataService
+from instrumentation import instrumentation
 
 app = Flask(__name__)
+# Der gemeinsame Datendienst für alle Anfragen, beim Start aufgewärmt (siehe ClDataService)
+data_service = ClDataService.from_config(app.config, app.root_path)
+data_service.init_app(app)
+# Optionale Messung der Anfragen (MEIN_VEREIN_INSTRUMENTATION=1), siehe ClInstrumentation
+instrumentation.init_app(app)
 
 
 @app.route('/')
@@ -13,26 +19,66 @@ def index():
 
 @app.route('/mitglieder', methods=['GET', 'POST'])
 def mitglieder():
-    o_show_table = ClShowTable()
+    o_show_table = data_service.view()
     o_show_table.read_request(request)
-    return o_show_table.render_temp_table('mitglieder.csv')
+    return o_show_table.render_cached_table(request, 'mitglieder.csv')
 
 @app.route('/del_mitglied', methods=['GET', 'POST'])
 def del_mitglied():
-    o_show_table = ClShowTable()
+    o_show_table = data_service.view()
     o_show_table.read_request(request)
     o_show_table.delelte_id()
     return o_show_table.render_temp_table('mitglieder.csv')
 
 @app.route('/vorstand', methods=['GET', 'POST'])
 def vorstand():
-    o_show_table = ClShowTable()
+    o_show_table = data_service.view()
     o_show_table.read_request(request)
-    return o_show_table.render_temp_table('mitglieder.csv', 'vorstand.csv')
+    return o_show_table.render_cached_table(request, 'mitglieder.csv', 'vorstand.csv')
+
+@app.route('/export/mitglieder')
+def export_mitglieder():
+    o_show_table = data_service.view()
+    o_show_table.read_export_request(request)
+    return o_show_table.render_export('mitglieder.csv')
+
+@app.route('/export/vorstand')
+def export_vorstand():
+    o_show_table = data_service.view()
+    o_show_table.read_export_request(request)
+    return o_show_table.render_export('mitglieder.csv', 'vorstand.csv')
+
+@app.route('/import/mitglieder', methods=['POST'])
+def import_mitglieder():
+    o_show_table = data_service.view()
+    o_show_table.read_import_request(request)
+    return o_show_table.render_import('mitglieder.csv')
+
+@app.route('/suche')
+def suche():
+    o_show_table = data_service.view()
+    o_show_table.read_search_request(request)
+    return o_show_table.render_search()
+
+@app.route('/statistik')
+def statistik():
+    o_show_table = data_service.view()
+    o_show_table.read_statistics_request(request)
+    return o_show_table.render_statistics()
+
+@app.route('/statistik.json')
+def statistik_json():
+    o_show_table = data_service.view()
+    o_show_table.read_statistics_request(request)
+    return o_show_table.render_statistics_json()
+
+@app.route('/metrics')
+def metrics():
+    return instrumentation.metrics_response(request)
 
 @app.route('/details', methods=['GET', 'POST'])
 def details():
-    o_show_table = ClShowTable()
+    o_show_table = data_service.view()
     try:
         o_show_table.request_details(request)
         return o_show_table.render_temp_details('mitglieder.csv', 'vorstand.csv')
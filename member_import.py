@@ -0,0 +1,249 @@
+"""
+Importiert viele Mitglieder auf einmal aus einer CSV- oder JSON-Datei (siehe ClMemberImport).
+
+Aufruf: python member_import.py Datei [--ordner daten] [--backend csv|sqlite|snapshot] [--skip-invalid] [--dry-run]
+"""
+import argparse
+import io
+import json
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from dataframe_helper import ClDataframeHelper
+from storage_backend import ClStorageBackend
+from table_schema import DATE_FORMAT
+from transaction import ClTransaction
+
+# Die möglichen Formate einer Importdatei
+IMPORT_FORMATS = ('csv', 'json')
+
+
+class ClImportResult:
+    """
+    Das Ergebnis eines Imports.
+
+    Attribute:
+        rows (int): Die Anzahl der gelesenen Zeilen.
+        inserted_ids (list): Die IDs der neuen Mitglieder in der Reihenfolge der Datei.
+        updated_ids (list): Die IDs der aktualisierten Mitglieder.
+        errors (list): Die Fehler als Dictionaries mit 'Zeile' (ab 1, ohne Kopfzeile), 'Spalte' und 'Fehler'.
+        committed (bool): Ob die Änderungen geschrieben wurden.
+    """
+
+    def __init__(self, rows: int, errors: list):
+        self.rows = rows
+        self.errors = errors
+        self.inserted_ids = []
+        self.updated_ids = []
+        self.committed = False
+
+    def to_dict(self) -> dict:
+        return {'zeilen': self.rows, 'eingefuegt': len(self.inserted_ids), 'aktualisiert': len(self.updated_ids),
+                'geschrieben': self.committed, 'ids': self.inserted_ids, 'fehler': self.errors}
+
+
+class ClMemberImport:
+    """
+    Importiert Mitglieder in einem Schritt: alle Zeilen werden gemeinsam geprüft und in einer einzigen
+    Transaktion geschrieben, die Tabelle wird also einmal gelesen und einmal geschrieben.
+
+    Jede Zeile hat die Spalten Vorname, Nachname, Geburtsdatum, Eintrittsdatum und Status, optional ID. Zeilen
+    ohne ID (leer oder 0) sind neue Mitglieder und erhalten ihre IDs in einem Durchgang; Zeilen mit ID
+    aktualisieren das vorhandene Mitglied.
+
+    Geprüft wird spaltenweise für alle Zeilen zugleich:
+        - Vor- und Nachname sind nicht leer,
+        - Geburts- und Eintrittsdatum sind gültige Daten im Format DATE_FORMAT und liegen nicht in der Zukunft,
+          der Eintritt liegt nicht vor der Geburt,
+        - Status ist eine ganze Zahl ab 1,
+        - eine ID ist eine ganze Zahl, kommt in der Datei nur einmal vor und existiert in der Tabelle.
+    Enthält eine Zeile Fehler, wird ohne `skip_invalid` nichts geschrieben; mit `skip_invalid` werden nur die
+    fehlerfreien Zeilen geschrieben. Die Fehler werden je Zeile und Spalte gemeldet.
+
+    Attribute:
+        backend (ClStorageBackend): Die Datenablage.
+        csv_name (str): Die Tabelle der Mitglieder.
+    """
+
+    COLUMNS = ('ID', 'Vorname', 'Nachname', 'Geburtsdatum', 'Eintrittsdatum', 'Status')
+    REQUIRED_COLUMNS = ('Vorname', 'Nachname', 'Geburtsdatum', 'Eintrittsdatum', 'Status')
+
+    def __init__(self, backend: ClStorageBackend, csv_name: str = 'mitglieder.csv'):
+        self.backend = backend
+        self.csv_name = csv_name
+
+    @classmethod
+    def read(cls, data, import_format: str = 'csv') -> pd.DataFrame:
+        """
+        Liest eine Importdatei. Alle Werte bleiben Text, damit die Prüfung jede Angabe so sieht, wie sie in der
+        Datei steht; fehlende Werte werden zu ''.
+
+        Args:
+            data (bytes | str): Der Inhalt der Datei.
+            import_format (str, optional): 'csv' oder 'json' (eine Liste von Objekten). Standard ist 'csv'.
+
+        Raises:
+            ValueError: Wenn das Format ungültig ist, die Datei sich nicht lesen lässt oder Spalten fehlen.
+        """
+        if isinstance(data, bytes):
+            data = data.decode('utf-8-sig')
+        if import_format == 'csv':
+            try:
+                df = pd.read_csv(io.StringIO(data), dtype=str, keep_default_na=False, skipinitialspace=True)
+            except pd.errors.EmptyDataError:
+                df = pd.DataFrame(columns=list(cls.REQUIRED_COLUMNS))
+        elif import_format == 'json':
+            try:
+                records = json.loads(data or '[]')
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Die JSON-Datei ist ungültig: {e}")
+            if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+                raise ValueError("Die JSON-Datei muss eine Liste von Objekten enthalten.")
+            df = pd.DataFrame.from_records(records, columns=list(cls.COLUMNS) if not records else None)
+            df = df.astype(object).where(df.notna(), '')
+            # Ganze Zahlen aus JSON (z. B. 2.0) wie in einer CSV-Datei schreiben
+            df = df.apply(lambda values: values.map(lambda value: str(int(value))
+                                                    if isinstance(value, float) and value.is_integer() else str(value)))
+        else:
+            raise ValueError(f"Ungültiges Importformat: {import_format}. Erlaubt sind {', '.join(IMPORT_FORMATS)}.")
+
+        missing = [column for column in cls.REQUIRED_COLUMNS if column not in df.columns]
+        if missing:
+            raise ValueError(f"Es fehlen die Spalten {', '.join(missing)}.")
+        unknown = [column for column in df.columns if column not in cls.COLUMNS]
+        if unknown:
+            raise ValueError(f"Unbekannte Spalten: {', '.join(map(str, unknown))}.")
+        if 'ID' not in df.columns:
+            df['ID'] = ''
+        return df[list(cls.COLUMNS)].reset_index(drop=True)
+
+    def validate(self, df: pd.DataFrame):
+        """
+        Prüft alle Zeilen spaltenweise.
+
+        Args:
+            df (pd.DataFrame): Die Zeilen als Text, wie read sie liefert.
+
+        Returns:
+            tuple: (DataFrame mit geprüften Werten, Liste der Fehler, boolesches Array der fehlerhaften Zeilen).
+                Im DataFrame ist ID eine Zahl (0 für neue Mitglieder), die Daten sind datetime64 und Status int.
+        """
+        today = pd.Timestamp(date.today())
+        text = {column: df[column].astype(str).str.strip() for column in self.COLUMNS}
+        checks = []
+        for column in ('Vorname', 'Nachname'):
+            checks.append((text[column] == '', column, "darf nicht leer sein"))
+
+        dates = {}
+        for column in ('Geburtsdatum', 'Eintrittsdatum'):
+            dates[column] = pd.to_datetime(text[column], format=DATE_FORMAT, errors='coerce')
+            checks.append((dates[column].isna(), column, f"ist kein gültiges Datum ({DATE_FORMAT})"))
+            checks.append((dates[column] > today, column, "liegt in der Zukunft"))
+        checks.append((dates['Eintrittsdatum'] < dates['Geburtsdatum'], 'Eintrittsdatum', "liegt vor der Geburt"))
+
+        status = pd.to_numeric(text['Status'], errors='coerce')
+        checks.append((status.isna() | (status % 1 != 0) | (status < 1), 'Status', "muss eine ganze Zahl ab 1 sein"))
+
+        ids = pd.to_numeric(text['ID'].replace('', '0'), errors='coerce')
+        invalid_id = ids.isna() | (ids % 1 != 0) | (ids < 0)
+        checks.append((invalid_id, 'ID', "muss eine ganze Zahl sein"))
+        ids = ids.where(~invalid_id, 0).astype(np.int64)
+        given = ids != 0
+        checks.append((given & ids.duplicated(keep=False), 'ID', "kommt in der Datei mehrfach vor"))
+        if given.any():
+            known = self.backend.read(self.csv_name, [('ID', 'in', sorted(set(ids[given].tolist())))])['ID']
+            checks.append((given & ~ids.isin(known), 'ID', "existiert nicht"))
+
+        errors = []
+        invalid = np.zeros(len(df), dtype=bool)
+        for mask, column, message in checks:
+            mask = mask.to_numpy(dtype=bool, na_value=False)
+            invalid |= mask
+            errors.extend({'Zeile': int(row) + 1, 'Spalte': column, 'Fehler': f"{column} {message}"}
+                          for row in np.flatnonzero(mask))
+        errors.sort(key=lambda error: (error['Zeile'], self.COLUMNS.index(error['Spalte'])))
+
+        df_valid = pd.DataFrame({'ID': ids, 'Vorname': text['Vorname'], 'Nachname': text['Nachname'],
+                                 'Geburtsdatum': dates['Geburtsdatum'], 'Eintrittsdatum': dates['Eintrittsdatum'],
+                                 'Status': status.where(~invalid, 0).astype(np.int64)})
+        return df_valid, errors, invalid
+
+    def run(self, df: pd.DataFrame, skip_invalid: bool = False, dry_run: bool = False,
+            base_version: int = None) -> ClImportResult:
+        """
+        Prüft die Zeilen und schreibt neue und geänderte Mitglieder in einer Transaktion.
+
+        Args:
+            df (pd.DataFrame): Die Zeilen, wie read sie liefert.
+            skip_invalid (bool, optional): Fehlerhafte Zeilen überspringen statt nichts zu schreiben.
+            dry_run (bool, optional): Nur prüfen, nichts schreiben.
+            base_version (int, optional): Die erwartete Version der Tabelle (siehe get_version).
+
+        Returns:
+            ClImportResult: Das Ergebnis mit den neuen IDs und den Fehlern.
+
+        Raises:
+            ClVersionConflictError: Wenn `base_version` angegeben ist und die Tabelle inzwischen geändert wurde.
+        """
+        df_valid, errors, invalid = self.validate(df)
+        result = ClImportResult(len(df), errors)
+        if dry_run or (errors and not skip_invalid):
+            return result
+
+        df_valid = df_valid[~invalid]
+        for column in ('Geburtsdatum', 'Eintrittsdatum'):
+            df_valid[column] = df_valid[column].dt.strftime(DATE_FORMAT)
+        is_new = (df_valid['ID'] == 0).to_numpy()
+        rows_new = df_valid[is_new].to_dict('records')
+        rows_update = df_valid[~is_new].to_dict('records')
+
+        base_versions = {self.csv_name: base_version} if base_version is not None else None
+        with ClTransaction(self.backend, base_versions) as transaction:
+            if rows_new:
+                transaction.insert(self.csv_name, rows_new)
+            if rows_update:
+                transaction.update_rows(self.csv_name, rows_update)
+        # insert trägt die neuen IDs in die Zeilen ein
+        result.inserted_ids = [int(row['ID']) for row in rows_new]
+        result.updated_ids = [int(row['ID']) for row in rows_update]
+        result.committed = bool(rows_new or rows_update)
+        return result
+
+
+def main(args: list) -> bool:
+    parser = argparse.ArgumentParser(description="Importiert Mitglieder aus einer CSV- oder JSON-Datei.")
+    parser.add_argument('datei')
+    parser.add_argument('--ordner', default='daten')
+    parser.add_argument('--backend', choices=('csv', 'sqlite', 'snapshot'), default=None)
+    parser.add_argument('--skip-invalid', action='store_true', help="fehlerhafte Zeilen überspringen")
+    parser.add_argument('--dry-run', action='store_true', help="nur prüfen, nichts schreiben")
+    options = parser.parse_args(args)
+
+    import_format = 'json' if options.datei.lower().endswith('.json') else 'csv'
+    with open(options.datei, 'rb') as f:
+        data = f.read()
+    start = time.perf_counter()
+    o_import = ClMemberImport(ClDataframeHelper(options.ordner, backend=options.backend).backend)
+    try:
+        result = o_import.run(ClMemberImport.read(data, import_format), options.skip_invalid, options.dry_run)
+    except ValueError as e:
+        print("Fehler:", e)
+        return False
+    seconds = time.perf_counter() - start
+
+    for error in result.errors[:50]:
+        print(f"Zeile {error['Zeile']}: {error['Fehler']}")
+    if len(result.errors) > 50:
+        print(f"... und {len(result.errors) - 50} weitere Fehler")
+    print(f"{result.rows} Zeilen in {seconds:.2f} s ({result.rows / max(seconds, 1e-9):.0f} Zeilen/s): "
+          f"{len(result.inserted_ids)} eingefügt, {len(result.updated_ids)} aktualisiert, "
+          f"{len(result.errors)} Fehler, {'geschrieben' if result.committed else 'nichts geschrieben'}")
+    return not result.errors or options.skip_invalid
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(sys.argv[1:]) else 1)
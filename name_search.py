@@ -0,0 +1,244 @@
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from functools import lru_cache
+
+import pandas as pd
+
+from change_log import ClChangeLog, shared_change_log
+from storage_backend import ClStorageBackend
+
+# Umlaute werden wie üblich umschrieben (Müller ≈ Mueller), ß wird zu ss
+_UMLAUTS = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+# Zusätzlich indizierte Schreibweise ohne e (Müller ≈ Muller)
+_UMLAUTS_SHORT = str.maketrans({'ä': 'a', 'ö': 'o', 'ü': 'u', 'ß': 'ss'})
+# Namen werden an Leerzeichen, Bindestrichen und Apostrophen in Wörter geteilt (Anna-Lena, O'Brien)
+_WORD_SEPARATORS = re.compile(r"[\s\-'’.,]+")
+# Größer als jedes Zeichen eines Wortes, begrenzt den Bereich eines Präfixes
+_PREFIX_END = '\U0010ffff'
+
+
+def fold(text: str, umlauts=_UMLAUTS) -> str:
+    """
+    Vereinheitlicht einen Text für die Suche: Kleinschreibung, Umlaute umschrieben, übrige Akzente entfernt.
+
+    Args:
+        text (str): Der Text, z. B. 'Müller'.
+        umlauts: Die Umschreibung der Umlaute. Standard ist ä -> ae.
+
+    Returns:
+        str: Der vereinheitlichte Text, z. B. 'mueller'.
+    """
+    text = text.casefold().translate(umlauts)
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def name_tokens(*names) -> tuple:
+    """
+    Gibt die Suchwörter zu den Namen eines Mitglieds zurück, auch in der Schreibweise ohne e für Umlaute.
+    Fehlende Namen werden übersprungen.
+    """
+    tokens = []
+    for name in names:
+        if isinstance(name, str):
+            tokens.extend(token for token in _single_name_tokens(name) if token not in tokens)
+    return tuple(tokens)
+
+
+@lru_cache(maxsize=65536)
+def _single_name_tokens(name: str) -> tuple:
+    # Vor- und Nachnamen wiederholen sich häufig, jeder Name wird nur einmal vereinheitlicht
+    tokens = []
+    for word in _WORD_SEPARATORS.split(name):
+        for umlauts in (_UMLAUTS, _UMLAUTS_SHORT):
+            token = fold(word, umlauts) if word else ''
+            if token and token not in tokens:
+                tokens.append(token)
+    return tuple(tokens)
+
+
+class _ClSearchState:
+    """
+    Der Stand des Suchindex für eine Tabelle.
+
+    Attribute:
+        stamp (tuple): Der Stempel der Tabelle, zu dem der Index passt.
+        buckets (dict): Die Paare (Suchwort, ID) je Länge des Suchworts, jeweils aufsteigend sortiert.
+        lengths (list): Die Längen mit Paaren, aufsteigend sortiert.
+        tokens (dict): Die Suchwörter je ID.
+        names (dict): (Vorname, Nachname) je ID.
+    """
+
+    def __init__(self, stamp: tuple):
+        self.stamp = stamp
+        self.buckets = {}
+        self.lengths = []
+        self.tokens = {}
+        self.names = {}
+
+    def add(self, id: int, first_name, last_name):
+        tokens = name_tokens(first_name, last_name)
+        self.tokens[id] = tokens
+        self.names[id] = (first_name, last_name)
+        for token in tokens:
+            bucket = self.buckets.get(len(token))
+            if bucket is None:
+                bucket = self.buckets[len(token)] = []
+                insort(self.lengths, len(token))
+            insort(bucket, (token, id))
+
+    def remove(self, id: int):
+        for token in self.tokens.pop(id, ()):
+            bucket = self.buckets.get(len(token), [])
+            position = bisect_left(bucket, (token, id))
+            if position < len(bucket) and bucket[position] == (token, id):
+                del bucket[position]
+        self.names.pop(id, None)
+
+    def prefix_ranges(self, word: str) -> list:
+        """
+        Gibt die Bereiche (Paare, Start, Ende) der Suchwörter mit dem Präfix `word` zurück, nach Länge sortiert.
+        """
+        ranges = []
+        for length in self.lengths[bisect_left(self.lengths, len(word)):]:
+            bucket = self.buckets[length]
+            start = bisect_left(bucket, (word,))
+            stop = bisect_left(bucket, (word + _PREFIX_END,), start)
+            if start < stop:
+                ranges.append((bucket, start, stop))
+        return ranges
+
+
+class ClNameSearch:
+    """
+    Ein Suchindex über Vor- und Nachnamen für die Suche nach Präfixen (z. B. für eine Type-ahead-Suche).
+
+    Jedes Wort der Namen wird vereinheitlicht (siehe fold) und als Paar (Suchwort, ID) in eine sortierte Liste
+    je Wortlänge eingetragen. Die Treffer eines Präfixes liegen in jeder Liste zusammenhängend und werden per
+    Binärsuche gefunden. Bei mehreren Suchwörtern muss jedes ein Wort des Namens beginnen; durchsucht werden
+    die Bereiche des Suchworts mit den wenigsten Treffern. Die Treffer sind nach dem getroffenen Wort sortiert:
+    zuerst vollständige Wörter, dann kürzere vor längeren Ergänzungen, bei gleicher Länge alphabetisch und nach
+    ID. Da die Listen in dieser Reihenfolge durchlaufen werden, endet die Suche nach `limit` Treffern, auch wenn
+    ein kurzes Präfix sehr viele Namen trifft.
+
+    Wie die materialisierten Sichten (siehe derived_columns) wird der Index nach einem Schreibvorgang nur für
+    die IDs aktualisiert, die laut Änderungsprotokoll betroffen sind. Ist der Weg zwischen altem und neuem Stand
+    nicht bekannt, wird er neu aufgebaut.
+
+    Attribute:
+        csv_name (str): Der Name der Tabelle.
+        change_log (ClChangeLog): Das Protokoll, aus dem die geänderten IDs gelesen werden.
+    """
+
+    NAME_COLUMNS = ('Vorname', 'Nachname')
+
+    def __init__(self, csv_name: str = 'mitglieder.csv', change_log: ClChangeLog = None):
+        self.csv_name = csv_name
+        self.change_log = change_log if change_log is not None else shared_change_log
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def search(self, backend: ClStorageBackend, query: str, limit: int = 10) -> list:
+        """
+        Sucht Mitglieder, deren Namen mit den Wörtern der Anfrage beginnen.
+
+        Args:
+            backend (ClStorageBackend): Die Datenablage mit der Tabelle.
+            query (str): Die Anfrage, z. B. 'mue' oder 'max schm'.
+            limit (int, optional): Die höchste Anzahl an Treffern. Standard ist 10.
+
+        Returns:
+            list: Die Treffer als Dictionaries mit 'ID', 'Vorname' und 'Nachname' in der Reihenfolge des Rangs.
+        """
+        words = [fold(word) for word in _WORD_SEPARATORS.split(query) if word]
+        words = [word for word in words if word]
+        if not words or limit <= 0:
+            return []
+        with self._lock:
+            state = self._state(backend)
+            ranges = [(state.prefix_ranges(word), word) for word in words]
+            driver_ranges, driver = min(ranges, key=lambda r: sum(stop - start for _, start, stop in r[0]))
+            others = [word for word in words if word != driver]
+
+            found = []
+            seen = set()
+            for bucket, start, stop in driver_ranges:
+                for position in range(start, stop):
+                    id = bucket[position][1]
+                    if id in seen:
+                        continue
+                    seen.add(id)
+                    tokens = state.tokens[id]
+                    if all(any(token.startswith(word) for token in tokens) for word in others):
+                        first_name, last_name = state.names[id]
+                        found.append({'ID': id, 'Vorname': first_name, 'Nachname': last_name})
+                        if len(found) >= limit:
+                            return found
+            return found
+
+    def warm(self, backend: ClStorageBackend):
+        """
+        Baut den Index für die Tabelle auf, falls er nicht zu ihrem aktuellen Stand passt (z. B. beim Start).
+        """
+        with self._lock:
+            self._state(backend)
+
+    def invalidate(self):
+        """
+        Verwirft alle Stände des Index.
+        """
+        with self._lock:
+            self._states.clear()
+
+    def _state(self, backend: ClStorageBackend) -> _ClSearchState:
+        key = backend.table_key(self.csv_name)
+        state = self._states.get(key)
+        stamp = backend.get_stamp(self.csv_name)
+        if state is not None and state.stamp == stamp:
+            return state
+        changed_ids = None
+        if state is not None:
+            changed_ids = self.change_log.changed_ids(key, state.stamp, stamp)
+        if changed_ids is None:
+            state = self._build(backend, stamp)
+        else:
+            self._refresh(backend, state, changed_ids)
+            state.stamp = stamp
+        self._states[key] = state
+        return state
+
+    def _build(self, backend: ClStorageBackend, stamp: tuple) -> _ClSearchState:
+        df = backend.read(self.csv_name)
+        state = _ClSearchState(stamp)
+        ids = [int(id) for id in df['ID']]
+        first_names = df['Vorname'].astype(object).where(df['Vorname'].notna(), None).tolist()
+        last_names = df['Nachname'].astype(object).where(df['Nachname'].notna(), None).tolist()
+        for id, first_name, last_name in zip(ids, first_names, last_names):
+            tokens = name_tokens(first_name, last_name)
+            state.tokens[id] = tokens
+            state.names[id] = (first_name, last_name)
+            for token in tokens:
+                state.buckets.setdefault(len(token), []).append((token, id))
+        for bucket in state.buckets.values():
+            bucket.sort()
+        state.lengths = sorted(state.buckets)
+        return state
+
+    def _refresh(self, backend: ClStorageBackend, state: _ClSearchState, changed_ids: set):
+        """
+        Trägt die geänderten IDs aus und mit ihrem aktuellen Namen wieder ein.
+        """
+        for id in changed_ids:
+            id = int(id)
+            state.remove(id)
+            rows = backend.get_rows_by_id(self.csv_name, id)
+            if len(rows):
+                first_name, last_name = (None if pd.isna(rows.iloc[0][column]) else rows.iloc[0][column]
+                                         for column in self.NAME_COLUMNS)
+                state.add(id, first_name, last_name)
+
+
+# Der gemeinsame Suchindex der Anwendung
+member_search = ClNameSearch('mitglieder.csv')
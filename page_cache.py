@@ -0,0 +1,106 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# Standardgrenzen des gemeinsamen Caches (256 Seiten, 32 MB), per Umgebungsvariable überschreibbar
+DEFAULT_MAX_PAGES = int(os.environ.get('MEIN_VEREIN_PAGE_CACHE_PAGES', '256'))
+DEFAULT_MAX_BYTES = int(os.environ.get('MEIN_VEREIN_PAGE_CACHE_MB', '32')) * 1024 * 1024
+# Optionale Kennung des ausgelieferten Stands, z. B. eine Versionsnummer oder ein Commit
+RELEASE = os.environ.get('MEIN_VEREIN_RELEASE', '')
+
+
+def _render_version() -> str:
+    """
+    Gibt einen Hash über die Kennung RELEASE, die Python-Module der Anwendung und alle Vorlagen zurück. Er ist in
+    allen Worker-Prozessen gleich und ändert sich nur, wenn nach einem Update anderer Code oder andere Vorlagen
+    ausgeliefert werden; ETags aus der alten Version passen dann nicht mehr.
+    """
+    digest = hashlib.sha1(RELEASE.encode('utf-8'))
+    app_path = os.path.dirname(os.path.abspath(__file__))
+    paths = [os.path.join(app_path, file_name) for file_name in sorted(os.listdir(app_path))
+             if file_name.endswith('.py')]
+    for root, dirs, files in sorted(os.walk(os.path.join(app_path, 'templates'))):
+        dirs.sort()
+        paths.extend(os.path.join(root, file_name) for file_name in sorted(files))
+    for path in paths:
+        digest.update(os.path.relpath(path, app_path).encode('utf-8'))
+        with open(path, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+_RENDER_VERSION = _render_version()
+
+
+class ClPageCache:
+    """
+    Ein prozessweiter LRU-Cache für gerenderte Seiten.
+
+    Der Schlüssel einer Seite enthält alles, wovon sie abhängt: Route, Parameter und die Stempel der gelesenen
+    Tabellen (siehe ClStorageBackend.get_stamp). Nach einer Änderung einer Tabelle passt der alte Schlüssel nicht
+    mehr; die veralteten Seiten werden nicht mehr abgefragt und mit der Zeit verdrängt.
+
+    Attribute:
+        max_pages (int): Die höchste Anzahl an Seiten.
+        max_bytes (int): Das Speicherbudget in Bytes für den HTML-Text aller Seiten.
+    """
+
+    def __init__(self, max_pages: int = DEFAULT_MAX_PAGES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def etag(key: tuple) -> str:
+        """
+        Gibt das (starke) ETag einer Seite ohne Anführungszeichen zurück. Es hängt nur vom Schlüssel und vom
+        ausgelieferten Stand ab (siehe _render_version), gleiche Schlüssel ergeben also auch in verschiedenen Worker-Prozessen dasselbe ETag.
+        """
+        return hashlib.sha1(f"{_RENDER_VERSION}{key!r}".encode('utf-8')).hexdigest()
+
+    def get(self, key: tuple):
+        """
+        Gibt den HTML-Text einer Seite zurück oder None, wenn sie nicht im Cache liegt.
+        """
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            return html
+
+    def put(self, key: tuple, html: str):
+        """
+        Legt eine Seite im Cache ab. Seiten über dem Speicherbudget werden nicht gespeichert.
+        """
+        nbytes = len(html)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = html
+            self._total_bytes += nbytes
+            while self._entries and (len(self._entries) > self.max_pages or self._total_bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self):
+        """
+        Entfernt alle Seiten aus dem Cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def _remove(self, key: tuple):
+        html = self._entries.pop(key, None)
+        if html is not None:
+            self._total_bytes -= len(html)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Der gemeinsame Cache der Anwendung
+shared_page_cache = ClPageCache()
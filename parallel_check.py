@@ -0,0 +1,61 @@
+"""
+Prüft, dass der Datendienst beim Start große Tabellen im Prozess-Pool einliest.
+
+In einem temporären Ordner werden synthetische Tabellen erzeugt (siehe synthetic_data). Dann wird eine
+Flask-Anwendung mit ClDataService.from_config angelegt und mit init_app aufgewärmt und beobachtet. Danach muss
+der Prozess-Pool gelaufen sein (siehe ClWorkerPool.process_maps), und die gelesenen Tabellen müssen denen
+eines Lesens am Stück mit einem Worker gleichen.
+
+Aufruf: python parallel_check.py [Mitglieder] [Worker]
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+
+def main(rows: int = 20000, workers: int = 4) -> bool:
+    # Anzahl der Worker und Grenzen werden beim Import gelesen, deshalb vor dem Import festlegen
+    os.environ['MEIN_VEREIN_WORKERS'] = str(workers)
+    os.environ['MEIN_VEREIN_PARALLEL_PARSE_MB'] = '0.1'
+    os.environ['MEIN_VEREIN_PARALLEL_ROWS'] = '1000'
+    import pandas as pd
+    from flask import Flask
+
+    from csv_backend import ClCsvBackend
+    from data_service import ClDataService
+    from dataframe_cache import ClDataframeCache
+    from synthetic_data import write_tables
+    from worker_pool import ClWorkerPool
+
+    file_path = tempfile.mkdtemp(prefix='mein_verein_parallel_')
+    service = None
+    try:
+        write_tables(file_path, rows)
+        app = Flask(__name__)
+        service = ClDataService.from_config({'MEIN_VEREIN_DATA_DIR': file_path})
+        service.init_app(app)
+        process_maps = service.helper.pool.process_maps
+
+        serial = ClCsvBackend(file_path, ClDataframeCache(), pool=ClWorkerPool(1))
+        equal = True
+        for csv_name in service.TABLES:
+            try:
+                pd.testing.assert_frame_equal(service.backend.read(csv_name), serial.read(csv_name))
+            except AssertionError as e:
+                equal = False
+                print(f"{csv_name} weicht vom Lesen am Stück ab: {e}")
+
+        ok = process_maps > 0 and equal
+        print(f"Mitglieder: {rows}, Worker: {workers}, Aufrufe im Prozess-Pool: {process_maps}")
+        print("OK" if ok else "FEHLER: Die Tabellen wurden nicht im Prozess-Pool gelesen")
+        return ok
+    finally:
+        if service is not None and service.watcher is not None:
+            service.watcher.stop()
+        shutil.rmtree(file_path)
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    sys.exit(0 if main(*args) else 1)
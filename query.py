@@ -0,0 +1,292 @@
+import numpy as np
+import pandas as pd
+
+from id_index import ClIdIndex
+from table_schema import DATE_FORMAT
+
+# Die Vergleichsoperatoren von ClCondition
+OPERATORS = ('==', '!=', '<', '<=', '>', '>=', 'between', 'in', 'prefix')
+
+
+class ClCondition:
+    """
+    Eine Bedingung auf eine Spalte, z. B. ClCondition('Jahre', '>=', 25).
+
+    Operatoren:
+        '==', '!=', '<', '<=', '>', '>='  Vergleich mit einem Wert
+        'between'                         Bereich (von, bis) einschließlich der Grenzen, None für eine offene Grenze
+        'in'                              einer der Werte einer Liste
+        'prefix'                          Text beginnt mit dem Wert, ohne Beachtung der Groß-/Kleinschreibung
+
+    Datumsangaben werden als Text im Format DATE_FORMAT übergeben, z. B. ClCondition('Von', 'between',
+    ('01.01.1990', '31.12.1990')). Steht in der Spalte noch Text statt Datum (z. B. in den Stücken von
+    iter_chunks), wird sie für Größenvergleiche als Datum gelesen. Fehlende Werte erfüllen nur '!='.
+
+    Attribute:
+        column (str): Der Spaltenname.
+        op (str): Der Operator.
+        value: Der Vergleichswert.
+    """
+
+    def __init__(self, column: str, op: str, value):
+        if op not in OPERATORS:
+            raise ValueError(f"Ungültiger Operator: {op}. Erlaubt sind {', '.join(OPERATORS)}.")
+        if op == 'between' and (not isinstance(value, (list, tuple)) or len(value) != 2):
+            raise ValueError("Der Operator 'between' erwartet ein Paar (von, bis).")
+        if op == 'in' and not isinstance(value, (list, tuple, set, frozenset)):
+            raise ValueError("Der Operator 'in' erwartet eine Liste von Werten.")
+        self.column = column
+        self.op = op
+        self.value = value
+
+    def key(self) -> tuple:
+        """
+        Gibt einen hashbaren Schlüssel der Bedingung zurück (z. B. für zwischengespeicherte Ergebnisse).
+        """
+        value = tuple(self.value) if isinstance(self.value, (list, tuple, set, frozenset)) else self.value
+        return self.column, self.op, value
+
+    def columns(self) -> tuple:
+        return (self.column,)
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Wertet die Bedingung für alle Zeilen aus.
+
+        Returns:
+            np.ndarray: Ein boolesches Array mit einem Eintrag je Zeile.
+        """
+        values = df[self.column]
+        op = self.op
+        if op == 'prefix':
+            text = values.astype(str) if values.dtype != object and not isinstance(values.dtype, pd.StringDtype) \
+                else values
+            return _to_mask(text.str.lower().str.startswith(str(self.value).lower()))
+        if op == 'in':
+            candidates = [_to_date(values, value) for value in self.value]
+            return _to_mask(values.isin(candidates))
+        if op in ('==', '!='):
+            value = _to_date(values, self.value)
+            return _to_mask(values == value if op == '==' else values != value)
+
+        # Größenvergleiche: Datumstext als Datum, ungeordnete Kategorien über ihre Werte vergleichen
+        if op == 'between':
+            bounds = self.value
+        else:
+            bounds = (self.value,)
+        values = _comparable(values, bounds)
+        if op == 'between':
+            low, high = (_to_date(values, bound) for bound in bounds)
+            mask = np.ones(len(values), dtype=bool)
+            if low is not None:
+                mask &= _to_mask(values >= low)
+            if high is not None:
+                mask &= _to_mask(values <= high)
+            return mask
+        value = _to_date(values, self.value)
+        if op == '<':
+            return _to_mask(values < value)
+        if op == '<=':
+            return _to_mask(values <= value)
+        if op == '>':
+            return _to_mask(values > value)
+        return _to_mask(values >= value)
+
+    def id_positions(self, id_index: ClIdIndex) -> np.ndarray:
+        """
+        Beantwortet eine Bedingung '==' oder 'in' auf die ID über den ID-Index.
+
+        Returns:
+            np.ndarray: Die aufsteigend sortierten Zeilenpositionen.
+        """
+        if self.op == '==':
+            return id_index.positions(self.value)
+        positions = [id_index.positions(value) for value in self.value]
+        if not positions:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(positions))
+
+    def __repr__(self) -> str:
+        return f"ClCondition({self.column!r}, {self.op!r}, {self.value!r})"
+
+
+class ClPeriodCondition:
+    """
+    Ein Zeitraum aus zwei Datumsspalten, der sich mit dem Bereich [start, end] überschneidet.
+    Ein fehlendes Ende bedeutet „bis heute“, z. B. für Vorstandsposten, die noch besetzt sind.
+
+    Beispiel „im Jahr 1990 im Vorstand“: ClPeriodCondition('Von', 'Bis', '01.01.1990', '31.12.1990')
+
+    Attribute:
+        column_from (str): Die Spalte mit dem Beginn.
+        column_to (str): Die Spalte mit dem Ende.
+        start: Der Beginn des Bereichs oder None.
+        end: Das Ende des Bereichs oder None.
+    """
+
+    def __init__(self, column_from: str, column_to: str, start=None, end=None):
+        self.column_from = column_from
+        self.column_to = column_to
+        self.start = start
+        self.end = end
+
+    def key(self) -> tuple:
+        return self.column_from, self.column_to, 'period', self.start, self.end
+
+    def columns(self) -> tuple:
+        return self.column_from, self.column_to
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        values_from = _comparable(df[self.column_from], (self.start, self.end))
+        values_to = _comparable(df[self.column_to], (self.start, self.end))
+        mask = np.ones(len(df), dtype=bool)
+        if self.end is not None:
+            mask &= _to_mask(values_from <= _to_date(values_from, self.end))
+        if self.start is not None:
+            mask &= _to_mask(values_to >= _to_date(values_to, self.start)) | _to_mask(values_to.isna())
+        return mask
+
+    def __repr__(self) -> str:
+        return f"ClPeriodCondition({self.column_from!r}, {self.column_to!r}, {self.start!r}, {self.end!r})"
+
+
+class ClQuery:
+    """
+    Eine Abfrage aus mehreren Bedingungen, die alle erfüllt sein müssen.
+
+    Alle Bedingungen werden zu einer einzigen booleschen Maske verknüpft, der DataFrame wird nur einmal
+    ausgewählt. Bedingungen '==' und 'in' auf die ID werden über den ID-Index beantwortet, wenn einer
+    übergeben wird; die übrigen Bedingungen werden dann nur noch für diese Zeilen ausgewertet.
+
+    Die Filterbedingungen können angegeben werden als
+        dict        {Spalte: Wert}, jeweils auf Gleichheit (die bisherige Form)
+        list        ClCondition, ClPeriodCondition oder Tupel (Spalte, Operator, Wert)
+
+    Attribute:
+        conditions (list): Die Bedingungen.
+    """
+
+    def __init__(self, filter_conditions=None):
+        if filter_conditions is None:
+            conditions = []
+        elif isinstance(filter_conditions, dict):
+            conditions = [ClCondition(column, '==', value) for column, value in filter_conditions.items()]
+        else:
+            conditions = [condition if isinstance(condition, (ClCondition, ClPeriodCondition))
+                          else ClCondition(*condition) for condition in filter_conditions]
+        self.conditions = conditions
+
+    def key(self) -> tuple:
+        return tuple(condition.key() for condition in self.conditions)
+
+    def equality(self):
+        """
+        Gibt die Bedingungen als {Spalte: Wert} zurück, wenn alle Bedingungen Gleichheiten auf verschiedene
+        Spalten sind (z. B. für eine WHERE-Klausel), sonst None.
+        """
+        equal = {condition.column: condition.value for condition in self.conditions
+                 if isinstance(condition, ClCondition) and condition.op == '=='}
+        return equal if len(equal) == len(self.conditions) else None
+
+    def uses_id_index(self) -> bool:
+        return any(self._is_id_lookup(condition) for condition in self.conditions)
+
+    @staticmethod
+    def _is_id_lookup(condition) -> bool:
+        return isinstance(condition, ClCondition) and condition.column == 'ID' and condition.op in ('==', 'in')
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Verknüpft alle Bedingungen zu einer Maske.
+
+        Raises:
+            ValueError: Wenn eine Spalte nicht im DataFrame existiert.
+        """
+        self._check_columns(df)
+        mask = np.ones(len(df), dtype=bool)
+        for condition in self.conditions:
+            mask &= condition.mask(df)
+        return mask
+
+    def select(self, df: pd.DataFrame, id_index: ClIdIndex = None) -> pd.DataFrame:
+        """
+        Gibt die Zeilen zurück, die alle Bedingungen erfüllen.
+
+        Args:
+            df (pd.DataFrame): Der DataFrame.
+            id_index (ClIdIndex, optional): Der ID-Index des DataFrames.
+
+        Returns:
+            pd.DataFrame: Die ausgewählten Zeilen als neuer DataFrame, ohne Bedingungen der DataFrame selbst.
+
+        Raises:
+            ValueError: Wenn eine Spalte nicht im DataFrame existiert.
+        """
+        if not self.conditions:
+            return df
+        self._check_columns(df)
+        conditions = self.conditions
+        positions = None
+        if id_index is not None:
+            for condition in conditions:
+                if self._is_id_lookup(condition):
+                    found = condition.id_positions(id_index)
+                    positions = found if positions is None else np.intersect1d(positions, found)
+            conditions = [condition for condition in conditions if not self._is_id_lookup(condition)]
+        if positions is not None:
+            df = df.take(positions)
+        if conditions:
+            mask = np.ones(len(df), dtype=bool)
+            for condition in conditions:
+                mask &= condition.mask(df)
+            if positions is None or not mask.all():
+                df = df.take(np.flatnonzero(mask))
+        return df
+
+    def _check_columns(self, df: pd.DataFrame):
+        for condition in self.conditions:
+            for column in condition.columns():
+                if column not in df.columns:
+                    raise ValueError(f"Spalte {column} existiert nicht im DataFrame.")
+
+
+def _to_mask(values) -> np.ndarray:
+    """
+    Wandelt ein Vergleichsergebnis in ein boolesches Array um, fehlende Werte (pd.NA) gelten als False.
+    """
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype=bool, na_value=False)
+    return np.asarray(values, dtype=bool)
+
+
+def _parse_date(value):
+    """
+    Gibt den Wert als Timestamp zurück, wenn er ein Datum im Format DATE_FORMAT ist, sonst None.
+    """
+    if isinstance(value, str):
+        parsed = pd.to_datetime(value, format=DATE_FORMAT, errors='coerce')
+        if not pd.isna(parsed):
+            return parsed
+    return None
+
+
+def _to_date(values: pd.Series, value):
+    """
+    Wandelt einen Datumstext in einen Timestamp um, wenn die Spalte Datumswerte enthält.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values) and isinstance(value, str):
+        return pd.to_datetime(value, format=DATE_FORMAT, errors='coerce')
+    return value
+
+
+def _comparable(values: pd.Series, bounds) -> pd.Series:
+    """
+    Bereitet eine Spalte für Größenvergleiche vor: Text wird als Datum gelesen, wenn mit einem Datum verglichen
+    wird, und ungeordnete Kategorien werden über ihre Werte verglichen.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype) and not values.cat.ordered:
+        values = pd.Series(np.asarray(values), index=values.index)
+    if (values.dtype == object or isinstance(values.dtype, pd.StringDtype)) \
+            and any(_parse_date(bound) is not None for bound in bounds):
+        values = pd.to_datetime(values, format=DATE_FORMAT, errors='coerce')
+    return values
@@ -1,86 +1,314 @@
-from flask import render_template, Request
-from dataframe_helper import ClDataframeHelper
+from flask import jsonify, make_response, render_template, Request, Response, stream_with_context
+from dataframe_helper import ClDataframeHelper, DEFAULT_CHUNKSIZE, EXPORT_FORMATS
+from data_service import ClDataService
+from file_lock import ClVersionConflictError
+from instrumentation import instrumentation
+from member_import import ClMemberImport, IMPORT_FORMATS
+from datetime import date, datetime
+
 import pandas as pd
-from datetime import datetime
+from pandas.api.types import is_datetime64_any_dtype
 
 
 class ClShowTable(ClDataframeHelper):
 
-    def __init__(self):
+    # Zeilen je Seite in den Tabellenansichten
+    DEFAULT_LIMIT = 100
+    MAX_LIMIT = 1000
+
+    # Zeilen je Stück beim Export und die Inhaltstypen der Exportformate
+    MAX_CHUNKSIZE = 100000
+    EXPORT_MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson', 'json': 'application/json'}
+
+    # Die Filter der Tabellenansichten: Auswahlwert -> Bedingung auf 'Jahre' (im Vorstand auf 'Gesamtjahre')
+    TABLE_FILTERS = {'25': ('==', 25), '40': ('==', 40), '25+': ('>=', 25), '40+': ('>=', 40)}
+
+    # Treffer je Anfrage der Namenssuche
+    DEFAULT_SEARCH_LIMIT = 10
+    MAX_SEARCH_LIMIT = 100
+
+    # Zeitraum der Jubiläen in Monaten und aufgelistete Jubilare in der Statistik
+    DEFAULT_JUBILEE_MONTHS = 3
+    MAX_JUBILEE_MONTHS = 120
+    DEFAULT_JUBILEE_LIMIT = 100
+    MAX_JUBILEE_LIMIT = 1000
+
+    # Die versteckten Felder der Detailseite mit den Versionen der Tabellen beim Anzeigen
+    DETAIL_VERSION_FIELDS = {'mitglieder.csv': 'version', 'vorstand.csv': 'version_vorstand'}
+
+    # Die Operatoren der Exportfilter in der URL, z. B. ?Eintrittsdatum:between=01.01.1990,31.12.1999
+    EXPORT_OPERATORS = {'eq': '==', 'ne': '!=', 'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>=',
+                        'between': 'between', 'in': 'in', 'prefix': 'prefix'}
+
+    def __init__(self, service: ClDataService = None):
         """
-        Initialize the request with the given Flask request and info string.
+        Eine Ansicht für eine Anfrage auf den gemeinsamen Datendienst (siehe ClDataService.view).
+        Ohne Datendienst wird wie bisher der Ordner 'daten' im Arbeitsverzeichnis verwendet.
         """
-        # super().__init__('/home/Werner2711/mysite/daten')
-        super().__init__('daten')  # Measurement cycle time for Read external temperature
+        if service is None:
+            service = ClDataService('daten')
+        super().__init__(service.file_path, backend=service.backend)
+        self.service = service
         self._filter = None
         self._df = None
         self._id = 0
         self._param = None
+        self._error_str = None
 
     def read_request(self, request: Request):
         self._id = int(request.args.get('id', 0))
-        self._filter = request.form.get('filter', 'k')
-        self._param = {"id": self._id, "filter": self._filter}
+        self._filter = request.values.get('filter', 'k')
+        # Blättern, Sortieren und Spaltenauswahl kommen als Query-Parameter oder aus dem Filterformular
+        limit = self._int_param(request.values.get('limit'), self.DEFAULT_LIMIT)
+        columns = request.values.get('columns', '')
+        self._param = {"id": self._id, "filter": self._filter,
+                       "page": max(self._int_param(request.values.get('page'), 1), 1),
+                       "limit": min(max(limit, 1), self.MAX_LIMIT),
+                       "sort": request.values.get('sort', ''),
+                       "columns": [column for column in columns.split(',') if column]}
+
+    def read_export_request(self, request: Request):
+        # Alle Query-Parameter außer format und chunksize sind Filter, z. B. ?Status=2 auf Gleichheit oder
+        # ?Jahre:ge=25 mit einem Operator aus EXPORT_OPERATORS
+        chunksize = self._int_param(request.args.get('chunksize'), DEFAULT_CHUNKSIZE)
+        conditions = []
+        for key, value in request.args.items():
+            if key in ('format', 'chunksize'):
+                continue
+            column, _, op = key.partition(':')
+            op = self.EXPORT_OPERATORS.get(op, op) if op else '=='
+            if op in ('between', 'in'):
+                # Die Grenzen bzw. Werte sind durch Komma getrennt, eine leere Grenze ist offen
+                value = [self._filter_value(part) if part else None for part in value.split(',')]
+            else:
+                value = self._filter_value(value)
+            conditions.append((column, op, value))
+        self._param = {"format": request.args.get('format', 'csv'),
+                       "chunksize": min(max(chunksize, 1), self.MAX_CHUNKSIZE),
+                       "filter": conditions}
+
+    def read_import_request(self, request: Request):
+        # Die Datei kommt als Formularfeld 'datei' (multipart) oder direkt als Inhalt der Anfrage
+        upload = request.files.get('datei')
+        if upload is not None:
+            data = upload.read()
+            name, mimetype = upload.filename or '', upload.mimetype or ''
+        else:
+            data = request.get_data()
+            name, mimetype = '', request.mimetype or ''
+        import_format = request.values.get('format')
+        if import_format is None:
+            import_format = 'json' if name.lower().endswith('.json') or mimetype.endswith('json') else 'csv'
+        base_version = request.values.get('version')
+        self._param = {"data": data, "format": import_format,
+                       "skip_invalid": request.values.get('skip_invalid', '') in ('1', 'true', 'on'),
+                       "dry_run": request.values.get('dry_run', '') in ('1', 'true', 'on'),
+                       "version": self._int_param(base_version, None) if base_version else None}
+
+    def read_search_request(self, request: Request):
+        limit = self._int_param(request.args.get('limit'), self.DEFAULT_SEARCH_LIMIT)
+        self._param = {"q": request.args.get('q', ''),
+                       "limit": min(max(limit, 1), self.MAX_SEARCH_LIMIT)}
+
+    def read_statistics_request(self, request: Request):
+        months = self._int_param(request.args.get('monate'), self.DEFAULT_JUBILEE_MONTHS)
+        limit = self._int_param(request.args.get('limit'), self.DEFAULT_JUBILEE_LIMIT)
+        self._param = {"months": min(max(months, 1), self.MAX_JUBILEE_MONTHS),
+                       "limit": min(max(limit, 0), self.MAX_JUBILEE_LIMIT)}
+
+    @staticmethod
+    def _int_param(value, default: int) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
+    def _form_versions(self, form) -> dict:
+        """
+        Gibt die Versionen der Tabellen aus den versteckten Feldern der Detailseite zurück (siehe
+        render_temp_details). Fehlt ein Feld, wird die Version dieser Tabelle nicht geprüft.
+        """
+        versions = {}
+        for csv_name, field in self.DETAIL_VERSION_FIELDS.items():
+            version = self._int_param(form.get(field), None)
+            if version is not None:
+                versions[csv_name] = version
+        return versions
+
+    @staticmethod
+    def _filter_value(value: str):
+        # Zahlen aus der URL mit den Zahlenspalten vergleichbar machen
+        for convert in (int, float):
+            try:
+                return convert(value)
+            except ValueError:
+                pass
+        return value
 
     def delelte_id(self):
-        self.delete_id_csv('mitglieder.csv', self._id)
-        self.delete_id_csv('vorstand.csv', self._id)
+        with self.transaction() as transaction:
+            transaction.delete_id('mitglieder.csv', self._id)
+            transaction.delete_id('vorstand.csv', self._id)
 
     def get_id(self):
         return self._id
 
+    def render_cached_table(self, request: Request, csv_name, csv_2_name=None):
+        """
+        Gibt die Tabellenansicht wie render_temp_table zurück, aber über den Seiten-Cache und mit ETag.
+
+        Der Schlüssel der Seite besteht aus Route, Parametern, den Stempeln der Tabellen und dem Datum (die Jahre
+        hängen vom heutigen Tag ab). Schickt der Browser das passende ETag in If-None-Match, wird nur 304 Not
+        Modified zurückgegeben; liegt die Seite im Cache, wird sie ohne pandas und Jinja ausgeliefert.
+        Seiten mit Fehlermeldung werden nicht gespeichert.
+        """
+        tables = (csv_name,) if csv_2_name is None else (csv_name, csv_2_name)
+        stamps = tuple(self.backend.get_stamp(table) for table in tables)
+        param = self._param
+        key = (request.endpoint, request.script_root, param['filter'], param['page'], param['limit'],
+               param['sort'], tuple(param['columns']), stamps, date.today().isoformat())
+        etag = self.service.page_cache.etag(key)
+
+        if request.method in ('GET', 'HEAD') and request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            html = self.service.page_cache.get(key)
+            if html is None:
+                html = self.render_temp_table(csv_name, csv_2_name)
+                if self._error_str is None:
+                    self.service.page_cache.put(key, html)
+            response = make_response(html)
+        response.set_etag(etag)
+        # Der Browser darf die Seite speichern, muss aber jedes Mal nachfragen, ob sie noch gilt
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    @instrumentation.timed('render_temp_table')
     def render_temp_table(self, csv_name, csv_2_name=None):
 
         page = 'show_table.html'
         call_page = "mitglieder"
         try:
-            if self._param['filter'] == '25':
-                filter_conditions = {'Jahre': 25}
-            elif self._param['filter'] == '40':
-                filter_conditions = {'Jahre': 40}
-            else:
-                filter_conditions = None
+            condition = self.TABLE_FILTERS.get(self._param['filter'])
 
-            df_mitglieder = self.read_csv(csv_name)
             if csv_2_name is not None:
                 call_page = "vorstand"
-                df_mitglieder.drop(['Geburtsdatum', 'Eintrittsdatum', 'Status'], axis=1, inplace=True)
-                df_mitglieder = self.merge_file_2(df_mitglieder, csv_2_name, filter_conditions)
+                # Bei kaltem Cache beide Tabellen gleichzeitig statt nacheinander lesen
+                self.load_tables((csv_name, csv_2_name))
+                df_mitglieder = self.merge_file_2(condition)
+            elif condition is not None:
+                # Die Jahresfilter kommen aus der materialisierten Sicht mit der Spalte 'Jahre'
+                df_mitglieder = self.service.membership_years.query(self.backend, [('Jahre',) + condition])
             else:
-                df_mitglieder["Jahre"] = (pd.to_datetime("today").year -
-                                          pd.to_datetime(df_mitglieder["Eintrittsdatum"], dayfirst=True).dt.year)
-                if filter_conditions is not None:
-                    df_mitglieder = ClDataframeHelper.filter_dataframe(df_mitglieder, filter_conditions)
-
-
-            table = df_mitglieder.to_dict('records')
+                df_mitglieder = self.service.membership_years.get(self.backend)
+
+            columns = self._param['columns']
+            if columns and call_page == "mitglieder" and 'ID' not in columns:
+                # Die ID wird für Bearbeiten und Löschen gebraucht
+                columns = ['ID'] + columns
+            table, total = self.page_records(df_mitglieder, self._param['page'], self._param['limit'],
+                                             self._param['sort'], columns)
+            self._param['total'] = total
+            self._param['pages'] = max((total + self._param['limit'] - 1) // self._param['limit'], 1)
             error_str = None
         except Exception as e:
             error_str = e
             table = False
+        self._error_str = error_str
 
         return render_template(page, call_page=call_page, table=table,
                                    error_str=error_str, param=self._param)
 
-    def merge_file_2(self, df, csv_name, filter_conditions):
+    @instrumentation.timed('merge_file_2')
+    def merge_file_2(self, condition):
 
-        df_2 = self.read_csv(csv_name)
-        # Aktuelles Datum holen
-        dt_str = datetime.now().strftime("%d.%m.%Y")
+        # Vorstand und Namen der Mitglieder kommen bereits zusammengeführt aus der materialisierten Sicht
+        if condition is not None:
+            # Der Filter auf die Jahre gilt im Vorstand für 'Gesamtjahre'
+            df_2 = self.service.board_view.query(self.backend, [('Gesamtjahre',) + condition])
+        else:
+            df_2 = self.service.board_view.get(self.backend)
+        # Aktuelles Datum holen, als Datum oder als Text je nach Datentyp der Spalte
+        if is_datetime64_any_dtype(df_2['Bis']):
+            today = pd.Timestamp(datetime.now().date())
+        else:
+            today = datetime.now().strftime("%d.%m.%Y")
         # Ersetzen von NaN-Werten in der 'Bis'-Spalte
-        df_2['Bis'].fillna(dt_str, inplace=True)
-        df_2["Jahre"] = (pd.to_datetime(df_2["Bis"], format='%d.%m.%Y').dt.year -
-                                pd.to_datetime(df_2["Von"], format='%d.%m.%Y').dt.year)
-        df_2['Gesamtjahre'] = df_2.groupby('ID')['Jahre'].transform('sum')
-        if filter_conditions is not None:
-            # Ändere den Key von 'Jahre' auf 'Gesamtjahre'
-            filter_conditions['Gesamtjahre'] = filter_conditions.pop('Jahre')
-            df_2 = ClDataframeHelper.filter_dataframe(df_2, filter_conditions)
-
-        # Beide df zusammenführen
-        merged_df = df_2.merge(df, left_on='ID', right_on='ID', how='left')
-        # Die Spaltenreihenfolge ändern
-        return merged_df[['ID', 'Vorname', 'Nachname', 'Position', 'Von', 'Bis', 'Jahre', 'Gesamtjahre']]
+        return df_2.assign(Bis=df_2['Bis'].fillna(today))
+
+    def render_search(self):
+        """
+        Gibt die Treffer der Namenssuche als JSON-Liste zurück, z. B. [{"ID": 2, "Vorname": "Max", "Nachname": "Schmidt"}].
+        """
+        return jsonify(self.service.member_search.search(self.backend, self._param['q'], self._param['limit']))
+
+    def render_statistics_json(self):
+        """
+        Gibt die Vereinsstatistik (siehe ClClubStatistics.report) als JSON zurück.
+        """
+        try:
+            report = self.service.statistics.report(self.backend, self._param['months'], self._param['limit'])
+        except FileNotFoundError as e:
+            return make_response(jsonify({'fehler': str(e)}), 404)
+        return jsonify(report)
+
+    def render_statistics(self):
+        """
+        Gibt die Vereinsstatistik als Seite zurück.
+        """
+        try:
+            report = self.service.statistics.report(self.backend, self._param['months'], self._param['limit'])
+            error_str = None
+        except Exception as e:
+            report = None
+            error_str = e
+        return render_template('statistik.html', report=report, error_str=error_str, param=self._param)
+
+    def render_import(self, csv_name: str):
+        """
+        Importiert die hochgeladenen Mitglieder (siehe ClMemberImport) und gibt das Ergebnis als JSON zurück,
+        mit Status 400 bei Fehlern in der Datei und 409, wenn die Tabelle seit der angegebenen Version geändert wurde.
+        """
+        o_import = ClMemberImport(self.backend, csv_name)
+        try:
+            if self._param['format'] not in IMPORT_FORMATS:
+                raise ValueError(f"Ungültiges Importformat: {self._param['format']}. "
+                                 f"Erlaubt sind {', '.join(IMPORT_FORMATS)}.")
+            result = o_import.run(o_import.read(self._param['data'], self._param['format']),
+                                  self._param['skip_invalid'], self._param['dry_run'], self._param['version'])
+        except ClVersionConflictError as e:
+            return make_response(jsonify({'fehler': str(e)}), 409)
+        except ValueError as e:
+            return make_response(jsonify({'fehler': str(e)}), 400)
+        status = 400 if result.errors and not self._param['skip_invalid'] else 200
+        return make_response(jsonify(result.to_dict()), status)
+
+    def render_export(self, csv_name, csv_2_name=None):
+        """
+        Streamt die Mitglieder oder die Vorstandsübersicht stückweise als CSV, NDJSON oder JSON.
+        Die Mitglieder werden stückweise aus der Ablage gelesen, die Vorstandsübersicht liegt bereits als
+        materialisierte Sicht im Speicher und wird nur stückweise umgewandelt.
+        """
+        export_format = self._param['format']
+        filter_conditions = self._param['filter'] or None
+        chunksize = self._param['chunksize']
+        try:
+            if export_format not in EXPORT_FORMATS:
+                raise ValueError(f"Ungültiges Exportformat: {export_format}. Erlaubt sind {', '.join(EXPORT_FORMATS)}.")
+            if csv_2_name is None:
+                name = csv_name.rsplit('.', 1)[0]
+                text = self.stream_csv(csv_name, filter_conditions, export_format, chunksize)
+            else:
+                name = csv_2_name.rsplit('.', 1)[0]
+                df = self.filter_dataframe(self.service.board_view.get(self.backend), filter_conditions)
+                # Mindestens ein Stück, damit auch eine leere Übersicht ihre Kopfzeile bekommt
+                chunks = (df.iloc[start:start + chunksize] for start in range(0, max(len(df), 1), chunksize))
+                text = self.format_chunks(chunks, export_format)
+        except Exception as e:
+            return Response(f"Fehler beim Export: {e}", status=400, mimetype='text/plain')
+
+        return Response(stream_with_context(text), mimetype=self.EXPORT_MIMETYPES[export_format],
+                        headers={'Content-Disposition': f'attachment; filename={name}.{export_format}'})
 
     def request_details(self, request: Request):
         action = request.args.get('action', '')
@@ -93,7 +321,6 @@ class ClShowTable(ClDataframeHelper):
                         'Geburtsdatum': request.form.get('Geburtsdatum', datetime(2000, 1, 1).strftime("%d.%m.%Y")),
                         'Eintrittsdatum': request.form.get('Eintrittsdatum', datetime.now().strftime("%d.%m.%Y")),
                         'Status': request.form.get('Status', '2')}
-            self.update_csv('mitglieder.csv',self._id,  mitglied)
 
             tab_vorstand = []
             i = 1
@@ -119,19 +346,19 @@ class ClShowTable(ClDataframeHelper):
                 # self.update_id_csv('vorstand.csv', self._id, vorstand)
                 tab_vorstand.append(vorstand)
 
-            try:
-                self.delete_id_csv('vorstand.csv', self._id)
-            except ValueError as e:
-                print(e)
-
-            if len(tab_vorstand) > 0:
-                self.insert_csv('vorstand.csv', tab_vorstand)
+            # Mitglied und Vorstandsposten werden gemeinsam geschrieben, ganz oder gar nicht. Wurde eine der
+            # Tabellen seit dem Anzeigen geändert, scheitert die Transaktion statt die Änderung zu überschreiben
+            with self.transaction(self._form_versions(request.form)) as transaction:
+                transaction.update('mitglieder.csv', self._id, mitglied)
+                transaction.delete_id('vorstand.csv', self._id)
+                if len(tab_vorstand) > 0:
+                    transaction.insert('vorstand.csv', tab_vorstand)
 
         elif action == "insert":
 
-            self._id = self.get_first_unused_id('mitglieder.csv')
+            # ID 0: insert_csv reserviert die erste freie ID atomar und trägt sie in mitglied ein
             mitglieder = []
-            mitglied = {'ID': self._id, 'Vorname': request.form.get('Vorname', 'No Name'),
+            mitglied = {'ID': 0, 'Vorname': request.form.get('Vorname', 'No Name'),
 
                         'Nachname': request.form.get('Nachname', 'No Name'),
 
@@ -143,16 +370,19 @@ class ClShowTable(ClDataframeHelper):
             mitglieder.append(mitglied)
 
             self.insert_csv('mitglieder.csv', mitglieder)
+            self._id = mitglied['ID']
 
         elif action == "del_ID":
             self._id = int(request.form.get('ID', 0))
-            self.delete_id_csv('mitglieder.csv',self._id)
-            self.delete_id_csv('vorstand.csv', self._id)
+            with self.transaction(self._form_versions(request.form)) as transaction:
+                transaction.delete_id('mitglieder.csv', self._id)
+                transaction.delete_id('vorstand.csv', self._id)
 
         elif action == "del_row":
             self._id = int(request.form.get('ID', '0'))
             row_nr = int(request.args.get('row', '0'))
-            self.delete_id_row_csv('vorstand.csv', self._id, row_nr)
+            self.delete_id_row_csv('vorstand.csv', self._id, row_nr,
+                                   base_version=self._form_versions(request.form).get('vorstand.csv'))
 
 
         else:
@@ -162,6 +392,7 @@ class ClShowTable(ClDataframeHelper):
 
     def render_temp_details(self, csv_name, csv_2_name=None):
         table_vorstand = False
+        versions = {}
         try:
             if self._id == 0:
                 table = [{'ID': 0,
@@ -173,13 +404,18 @@ class ClShowTable(ClDataframeHelper):
                           }]
                 title = "Neues Mitglied"
             else:
+                if csv_2_name is not None:
+                    self.load_tables((csv_name, csv_2_name))
+                # Die Versionen vor den Daten lesen, damit eine Änderung dazwischen beim Speichern auffällt
+                versions = {self.DETAIL_VERSION_FIELDS[name]: self.get_version(name)
+                            for name in (csv_name, csv_2_name) if name in self.DETAIL_VERSION_FIELDS}
                 table = self.read_csv(csv_name, return_format='dict', filter_conditions={"ID": self._id})
                 title = "Mitglied: " + table[0]['Vorname'] + ' ' + table[0]['Nachname'] + ' ' + 'ID=' + str(self._id)
                 if csv_2_name is not None:
                     try:
                         df = self.read_csv(csv_2_name, filter_conditions={"ID": self._id})
                         df.drop(['ID'], axis=1, inplace=True)
-                        table_vorstand = df.to_dict('records')
+                        table_vorstand = self.to_records(df)
                         # table_vorstand = self.read_csv(csv_2_name, return_format='dict', filter_conditions={"ID": self._id})
                     except:
                         pass
@@ -188,7 +424,8 @@ class ClShowTable(ClDataframeHelper):
             title = e
             table = False
 
-        return render_template('mitglied.html', title=title, table=table, table_vorstand=table_vorstand)
+        return render_template('mitglied.html', title=title, table=table, table_vorstand=table_vorstand,
+                               versions=versions)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,143 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from change_log import ClChangeLog
+from compactor import ClCompactor
+from csv_backend import ClCsvBackend
+from dataframe_cache import ClCacheEntry, ClDataframeCache
+from id_allocator import ClIdAllocator
+from id_index import ClIdIndex
+from instrumentation import instrumentation
+from table_schema import schema_for
+from worker_pool import ClWorkerPool
+
+try:
+    import pyarrow
+    import pyarrow.feather
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Mögliche Formate der Schnappschüsse
+SNAPSHOT_FORMATS = ('feather', 'parquet')
+
+
+class ClSnapshotBackend(ClCsvBackend):
+    """
+    Die Datenablage in CSV-Dateien mit binären Schnappschüssen (Feather oder Parquet) für schnelles Einlesen.
+
+    Zu jeder CSV-Datei wird neben ihr ein Schnappschuss `<csv>.feather` bzw. `<csv>.parquet` mit den Datentypen
+    des Schemas (siehe table_schema) abgelegt. Der Schnappschuss enthält den Dateistempel der CSV-Datei, aus der
+    er entstanden ist. Ein Kaltstart liest den Schnappschuss über Memory-Mapping, statt die CSV-Datei zu parsen.
+    Passt der Stempel nicht mehr, z. B. weil die CSV-Datei von Hand bearbeitet wurde, wird die CSV-Datei neu
+    eingelesen und der Schnappschuss ersetzt.
+
+    Die CSV-Dateien bleiben das Austauschformat: Alle Schreibvorgänge, Sperren, Versionen und Transaktionen
+    laufen wie in ClCsvBackend, danach wird der Schnappschuss aus dem neuen Inhalt geschrieben. Der Schnappschuss
+    ist nur ein Beschleuniger; fehlt er oder lässt er sich nicht schreiben, wird die CSV-Datei gelesen.
+
+    Wie die CSV-Datei enthält der Schnappschuss auch die gelöschten Zeilen, die Grabsteine werden nach dem Lesen
+    angewendet. Solange eine Tabelle Grabsteine hat, wird der Schnappschuss deshalb nicht aus dem Cache
+    geschrieben; das übernimmt das Verdichten (siehe ClCompactor).
+
+    Benötigt pyarrow.
+
+    Attribute:
+        snapshot_format (str): 'feather' oder 'parquet'.
+    """
+
+    # Schlüssel des Dateistempels der CSV-Datei in den Metadaten des Schnappschusses
+    STAMP_KEY = b'mein_verein.csv_stamp'
+
+    def __init__(self, file_path: str, cache: ClDataframeCache = None, change_log: ClChangeLog = None,
+                 snapshot_format: str = 'feather', compactor: ClCompactor = None,
+                 pool: ClWorkerPool = None):
+        if pyarrow is None:
+            raise ImportError("Für die Ablage 'snapshot' wird pyarrow benötigt.")
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Ungültiges Format: {snapshot_format}. Erlaubt sind {', '.join(SNAPSHOT_FORMATS)}.")
+        super().__init__(file_path, cache, change_log, compactor, pool)
+        self.snapshot_format = snapshot_format
+
+    def snapshot_path(self, path_csv: str) -> str:
+        """
+        Gibt den Pfad des Schnappschusses einer CSV-Datei zurück.
+        """
+        return path_csv + '.' + self.snapshot_format
+
+    def _read_entry(self, path: str) -> ClCacheEntry:
+        ClCsvBackend._recover_append(path)
+        stamp = self._stamp(path)
+        csv_stamp = ClDataframeCache.file_stamp(path)
+        with instrumentation.timer('snapshot_read'):
+            df = self._read_snapshot(path, csv_stamp)
+        if df is None:
+            df = schema_for(path).apply(self._parse_csv(path))
+            self._write_snapshot(path, df, csv_stamp)
+        df, tombstones = self._drop_tombstones(path, df)
+        return self.cache.put(path, df, stamp, tombstones=tombstones)
+
+    def _publish(self, path_csv: str, df: pd.DataFrame, changed_ids, stamp_before: tuple,
+                 id_index: ClIdIndex = None, id_allocator: ClIdAllocator = None, tombstones: np.ndarray = None,
+                 nbytes: int = None):
+        super()._publish(path_csv, df, changed_ids, stamp_before, id_index, id_allocator, tombstones, nbytes)
+        if tombstones is None or not len(tombstones):
+            self._write_snapshot(path_csv, df, ClDataframeCache.file_stamp(path_csv))
+
+    def _read_snapshot(self, path_csv: str, csv_stamp: tuple):
+        """
+        Liest den Schnappschuss einer CSV-Datei.
+
+        Returns:
+            pd.DataFrame | None: Der Inhalt oder None, wenn der Schnappschuss fehlt, beschädigt ist oder nicht
+                zum Dateistempel `csv_stamp` der CSV-Datei passt.
+        """
+        path_snapshot = self.snapshot_path(path_csv)
+        try:
+            if self.snapshot_format == 'feather':
+                table = pyarrow.feather.read_table(path_snapshot, memory_map=True)
+            else:
+                table = pyarrow.parquet.read_table(path_snapshot, memory_map=True)
+        except (OSError, pyarrow.ArrowException):
+            return None
+        metadata = table.schema.metadata or {}
+        if json.loads(metadata.get(self.STAMP_KEY, b'null')) != list(csv_stamp):
+            return None
+        # to_pandas kopiert in eigene Blöcke, die Abbildung der Datei wird danach freigegeben. So kann der
+        # Schnappschuss ersetzt werden, während der DataFrame im Cache liegt (auch unter Windows).
+        # Texte werden direkt als Arrow-Strings übernommen statt einzeln in Python-Objekte umgewandelt. Die
+        # pandas-Metadaten würden sie als string[python] anlegen; Kategorien und Datum ergeben sich aus den
+        # Arrow-Typen. Texte außerhalb der Namensspalten bleiben wie nach read_csv Python-Objekte.
+        schema = schema_for(path_csv)
+        df = table.to_pandas(types_mapper={pyarrow.string(): pd.StringDtype('pyarrow')}.get, ignore_metadata=True)
+        for column in df.columns:
+            if isinstance(df[column].dtype, pd.StringDtype) and schema.columns.get(column) != 'name':
+                df[column] = df[column].to_numpy(dtype=object, na_value=np.nan)
+        return schema.apply(df)
+
+    def _write_snapshot(self, path_csv: str, df: pd.DataFrame, csv_stamp: tuple):
+        """
+        Schreibt den Schnappschuss einer CSV-Datei atomar über eine temporäre Datei.
+        """
+        path_snapshot = self.snapshot_path(path_csv)
+        fd, path_temp = tempfile.mkstemp(prefix=os.path.basename(path_snapshot) + '.', suffix='.tmp',
+                                         dir=os.path.dirname(os.path.abspath(path_snapshot)))
+        os.close(fd)
+        try:
+            table = pyarrow.Table.from_pandas(df, preserve_index=False)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                                   self.STAMP_KEY: json.dumps(list(csv_stamp)).encode()})
+            if self.snapshot_format == 'feather':
+                # Unkomprimiert, damit die Datei beim Lesen direkt abgebildet werden kann
+                pyarrow.feather.write_feather(table, path_temp, compression='uncompressed')
+            else:
+                pyarrow.parquet.write_table(table, path_temp)
+            os.replace(path_temp, path_snapshot)
+        except (OSError, pyarrow.ArrowException):
+            # Ohne Schnappschuss wird beim nächsten Kaltstart die CSV-Datei gelesen
+            if os.path.exists(path_temp):
+                os.remove(path_temp)
@@ -0,0 +1,67 @@
+"""
+Vergleicht die Dauer eines Kaltstarts (erstes Einlesen einer Tabelle) aus der CSV-Datei und aus den
+Schnappschüssen von ClSnapshotBackend.
+
+Für jede Zeilenzahl wird eine synthetische Mitgliedertabelle (siehe synthetic_data) in einem temporären Ordner
+erzeugt. Jede Messung verwendet einen leeren Cache; die Dateien liegen dabei bereits im Dateisystem-Cache des
+Betriebssystems.
+Ohne pyarrow wird nur die CSV-Datei gemessen.
+
+Aufruf: python snapshot_benchmark.py [Zeilenzahlen ...]   (Standard: 1000 100000 1000000)
+"""
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from csv_backend import ClCsvBackend
+from dataframe_cache import ClDataframeCache
+from snapshot_backend import SNAPSHOT_FORMATS, ClSnapshotBackend, pyarrow
+from synthetic_data import generate_members
+
+CSV_NAME = 'mitglieder.csv'
+REPEAT = 5
+
+
+def cold_load(make_backend) -> float:
+    """
+    Gibt den Median der Dauer in Sekunden zurück, mit der eine neue Ablage mit leerem Cache die Tabelle liest.
+    """
+    durations = []
+    for _ in range(REPEAT):
+        backend = make_backend(ClDataframeCache())
+        start = time.perf_counter()
+        backend.read(CSV_NAME)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def main(row_counts: list) -> bool:
+    formats = SNAPSHOT_FORMATS if pyarrow is not None else ()
+    print(f"{'Zeilen':>10} {'CSV (ms)':>10} {'MB':>7}" + ''.join(f" {f + ' (ms)':>15} {'MB':>7}" for f in formats))
+    for rows in row_counts:
+        file_path = tempfile.mkdtemp(prefix='mein_verein_snapshot_')
+        try:
+            path_csv = os.path.join(file_path, CSV_NAME)
+            generate_members(rows).to_csv(path_csv, index=False)
+            line = f"{rows:>10} {cold_load(lambda cache: ClCsvBackend(file_path, cache)) * 1000:>10.1f}"
+            line += f" {os.path.getsize(path_csv) / 2 ** 20:>7.1f}"
+            for snapshot_format in formats:
+                def make_backend(cache):
+                    return ClSnapshotBackend(file_path, cache, snapshot_format=snapshot_format)
+                # Der erste Zugriff liest die CSV-Datei und legt den Schnappschuss an
+                make_backend(ClDataframeCache()).read(CSV_NAME)
+                line += f" {cold_load(make_backend) * 1000:>15.1f}"
+                line += f" {os.path.getsize(path_csv + '.' + snapshot_format) / 2 ** 20:>7.1f}"
+            print(line)
+        finally:
+            shutil.rmtree(file_path)
+    if pyarrow is None:
+        print("pyarrow ist nicht installiert, die Schnappschüsse wurden nicht gemessen.")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main([int(arg) for arg in sys.argv[1:]] or [1000, 100000, 1000000]) else 1)
@@ -0,0 +1,462 @@
+import glob
+import os
+import re
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from change_log import ClChangeLog, shared_change_log
+from dataframe_cache import ClDataframeCache, shared_cache
+from file_lock import ClVersionConflictError
+from id_allocator import ClIdAllocator
+from query import ClQuery
+from storage_backend import ClStorageBackend
+from table_schema import schema_for
+
+# numpy-Ganzzahlen aus pandas direkt als Parameter binden
+sqlite3.register_adapter(np.int64, int)
+sqlite3.register_adapter(np.int32, int)
+
+
+class ClSqliteBackend(ClStorageBackend):
+    """
+    Die Datenablage in einer SQLite-Datenbank, eine Tabelle je CSV-Datei ('mitglieder.csv' -> mitglieder).
+
+    Die Datenbank läuft im WAL-Modus, damit Leser und ein Schreiber sich nicht blockieren. Jede Tabelle mit
+    Spalte ID hat einen Index auf ID (eindeutig für mitglieder), einzelne Zeilen werden direkt per UPDATE und
+    DELETE geändert. Alle Abfragen sind parametrisiert und werden von sqlite3 als Prepared Statements
+    zwischengespeichert. Die Reihenfolge der Zeilen entspricht der rowid, also der Reihenfolge der CSV-Datei.
+    Die Versionszähler der Tabellen stehen in der Tabelle _version und werden in derselben Transaktion wie die
+    Änderung erhöht. Nach dem Commit wird der Schreibvorgang mit den betroffenen IDs im Änderungsprotokoll
+    vermerkt.
+
+    Attribute:
+        db_path (str): Der Pfad der Datenbankdatei.
+        cache (ClDataframeCache): Der Cache für vollständig gelesene Tabellen, validiert über die Version.
+        change_log (ClChangeLog): Das Protokoll der Schreibvorgänge.
+    """
+
+    DEFAULT_DB_NAME = 'mein_verein.db'
+
+    def __init__(self, db_path: str, cache: ClDataframeCache = None, change_log: ClChangeLog = None):
+        if not db_path:
+            raise ValueError("db_path darf nicht leer sein.")
+        self.db_path = db_path
+        self.cache = cache if cache is not None else shared_cache
+        self.change_log = change_log if change_log is not None else shared_change_log
+        self._local = threading.local()
+        self._allocators = {}
+        self._allocators_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Gibt die Verbindung des aktuellen Threads zurück und öffnet sie beim ersten Zugriff.
+        """
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            if not os.path.exists(self.db_path):
+                raise FileNotFoundError(f"Die Datenbank {self.db_path} existiert nicht.")
+            con = sqlite3.connect(self.db_path, isolation_level=None, timeout=30, cached_statements=256)
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute('PRAGMA synchronous=NORMAL')
+            self._local.con = con
+        return con
+
+    @contextmanager
+    def _transaction(self, base_versions: dict):
+        """
+        Führt den Block in einer Schreibtransaktion aus, prüft die Basisversionen und erhöht danach die Versionen.
+
+        Args:
+            base_versions (dict): Die beteiligten Tabellen mit ihrer erwarteten Version (None: nicht prüfen).
+
+        Der Block bekommt die Verbindung und je Tabelle eine Menge, in die er die IDs der geänderten Zeilen einträgt.
+        """
+        con = self._connection()
+        # Veraltete Basisversionen scheitern sofort, nicht erst nach dem Warten auf die Schreibsperre
+        self._check_versions(con, base_versions)
+        con.execute('BEGIN IMMEDIATE')
+        changed = {table: set() for table in base_versions}
+        try:
+            versions = self._check_versions(con, base_versions)
+            yield con, changed
+            for table in base_versions:
+                con.execute('UPDATE _version SET version = version + 1 WHERE name = ?', (table,))
+            con.execute('COMMIT')
+        except BaseException:
+            con.execute('ROLLBACK')
+            raise
+        finally:
+            # Reservierte IDs gelten nur bis zum Ende der Transaktion, die ID-Vergabe wird neu aufgebaut
+            with self._allocators_lock:
+                for table in base_versions:
+                    self._allocators.pop(table, None)
+        for table, version in versions.items():
+            self.change_log.record(self._key(table), (version,), (version + 1,), changed[table])
+
+    def _check_versions(self, con: sqlite3.Connection, base_versions: dict) -> dict:
+        """
+        Gibt die aktuellen Versionen der Tabellen zurück.
+
+        Raises:
+            ClVersionConflictError: Wenn eine Version von ihrer Basisversion abweicht.
+        """
+        versions = {}
+        for table, base_version in base_versions.items():
+            versions[table] = self._read_version(con, table)
+            if base_version is not None and versions[table] != int(base_version):
+                raise ClVersionConflictError(
+                    f"Die Daten wurden zwischenzeitlich geändert (Version {versions[table]} statt {base_version}).")
+        return versions
+
+    def _key(self, table: str) -> str:
+        return f"{os.path.abspath(self.db_path)}::{table}"
+
+    @staticmethod
+    def table_name(csv_name: str) -> str:
+        """
+        Leitet den Tabellennamen aus dem Namen der CSV-Datei ab.
+
+        Raises:
+            ValueError: Wenn der Name kein gültiger Tabellenname ist.
+        """
+        table = os.path.splitext(os.path.basename(csv_name))[0]
+        if not re.fullmatch(r'[A-Za-z_]\w*', table):
+            raise ValueError(f"Ungültiger Tabellenname: {table}.")
+        return table
+
+    def _columns(self, con: sqlite3.Connection, table: str) -> list:
+        columns = [row[1] for row in con.execute(f'PRAGMA table_info("{table}")')]
+        if not columns:
+            raise FileNotFoundError(f"Die Tabelle {table} existiert nicht in {self.db_path}.")
+        return columns
+
+    @staticmethod
+    def _read_version(con: sqlite3.Connection, table: str) -> int:
+        row = con.execute('SELECT version FROM _version WHERE name = ?', (table,)).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _to_dataframe(cursor: sqlite3.Cursor, infer: bool = True) -> pd.DataFrame:
+        """
+        Wandelt ein Abfrageergebnis in einen DataFrame mit den Datentypen um, die read_csv liefern würde.
+        Für Teilergebnisse (infer=False) bleiben Textspalten object, auch wenn alle Werte fehlen, so wie bei
+        einem gefilterten DataFrame aus der CSV-Datei.
+        """
+        return ClSqliteBackend._rows_to_dataframe(cursor.fetchall(), cursor, infer)
+
+    @staticmethod
+    def _rows_to_dataframe(rows: list, cursor: sqlite3.Cursor, infer: bool = True) -> pd.DataFrame:
+        columns = [description[0] for description in cursor.description]
+        df = pd.DataFrame.from_records(rows, columns=columns)
+        # NULL wird wie eine leere Zelle in der CSV-Datei zu NaN
+        for column in df.columns[df.dtypes == object]:
+            df[column] = df[column].where(df[column].notna(), np.nan)
+        return df.infer_objects() if infer else df
+
+    @staticmethod
+    def _column_definitions(df: pd.DataFrame) -> str:
+        """
+        Gibt die Spaltendefinitionen für CREATE TABLE passend zu den Datentypen des DataFrames zurück.
+        """
+        definitions = []
+        for column, dtype in df.dtypes.items():
+            if pd.api.types.is_integer_dtype(dtype):
+                sql_type = 'INTEGER'
+            elif pd.api.types.is_float_dtype(dtype):
+                sql_type = 'REAL'
+            else:
+                sql_type = 'TEXT'
+            definitions.append(f'"{column}" {sql_type}')
+        return ', '.join(definitions)
+
+    @staticmethod
+    def _to_parameters(df: pd.DataFrame) -> list:
+        return [tuple(None if pd.isna(value) else value for value in row)
+                for row in df.itertuples(index=False, name=None)]
+
+    def read(self, csv_name: str, filter_conditions: dict = None) -> pd.DataFrame:
+        """
+        Liest eine Tabelle. Die vollständige Tabelle wird je Version im Cache gehalten. Filter auf Gleichheit
+        werden als WHERE-Klausel über den Index ausgewertet, alle anderen Bedingungen (siehe ClQuery) in einem
+        Durchgang über die Tabelle im Cache.
+        """
+        table = self.table_name(csv_name)
+        con = self._connection()
+        columns = self._columns(con, table)
+
+        query = ClQuery(filter_conditions)
+        filter_conditions = query.equality()
+        if not filter_conditions:
+            key = self._key(table)
+            stamp = (self._read_version(con, table),)
+            entry = self.cache.get(key, stamp)
+            if entry is None:
+                df = schema_for(csv_name).apply(self._to_dataframe(con.execute(f'SELECT * FROM "{table}" ORDER BY rowid')))
+                entry = self.cache.put(key, df, stamp)
+            if query.conditions:
+                return query.select(entry.df)
+            return entry.df.copy()
+
+        for column in filter_conditions:
+            if column not in columns:
+                raise ValueError(f"Spalte {column} existiert nicht im DataFrame.")
+        where = ' AND '.join(f'"{column}" = ?' for column in filter_conditions)
+        cursor = con.execute(f'SELECT * FROM "{table}" WHERE {where} ORDER BY rowid',
+                             tuple(filter_conditions.values()))
+        return schema_for(csv_name).apply(self._to_dataframe(cursor, infer=False))
+
+    def iter_chunks(self, csv_name: str, filter_conditions: dict = None, chunksize: int = 10000):
+        """
+        Liest die Tabelle mit fetchmany stückweise. Die Abfrage liest einen festen Stand der Datenbank.
+        Bedingungen, die nicht nur Gleichheiten sind, werden auf jedes Stück angewendet.
+        """
+        table = self.table_name(csv_name)
+        con = self._connection()
+        columns = self._columns(con, table)
+        query = ClQuery(filter_conditions)
+        filter_conditions = query.equality()
+        if filter_conditions is None:
+            filter_conditions = {}
+        else:
+            query = ClQuery()
+        for column in filter_conditions:
+            if column not in columns:
+                raise ValueError(f"Spalte {column} existiert nicht im DataFrame.")
+        where = ' AND '.join(f'"{column}" = ?' for column in filter_conditions) or '1'
+        cursor = con.execute(f'SELECT * FROM "{table}" WHERE {where} ORDER BY rowid', tuple(filter_conditions.values()))
+        try:
+            rows = cursor.fetchmany(chunksize)
+            # Das erste Stück wird auch ohne Zeilen geliefert, damit die Spalten bekannt sind
+            yield query.select(self._rows_to_dataframe(rows, cursor))
+            while rows:
+                rows = cursor.fetchmany(chunksize)
+                if rows:
+                    yield query.select(self._rows_to_dataframe(rows, cursor))
+        finally:
+            cursor.close()
+
+    def get_rows_by_id(self, csv_name: str, id: int) -> pd.DataFrame:
+        return self.read(csv_name, {'ID': id})
+
+    def id_exists(self, csv_name: str, id: int) -> bool:
+        table = self.table_name(csv_name)
+        con = self._connection()
+        self._columns(con, table)
+        return con.execute(f'SELECT 1 FROM "{table}" WHERE ID = ? LIMIT 1', (id,)).fetchone() is not None
+
+    def get_version(self, csv_name: str) -> int:
+        return self._read_version(self._connection(), self.table_name(csv_name))
+
+    def get_stamp(self, csv_name: str) -> tuple:
+        return (self.get_version(csv_name),)
+
+    def table_key(self, csv_name: str) -> str:
+        return self._key(self.table_name(csv_name))
+
+    def _id_allocator(self, con: sqlite3.Connection, table: str) -> ClIdAllocator:
+        """
+        Gibt die ID-Vergabe der Tabelle zurück. Sie wird neu aufgebaut, wenn sich die Version geändert hat.
+        """
+        version = self._read_version(con, table)
+        with self._allocators_lock:
+            cached = self._allocators.get(table)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+        ids = [row[0] for row in con.execute(f'SELECT DISTINCT ID FROM "{table}" WHERE ID IS NOT NULL')]
+        id_allocator = ClIdAllocator(ids)
+        with self._allocators_lock:
+            self._allocators[table] = (version, id_allocator)
+        return id_allocator
+
+    def get_first_unused_id(self, csv_name: str) -> int:
+        table = self.table_name(csv_name)
+        con = self._connection()
+        if 'ID' not in self._columns(con, table):
+            return 1
+        return self._id_allocator(con, table).peek()
+
+    def update(self, csv_name: str, id: int, updated_data: dict, base_version: int = None):
+        table = self.table_name(csv_name)
+        with self._transaction({table: base_version}) as (con, changed):
+            self._apply_update(con, table, id, updated_data, changed[table])
+
+    def insert(self, csv_name: str, rows_data: list, base_version: int = None):
+        table = self.table_name(csv_name)
+        if not rows_data:
+            self._columns(self._connection(), table)
+            return
+        with self._transaction({table: base_version}) as (con, changed):
+            self._apply_insert(con, table, rows_data, changed[table])
+
+    def delete_id(self, csv_name: str, id: int, base_version: int = None):
+        table = self.table_name(csv_name)
+        with self._transaction({table: base_version}) as (con, changed):
+            self._apply_delete_id(con, table, id, changed[table])
+
+    def delete_id_row(self, csv_name: str, id: int, row_nr: int, base_version: int = None):
+        table = self.table_name(csv_name)
+        with self._transaction({table: base_version}) as (con, changed):
+            self._apply_delete_id_row(con, table, id, row_nr, changed[table])
+
+    def apply(self, operations: list, base_versions: dict = None):
+        """
+        Führt alle Vorgänge in einer einzigen Datenbanktransaktion aus, auch über mehrere Tabellen.
+        """
+        base_versions = base_versions or {}
+        csv_names = {csv_name for _, csv_name, _ in operations} | set(base_versions)
+        tables = {self.table_name(csv_name): base_versions.get(csv_name) for csv_name in sorted(csv_names)}
+        with self._transaction(tables) as (con, changed):
+            for action, csv_name, args in operations:
+                table = self.table_name(csv_name)
+                getattr(self, '_apply_' + action)(con, table, *args, changed[table])
+
+    def _apply_update(self, con: sqlite3.Connection, table: str, id: int, updated_data: dict, changed_ids: set):
+        columns = self._columns(con, table)
+        for column in updated_data:
+            if column not in columns:
+                raise ValueError(f"Spalte {column} existiert nicht in der CSV-Datei.")
+        row = con.execute(f'SELECT rowid FROM "{table}" WHERE ID = ? ORDER BY rowid LIMIT 1', (id,)).fetchone()
+        if row is None:
+            raise ValueError(f"Keine Zeilen mit der ID {id} gefunden.")
+
+        values = self.normalize_rows(pd.DataFrame([updated_data]), list(updated_data))
+        assignments = ', '.join(f'"{column}" = ?' for column in updated_data)
+        try:
+            con.execute(f'UPDATE "{table}" SET {assignments} WHERE rowid = ?',
+                        self._to_parameters(values)[0] + (row[0],))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Die ID {updated_data.get('ID')} existiert bereits.")
+        changed_ids.update((id, values.at[0, 'ID'] if 'ID' in values.columns else id))
+
+    def _apply_update_rows(self, con: sqlite3.Connection, table: str, rows_data: list, changed_ids: set):
+        columns = self._columns(con, table)
+        if not rows_data:
+            return
+        updated = [column for column in rows_data[0] if column != 'ID']
+        for column in updated:
+            if column not in columns:
+                raise ValueError(f"Spalte {column} existiert nicht in der CSV-Datei.")
+
+        ids = [int(row_data['ID']) for row_data in rows_data]
+        values = self.normalize_rows(pd.DataFrame(rows_data, columns=updated), updated)
+        assignments = ', '.join(f'"{column}" = ?' for column in updated)
+        cursor = con.executemany(
+            f'UPDATE "{table}" SET {assignments} '
+            f'WHERE rowid = (SELECT rowid FROM "{table}" WHERE ID = ? ORDER BY rowid LIMIT 1)',
+            [parameters + (id,) for parameters, id in zip(self._to_parameters(values), ids)])
+        if cursor.rowcount != len(ids):
+            raise ValueError("Nicht alle IDs wurden in der Tabelle gefunden.")
+        changed_ids.update(ids)
+
+    def _apply_insert(self, con: sqlite3.Connection, table: str, rows_data: list, changed_ids: set):
+        columns = self._columns(con, table)
+        if not rows_data:
+            return
+        if set(rows_data[0].keys()) != set(columns):
+            raise ValueError(
+                "Die Schlüsselnamen von rows_data müssen mit den Spalten der CSV-Datei übereinstimmen.")
+
+        # Unter BEGIN IMMEDIATE schreibt kein anderer Prozess, die Vergabe ist damit aktuell
+        id_allocator = self._id_allocator(con, table)
+        rows_without_id = [row_data for row_data in rows_data if row_data['ID'] == 0]
+        for row_data, new_id in zip(rows_without_id, id_allocator.allocate(len(rows_without_id))):
+            row_data['ID'] = new_id
+
+        df_new = self.normalize_rows(pd.DataFrame(rows_data), columns)
+        placeholders = ', '.join('?' for _ in columns)
+        quoted = ', '.join(f'"{column}"' for column in columns)
+        try:
+            con.executemany(f'INSERT INTO "{table}" ({quoted}) VALUES ({placeholders})',
+                            self._to_parameters(df_new))
+        except sqlite3.IntegrityError:
+            raise ValueError("Die IDs der neuen Zeilen existieren bereits in der CSV-Datei.")
+        changed_ids.update(df_new['ID'])
+
+    def _apply_delete_id(self, con: sqlite3.Connection, table: str, id: int, changed_ids: set):
+        self._columns(con, table)
+        con.execute(f'DELETE FROM "{table}" WHERE ID = ?', (id,))
+        changed_ids.add(id)
+
+    def _apply_delete_id_row(self, con: sqlite3.Connection, table: str, id: int, row_nr: int, changed_ids: set):
+        self._columns(con, table)
+        rowids = [row[0] for row in con.execute(f'SELECT rowid FROM "{table}" WHERE ID = ? ORDER BY rowid', (id,))]
+        if not rowids:
+            raise ValueError(f"Keine Zeilen mit ID {id} gefunden.")
+        if row_nr < 1 or row_nr > len(rowids):
+            raise ValueError(f"Ungültige Reihenummer {row_nr} für ID {id}.")
+        con.execute(f'DELETE FROM "{table}" WHERE rowid = ?', (rowids[row_nr - 1],))
+        changed_ids.add(id)
+
+    def compact(self, csv_name: str):
+        """
+        Überträgt das WAL in die Datenbankdatei und kürzt es.
+        """
+        self._columns(self._connection(), self.table_name(csv_name))
+        self._connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+
+def migrate_csv_to_sqlite(file_path: str, db_path: str = None, replace: bool = False) -> list:
+    """
+    Überträgt alle CSV-Dateien eines Ordners einmalig in eine SQLite-Datenbank.
+
+    Args:
+        file_path (str): Der Ordner mit den CSV-Dateien (z. B. 'daten').
+        db_path (str, optional): Der Pfad der Datenbank. Standard ist mein_verein.db in `file_path`.
+        replace (bool, optional): True ersetzt bereits vorhandene Tabellen. Standard ist False.
+
+    Returns:
+        list: Die Namen der übertragenen Tabellen.
+
+    Raises:
+        ValueError: Wenn eine Tabelle bereits existiert und `replace` False ist.
+    """
+    if db_path is None:
+        db_path = os.path.join(file_path, ClSqliteBackend.DEFAULT_DB_NAME)
+
+    con = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        con.execute('PRAGMA journal_mode=WAL')
+        con.execute('CREATE TABLE IF NOT EXISTS _version (name TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+        tables = []
+        for path_csv in sorted(glob.glob(os.path.join(file_path, '*.csv'))):
+            csv_name = os.path.basename(path_csv)
+            table = ClSqliteBackend.table_name(csv_name)
+            df = pd.read_csv(path_csv)
+
+            con.execute('BEGIN IMMEDIATE')
+            try:
+                exists = con.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                     (table,)).fetchone()
+                if exists and not replace:
+                    raise ValueError(f"Die Tabelle {table} existiert bereits in {db_path}.")
+                con.execute(f'DROP TABLE IF EXISTS "{table}"')
+                con.execute(f'CREATE TABLE "{table}" ({ClSqliteBackend._column_definitions(df)})')
+                if 'ID' in df.columns:
+                    unique = 'UNIQUE ' if csv_name in ClSqliteBackend.UNIQUE_ID_TABLES else ''
+                    con.execute(f'CREATE {unique}INDEX "idx_{table}_id" ON "{table}" (ID)')
+                placeholders = ', '.join('?' for _ in df.columns)
+                con.executemany(f'INSERT INTO "{table}" VALUES ({placeholders})',
+                                ClSqliteBackend._to_parameters(df))
+                con.execute('INSERT INTO _version (name, version) VALUES (?, 1) '
+                            'ON CONFLICT(name) DO UPDATE SET version = version + 1', (table,))
+                con.execute('COMMIT')
+            except BaseException:
+                con.execute('ROLLBACK')
+                raise
+            tables.append(table)
+        return tables
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    # Aufruf: python sqlite_backend.py [Ordner] [Datenbank] [--replace]
+    args = [arg for arg in sys.argv[1:] if arg != '--replace']
+    migrated = migrate_csv_to_sqlite(args[0] if args else 'daten', args[1] if len(args) > 1 else None,
+                                     replace='--replace' in sys.argv)
+    print("Übertragene Tabellen:", ', '.join(migrated))
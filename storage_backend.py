@@ -0,0 +1,150 @@
+import io
+
+import pandas as pd
+
+from query import ClQuery
+from table_schema import DATE_FORMAT
+
+
+class ClStorageBackend:
+    """
+    Die Schnittstelle der Datenablage hinter ClDataframeHelper.
+
+    Eine Tabelle wird immer über den Namen ihrer CSV-Datei angesprochen (z. B. 'mitglieder.csv'), auch wenn
+    die Ablage keine CSV-Dateien verwendet. Alle Methoden lösen FileNotFoundError aus, wenn die Tabelle nicht
+    existiert, und ClVersionConflictError, wenn eine übergebene `base_version` veraltet ist.
+    """
+
+    # Tabellen, in denen jede ID höchstens einmal vorkommen darf
+    UNIQUE_ID_TABLES = ('mitglieder.csv',)
+
+    def read(self, csv_name: str, filter_conditions: dict = None) -> pd.DataFrame:
+        """
+        Liest eine Tabelle und wendet optional Filterbedingungen an (siehe ClQuery: ein dict für Gleichheit je
+        Spalte oder eine Liste von Bedingungen mit Operatoren).
+        Der zurückgegebene DataFrame gehört dem Aufrufer und darf verändert werden. Sind nicht alle Bedingungen
+        Gleichheiten (z. B. [('ID', 'in', ids)]), ist sein Index die Position jeder Zeile in der ganzen Tabelle.
+        """
+        raise NotImplementedError
+
+    def iter_chunks(self, csv_name: str, filter_conditions: dict = None, chunksize: int = 10000):
+        """
+        Liest eine Tabelle stückweise mit höchstens `chunksize` Zeilen je DataFrame und wendet die
+        Filterbedingungen auf jedes Stück an. Der Speicherbedarf hängt nur von `chunksize` ab, nicht von der
+        Größe der Tabelle. Auch leere Stücke werden geliefert, das erste Stück enthält immer alle Spalten.
+        """
+        raise NotImplementedError
+
+    def get_rows_by_id(self, csv_name: str, id: int) -> pd.DataFrame:
+        """
+        Gibt alle Zeilen mit der angegebenen ID in der Reihenfolge der Tabelle zurück.
+        """
+        raise NotImplementedError
+
+    def id_exists(self, csv_name: str, id: int) -> bool:
+        """
+        Prüft, ob die ID in der Tabelle vorkommt.
+        """
+        raise NotImplementedError
+
+    def warm(self, csv_name: str):
+        """
+        Liest eine Tabelle vorab in den Cache der Ablage, damit der nächste Zugriff sie nicht erst lesen muss.
+        """
+        self.read(csv_name)
+
+    def get_version(self, csv_name: str) -> int:
+        """
+        Gibt den Versionszähler der Tabelle zurück, der bei jedem Schreibvorgang erhöht wird.
+        """
+        raise NotImplementedError
+
+    def get_stamp(self, csv_name: str) -> tuple:
+        """
+        Gibt einen Stempel zurück, der sich bei jeder Änderung der Tabelle ändert, auch bei Änderungen
+        außerhalb dieser Anwendung. Schreibvorgänge werden mit diesem Stempel im Änderungsprotokoll vermerkt.
+        """
+        raise NotImplementedError
+
+    def table_key(self, csv_name: str) -> str:
+        """
+        Gibt einen prozessweit eindeutigen Schlüssel der Tabelle zurück (z. B. für Caches und das Änderungsprotokoll).
+        """
+        raise NotImplementedError
+
+    def get_first_unused_id(self, csv_name: str) -> int:
+        """
+        Gibt die kleinste unbenutzte ID der Tabelle zurück.
+        """
+        raise NotImplementedError
+
+    def update(self, csv_name: str, id: int, updated_data: dict, base_version: int = None):
+        """
+        Aktualisiert die erste Zeile mit der angegebenen ID.
+        """
+        raise NotImplementedError
+
+    def insert(self, csv_name: str, rows_data: list, base_version: int = None):
+        """
+        Fügt Zeilen ein. Zeilen mit ID 0 erhalten eine neue ID, die in das Dictionary der Zeile eingetragen wird.
+        """
+        raise NotImplementedError
+
+    def delete_id(self, csv_name: str, id: int, base_version: int = None):
+        """
+        Löscht alle Zeilen mit der angegebenen ID. Eine unbekannte ID wird ignoriert.
+        """
+        raise NotImplementedError
+
+    def delete_id_row(self, csv_name: str, id: int, row_nr: int, base_version: int = None):
+        """
+        Löscht die row_nr-te Zeile (beginnend bei 1) mit der angegebenen ID.
+        """
+        raise NotImplementedError
+
+    def apply(self, operations: list, base_versions: dict = None):
+        """
+        Führt mehrere Schreibvorgänge über eine oder mehrere Tabellen atomar aus (siehe ClTransaction).
+
+        Args:
+            operations (list): Tupel (Aktion, Tabelle, Argumente) mit den Aktionen 'update', 'insert',
+                'delete_id' und 'delete_id_row' und den Argumenten der gleichnamigen Methoden sowie
+                'update_rows' mit einer Liste von Zeilen (siehe ClTransaction.update_rows).
+            base_versions (dict, optional): Die erwarteten Versionen je Tabelle.
+        """
+        raise NotImplementedError
+
+    def compact(self, csv_name: str):
+        """
+        Räumt die Ablage der Tabelle auf, z. B. durch vollständiges Neuschreiben.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def filter_dataframe(df: pd.DataFrame, filter_conditions) -> pd.DataFrame:
+        """
+        Filtert einen DataFrame basierend auf den angegebenen Bedingungen in einem Durchgang (siehe ClQuery).
+
+        Args:
+            df (pd.DataFrame): Der zu filternde DataFrame.
+            filter_conditions (dict | list): Ein Wörterbuch mit Filterbedingungen auf Gleichheit oder eine Liste
+                von Bedingungen, z. B. [('Jahre', '>=', 25), ('Nachname', 'prefix', 'Mü')].
+
+        Returns:
+            pd.DataFrame: Der gefilterte DataFrame.
+
+        Raises:
+            ValueError: Wenn eine Spalte in den Filterbedingungen nicht im DataFrame existiert.
+        """
+        return ClQuery(filter_conditions).select(df)
+
+    @staticmethod
+    def normalize_rows(df_rows: pd.DataFrame, columns) -> pd.DataFrame:
+        """
+        Bringt neue oder geänderte Zeilen auf die Datentypen, die ein erneutes Einlesen der CSV-Datei ergeben würde.
+        Das Schema der Tabelle (siehe table_schema) wird danach vom Aufrufer angewendet.
+        """
+        buffer = io.StringIO()
+        df_rows.to_csv(buffer, index=False, header=False, columns=list(columns), date_format=DATE_FORMAT)
+        buffer.seek(0)
+        return pd.read_csv(buffer, header=None, names=list(columns))
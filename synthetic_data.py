@@ -0,0 +1,164 @@
+"""
+Erzeugt synthetische Tabellen mitglieder.csv und vorstand.csv in beliebiger Größe, z. B. für Messungen.
+
+Die Mitglieder haben ein realistisches Alter (kaum unter 6, wenige über 90 Jahre), treten frühestens mit
+6 Jahren ein, und jüngere Eintritte sind häufiger als ältere. Einige IDs fehlen wie nach gelöschten Mitgliedern.
+Der Vorstand besteht aus lückenlosen Amtszeiten je Posten; gewählt werden nur Mitglieder, die zu Beginn der
+Amtszeit bereits eingetreten waren, und die letzte Amtszeit jedes Postens hat kein Ende. Größere Tabellen
+bekommen mehrere Vorstände (z. B. für Abteilungen), damit auch die Vorstandstabelle mitwächst.
+
+Alle Daten hängen nur von Zeilenzahl und Startwert ab, nicht vom aktuellen Datum.
+
+Aufruf: python synthetic_data.py Ordner Zeilen [Startwert]
+"""
+import os
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from table_schema import DATE_FORMAT
+
+# Stichtag der erzeugten Daten
+REFERENCE_DATE = date(2025, 1, 1)
+# Gründungsjahr des Vereins, ab dem es Vorstandsposten gibt
+FOUNDED = date(1950, 1, 1)
+# Anzahl der Mitglieder je Vorstand
+MEMBERS_PER_BOARD = 1000
+BOARD_POSITIONS = ('1.Vorsitzender', '2.Vorsitzender', 'Kassenwart', 'Schriftführer', 'Vergnügungswart')
+STATUS_WEIGHTS = {2: 0.85, 3: 0.12, 1: 0.03}
+
+FIRST_NAMES = ('Anna', 'Max', 'Lea', 'Ben', 'Sophie', 'Lukas', 'Marie', 'Paul', 'Emma', 'Felix', 'Hannah',
+               'Jonas', 'Mia', 'Leon', 'Lena', 'Tim', 'Laura', 'Jan', 'Julia', 'Niklas', 'Ute', 'Jürgen',
+               'Günter', 'Käthe', 'Jörg', 'Björn', 'Renée', 'Anna-Lena', 'Karl-Heinz', 'Öznur', 'Zoë', 'Ingrid')
+LAST_NAMES = ('Müller', 'Schmidt', 'Schneider', 'Fischer', 'Weber', 'Meyer', 'Wagner', 'Becker', 'Schulz',
+              'Hoffmann', 'Schäfer', 'Koch', 'Bauer', 'Richter', 'Klein', 'Wolf', 'Schröder', 'Neumann',
+              'Schwarz', 'Zimmermann', 'Braun', 'Krüger', 'Hofmann', 'Hartmann', 'Lange', 'Schmitt', 'Werner',
+              'Köhler', 'Groß', "O'Brien", 'Meier-Böhm', 'von Weißenfels')
+
+
+def _to_text(ordinals: np.ndarray) -> np.ndarray:
+    """
+    Wandelt Tage seit 1970 in Datumstexte im Format DATE_FORMAT um.
+    """
+    # Jeder Tag wird nur einmal formatiert, strftime ist für Millionen Werte zu langsam
+    days, inverse = np.unique(ordinals, return_inverse=True)
+    return pd.to_datetime(days, unit='D').strftime(DATE_FORMAT).to_numpy()[inverse]
+
+
+def _days(day: date) -> int:
+    return (day - date(1970, 1, 1)).days
+
+
+def generate_members(rows: int, seed: int = 1) -> pd.DataFrame:
+    """
+    Erzeugt eine Mitgliedertabelle.
+
+    Args:
+        rows (int): Die Anzahl der Mitglieder.
+        seed (int, optional): Der Startwert des Zufallsgenerators. Standard ist 1.
+
+    Returns:
+        pd.DataFrame: Die Tabelle mit den Spalten von mitglieder.csv, Datumsangaben als Text.
+    """
+    rng = np.random.default_rng(seed)
+    reference = _days(REFERENCE_DATE)
+
+    # Etwa 5 % der IDs sind nach Löschungen frei
+    ids = np.sort(rng.choice(np.arange(1, int(rows * 1.05) + 2), rows, replace=False))
+
+    age = np.clip(rng.normal(45, 19, rows), 6, 95)
+    birth = reference - (age * 365.25).astype(np.int64) - rng.integers(0, 365, rows)
+    # Zeit seit dem Eintritt: exponentiell verteilt, höchstens bis zum 6. Geburtstag zurück
+    since_entry = np.minimum(rng.exponential(12 * 365.25, rows), (age - 6) * 365.25).astype(np.int64)
+    entry = np.maximum(reference - since_entry, _days(FOUNDED))
+    entry = np.maximum(entry, birth + 2192)
+
+    return pd.DataFrame({
+        'ID': ids,
+        'Vorname': rng.choice(np.array(FIRST_NAMES, dtype=object), rows),
+        'Nachname': rng.choice(np.array(LAST_NAMES, dtype=object), rows),
+        'Geburtsdatum': _to_text(birth),
+        'Eintrittsdatum': _to_text(entry),
+        'Status': rng.choice(np.array(list(STATUS_WEIGHTS)), rows, p=np.array(list(STATUS_WEIGHTS.values()))),
+    })
+
+
+def generate_board(df_members: pd.DataFrame, seed: int = 1) -> pd.DataFrame:
+    """
+    Erzeugt die Vorstandstabelle zu einer Mitgliedertabelle.
+
+    Für jeden Vorstand und jeden Posten folgen Amtszeiten von 2 bis 12 Jahren seit der Gründung lückenlos
+    aufeinander. Oft wird das bisherige Mitglied wiedergewählt, sonst ein Mitglied, das vor Beginn der
+    Amtszeit eingetreten ist. Die letzte Amtszeit dauert an (leeres Bis).
+
+    Args:
+        df_members (pd.DataFrame): Die Mitglieder, z. B. aus generate_members.
+        seed (int, optional): Der Startwert des Zufallsgenerators. Standard ist 1.
+
+    Returns:
+        pd.DataFrame: Die Tabelle mit den Spalten von vorstand.csv, Datumsangaben als Text.
+    """
+    rng = np.random.default_rng(seed + 1)
+    reference = _days(REFERENCE_DATE)
+    if len(df_members) == 0:
+        return pd.DataFrame({'ID': [], 'Position': [], 'Von': [], 'Bis': []})
+
+    # Mitglieder nach Eintritt sortiert: die ersten k sind alle, die bis zu einem Tag eingetreten sind
+    entry = pd.to_datetime(df_members['Eintrittsdatum'], format=DATE_FORMAT).to_numpy()
+    entry = (entry - np.datetime64('1970-01-01')) // np.timedelta64(1, 'D')
+    order = np.argsort(entry, kind='stable')
+    entry_sorted = entry[order]
+    ids_sorted = df_members['ID'].to_numpy()[order]
+
+    ids, positions, starts, ends, open_ended = [], [], [], [], []
+    boards = max(1, len(df_members) // MEMBERS_PER_BOARD)
+    for _ in range(boards):
+        for position in BOARD_POSITIONS:
+            start = _days(FOUNDED) + int(rng.integers(0, 5 * 365))
+            holder = None
+            while start < reference:
+                end = start + int(rng.integers(2, 13) * 365.25)
+                joined = int(np.searchsorted(entry_sorted, start, side='right'))
+                if holder is None or rng.random() > 0.4:
+                    holder = int(ids_sorted[rng.integers(0, joined)]) if joined else int(ids_sorted[0])
+                ids.append(holder)
+                positions.append(position)
+                starts.append(start)
+                ends.append(end)
+                open_ended.append(end >= reference)
+                start = end
+    bis = _to_text(np.array(ends))
+    bis[np.array(open_ended)] = ''
+    return pd.DataFrame({'ID': ids, 'Position': positions, 'Von': _to_text(np.array(starts)), 'Bis': bis})
+
+
+def write_tables(file_path: str, rows: int, seed: int = 1) -> tuple:
+    """
+    Schreibt mitglieder.csv und vorstand.csv mit `rows` Mitgliedern in den Ordner `file_path`.
+
+    Returns:
+        tuple: Die Pfade der beiden Dateien.
+    """
+    os.makedirs(file_path, exist_ok=True)
+    df_members = generate_members(rows, seed)
+    path_members = os.path.join(file_path, 'mitglieder.csv')
+    path_board = os.path.join(file_path, 'vorstand.csv')
+    df_members.to_csv(path_members, index=False)
+    generate_board(df_members, seed).to_csv(path_board, index=False)
+    return path_members, path_board
+
+
+def main(args: list) -> bool:
+    if len(args) not in (2, 3):
+        print(__doc__.strip().splitlines()[-1])
+        return False
+    paths = write_tables(args[0], int(args[1]), int(args[2]) if len(args) == 3 else 1)
+    for path in paths:
+        print(f"{path}: {len(pd.read_csv(path))} Zeilen")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(sys.argv[1:]) else 1)
@@ -0,0 +1,178 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import instrumentation
+
+try:
+    import pyarrow  # noqa: F401
+    # Namen als Arrow-Strings: ein zusammenhängender Puffer statt eines Python-Objekts je Wert
+    NAME_DTYPE = 'string[pyarrow]'
+except ImportError:
+    NAME_DTYPE = object
+
+# Format der Datumsangaben in den CSV-Dateien, in der Datenbank und in der Anzeige
+DATE_FORMAT = '%d.%m.%Y'
+
+
+class ClTableSchema:
+    """
+    Die Datentypen, mit denen eine Tabelle im Speicher gehalten wird.
+
+    Die Arten der Spalten sind:
+        'id'       int32, solange alle Werte ganzzahlig sind und in int32 passen
+        'category' pandas-Category, z. B. für Status oder Position
+        'date'     datetime64, solange sich alle Werte im Format DATE_FORMAT lesen lassen
+        'name'     NAME_DTYPE (string[pyarrow], wenn pyarrow installiert ist)
+
+    Lässt sich eine Spalte nicht verlustfrei umwandeln, bleibt sie unverändert. Spalten, die nicht im Schema
+    stehen, werden ebenfalls nicht verändert. In den Dateien stehen die Daten weiterhin als Text; beim Schreiben
+    werden Datumsspalten wieder im Format DATE_FORMAT ausgegeben.
+
+    Attribute:
+        columns (dict): Die Art je Spaltenname.
+    """
+
+    def __init__(self, columns: dict):
+        self.columns = columns
+
+    @instrumentation.timed('schema_apply')
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Wandelt die Spalten eines DataFrames in die Datentypen des Schemas um.
+
+        Args:
+            df (pd.DataFrame): Der DataFrame, wie ihn read_csv liefert.
+
+        Returns:
+            pd.DataFrame: Ein DataFrame mit den umgewandelten Spalten, der übergebene bleibt unverändert.
+        """
+        casts = {}
+        for column, kind in self.columns.items():
+            if column in df.columns:
+                values = self._cast(df[column], kind)
+                if values is not None:
+                    casts[column] = values
+        if not casts:
+            return df
+        df = df.copy(deep=False)
+        for column, values in casts.items():
+            df[column] = values
+        return df
+
+    @staticmethod
+    def _cast(values: pd.Series, kind: str):
+        """
+        Gibt die umgewandelte Spalte zurück oder None, wenn sie schon passt oder nicht umgewandelt werden kann.
+        """
+        if kind == 'id':
+            if (pd.api.types.is_integer_dtype(values) and values.dtype != np.int32
+                    and (values.empty or np.iinfo(np.int32).min <= values.min() <= values.max() <= np.iinfo(np.int32).max)):
+                return values.astype(np.int32)
+        elif kind == 'category':
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                return values.astype('category')
+        elif kind == 'date':
+            if pd.api.types.is_datetime64_any_dtype(values):
+                return None
+            if values.isna().all():
+                return pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+            if values.dtype == object:
+                parsed = pd.to_datetime(values, format=DATE_FORMAT, errors='coerce')
+                # Ungültige Angaben würden als NaT verloren gehen, die Spalte bleibt dann Text
+                if not (parsed.isna() & values.notna()).any():
+                    return parsed
+        elif kind == 'name':
+            if NAME_DTYPE is not object and (values.dtype == object or isinstance(values.dtype, pd.StringDtype)) \
+                    and values.dtype != NAME_DTYPE:
+                return values.astype(NAME_DTYPE)
+        return None
+
+    def concat(self, df: pd.DataFrame, df_new: pd.DataFrame) -> pd.DataFrame:
+        """
+        Hängt neue Zeilen an und stellt die Datentypen des Schemas wieder her (z. B. die Kategorien).
+        """
+        df_new = self.apply(df_new)
+        frames = [df, df_new]
+        for column in df.columns:
+            # Passen die Datumsspalten nicht zusammen (ungültige Angabe), werden beide als Text zusammengeführt
+            if pd.api.types.is_datetime64_any_dtype(df[column]) != pd.api.types.is_datetime64_any_dtype(df_new[column]):
+                frames = [format_dates(frame, [column]) for frame in frames]
+        return self.apply(pd.concat(frames, ignore_index=True))
+
+    @staticmethod
+    def set_values(df: pd.DataFrame, position: int, row: pd.DataFrame, columns):
+        """
+        Übernimmt die Werte der ersten Zeile von `row` in die Zeile an der Position `position` von `df`.
+        Neue Kategorien werden ergänzt; ein ungültiges Datum wandelt die Datumsspalte in Text um.
+        """
+        for column in columns:
+            value = row.at[0, column]
+            dtype = df[column].dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                if not pd.isna(value) and value not in dtype.categories:
+                    df[column] = df[column].cat.add_categories([value])
+            elif pd.api.types.is_datetime64_any_dtype(dtype):
+                if not (pd.isna(value) or isinstance(value, pd.Timestamp)):
+                    df[column] = format_dates(df[[column]])[column]
+            df.iat[position, df.columns.get_loc(column)] = value
+
+    @staticmethod
+    def set_rows(df: pd.DataFrame, positions, rows: pd.DataFrame, columns):
+        """
+        Übernimmt die Werte aller Zeilen von `rows` spaltenweise in die Zeilen an den Positionen `positions` von `df`
+        (wie set_values, aber für viele Zeilen in einem Schritt).
+        """
+        for column in columns:
+            values = rows[column]
+            dtype = df[column].dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                new = pd.Index(values.dropna().unique()).difference(dtype.categories)
+                if len(new):
+                    df[column] = df[column].cat.add_categories(new)
+            elif pd.api.types.is_datetime64_any_dtype(dtype) and not pd.api.types.is_datetime64_any_dtype(values):
+                df[column] = format_dates(df[[column]])[column]
+            df.iloc[positions, df.columns.get_loc(column)] = values.to_numpy(dtype=object if isinstance(
+                values.dtype, pd.CategoricalDtype) else None)
+
+
+# Die Schemata der Tabellen, über den Namen der CSV-Datei
+SCHEMAS = {
+    'mitglieder.csv': ClTableSchema({'ID': 'id', 'Vorname': 'name', 'Nachname': 'name', 'Geburtsdatum': 'date',
+                                     'Eintrittsdatum': 'date', 'Status': 'category'}),
+    'vorstand.csv': ClTableSchema({'ID': 'id', 'Position': 'category', 'Von': 'date', 'Bis': 'date'}),
+}
+
+# Für Tabellen ohne eigenes Schema: alles bleibt, wie es read_csv liefert
+_NO_SCHEMA = ClTableSchema({})
+
+
+def schema_for(csv_name: str) -> ClTableSchema:
+    """
+    Gibt das Schema der Tabelle zurück, für unbekannte Tabellen ein leeres Schema.
+    """
+    return SCHEMAS.get(os.path.basename(csv_name), _NO_SCHEMA)
+
+
+def format_dates(df: pd.DataFrame, columns=None) -> pd.DataFrame:
+    """
+    Wandelt Datumsspalten für die Ausgabe in Text im Format DATE_FORMAT um, fehlende Daten bleiben NaN.
+
+    Args:
+        df (pd.DataFrame): Der DataFrame.
+        columns (list, optional): Die umzuwandelnden Spalten. Standard sind alle datetime64-Spalten.
+
+    Returns:
+        pd.DataFrame: Ein DataFrame mit Text statt Datum, der übergebene bleibt unverändert.
+    """
+    if columns is None:
+        columns = [column for column in df.columns if pd.api.types.is_datetime64_any_dtype(df[column])]
+    else:
+        columns = [column for column in columns if pd.api.types.is_datetime64_any_dtype(df[column])]
+    if not columns:
+        return df
+    df = df.copy(deep=False)
+    for column in columns:
+        df[column] = df[column].dt.strftime(DATE_FORMAT).astype(object)
+    return df
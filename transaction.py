@@ -0,0 +1,90 @@
+from instrumentation import instrumentation
+from storage_backend import ClStorageBackend
+
+
+class ClTransaction:
+    """
+    Sammelt Schreibvorgänge über mehrere Tabellen und führt sie gemeinsam aus (Unit of Work).
+
+    Die Vorgänge werden erst bei commit() an die Datenablage übergeben. Diese liest jede betroffene Tabelle
+    einmal, wendet alle Vorgänge der Tabelle in der angegebenen Reihenfolge an und schreibt jede Tabelle einmal.
+    Entweder werden alle Vorgänge wirksam oder keiner. Als Kontextmanager wird am Ende des Blocks
+    automatisch committet; bei einer Ausnahme im Block werden die gesammelten Vorgänge verworfen.
+
+    Beispiel:
+        with helper.transaction() as transaction:
+            transaction.update('mitglieder.csv', 2, {'Status': 3})
+            transaction.delete_id('vorstand.csv', 2)
+            transaction.insert('vorstand.csv', [{'ID': 2, 'Position': 'Kassenwart', 'Von': '01.01.2024', 'Bis': ''}])
+
+    Attribute:
+        backend (ClStorageBackend): Die Datenablage.
+        base_versions (dict): Die erwarteten Versionen je Tabelle, z. B. {'mitglieder.csv': 7}.
+        operations (list): Die gesammelten Vorgänge als Tupel (Aktion, Tabelle, Argumente).
+    """
+
+    def __init__(self, backend: ClStorageBackend, base_versions: dict = None):
+        self.backend = backend
+        self.base_versions = dict(base_versions or {})
+        self.operations = []
+
+    def update(self, csv_name: str, id: int, updated_data: dict):
+        """
+        Aktualisiert die erste Zeile mit der angegebenen ID (siehe ClDataframeHelper.update_csv).
+        """
+        self.operations.append(('update', csv_name, (id, updated_data)))
+
+    def update_rows(self, csv_name: str, rows_data: list):
+        """
+        Aktualisiert viele Zeilen in einem Schritt: für jedes Dictionary die erste Zeile mit seiner 'ID'.
+        Alle Dictionaries müssen dieselben Schlüssel haben, die ID selbst wird nicht geändert.
+        """
+        self.operations.append(('update_rows', csv_name, (rows_data,)))
+
+    def insert(self, csv_name: str, rows_data: list):
+        """
+        Fügt Zeilen ein. Zeilen mit ID 0 erhalten beim Commit eine neue ID, die in das Dictionary eingetragen wird.
+        """
+        self.operations.append(('insert', csv_name, (rows_data,)))
+
+    def delete_id(self, csv_name: str, id: int):
+        """
+        Löscht alle Zeilen mit der angegebenen ID. Eine unbekannte ID wird ignoriert.
+        """
+        self.operations.append(('delete_id', csv_name, (id,)))
+
+    def delete_id_row(self, csv_name: str, id: int, row_nr: int):
+        """
+        Löscht die row_nr-te Zeile (beginnend bei 1) mit der angegebenen ID.
+        """
+        self.operations.append(('delete_id_row', csv_name, (id, row_nr)))
+
+    @instrumentation.timed('transaction')
+    def commit(self):
+        """
+        Führt alle gesammelten Vorgänge atomar aus.
+
+        Raises:
+            FileNotFoundError: Wenn eine Tabelle nicht existiert.
+            ValueError: Wenn ein Vorgang ungültig ist; es wird dann nichts geschrieben.
+            ClVersionConflictError: Wenn eine Tabelle nicht mehr die erwartete Version hat.
+        """
+        operations, self.operations = self.operations, []
+        if operations:
+            self.backend.apply(operations, self.base_versions)
+
+    def rollback(self):
+        """
+        Verwirft alle gesammelten Vorgänge.
+        """
+        self.operations = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
@@ -0,0 +1,146 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Anzahl der Worker, per Umgebungsvariable überschreibbar. Standard ist die Anzahl der Prozessorkerne;
+# MEIN_VEREIN_WORKERS=1 schaltet alle parallelen Wege ab.
+DEFAULT_WORKERS = int(os.environ.get('MEIN_VEREIN_WORKERS', '0')) or os.cpu_count() or 1
+
+
+class ClWorkerPool:
+    """
+    Die Worker für paralleles Einlesen und Rechnen: ein Thread-Pool und ein Prozess-Pool mit je `workers`
+    Workern, beide erst beim ersten Bedarf angelegt.
+
+    Threads genügen, um mehrere Tabellen gleichzeitig zu lesen, da der Parser von pandas beim Zerlegen der
+    Datei den GIL freigibt. Für das Zerlegen großer Dateien in Stücke und für Gruppierungen über viele Zeilen
+    wird der Prozess-Pool verwendet. Mit einem Worker laufen map_threads und map_processes ohne Pool im
+    aufrufenden Thread.
+
+    Die Prozesse werden mit fork gestartet: Bei spawn würde jeder Worker main.py neu importieren und dabei den
+    Datendienst aufwärmen. Die Worker führen nur reine Funktionen auf ihren Argumenten aus. Geforkt wird nur,
+    solange der aufrufende Thread der einzige ist; sonst könnte ein Worker Sperren erben, die gerade von
+    Request-, Compactor- oder Watcher-Threads gehalten werden. Deshalb startet ClDataService.init_app den
+    Prozess-Pool mit start(), bevor das Aufwärmen und der Beobachter Threads anlegen; alle Worker entstehen dabei
+    auf einmal. Ohne fork (z. B. unter Windows), in einem Daemon-Prozess oder wenn beim ersten Bedarf schon
+    weitere Threads laufen, ist `multiprocess` False, und die Aufrufer lesen und rechnen wie mit einem Worker.
+
+    Attribute:
+        workers (int): Die Anzahl der Worker je Pool.
+        process_maps (int): Die Anzahl der Aufrufe von map_processes, die im Prozess-Pool liefen.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS):
+        self.workers = max(int(workers), 1)
+        self.process_maps = 0
+        self._threads = None
+        self._processes = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def parallel(self) -> bool:
+        """
+        True, wenn mehr als ein Worker zur Verfügung steht.
+        """
+        return self.workers > 1
+
+    @property
+    def multiprocess(self) -> bool:
+        """
+        True, wenn mehr als ein Worker zur Verfügung steht und der Prozess-Pool schon läuft oder jetzt gefahrlos
+        geforkt werden kann.
+        """
+        return self.parallel and (self._running() or self._can_fork())
+
+    def start(self) -> bool:
+        """
+        Startet den Prozess-Pool sofort, solange der aufrufende Thread der einzige ist (z. B. beim Start der
+        Anwendung vor dem Aufwärmen).
+
+        Returns:
+            bool: True, wenn der Prozess-Pool läuft.
+        """
+        if not self.parallel:
+            return False
+        with self._lock:
+            return self._start_processes() is not None
+
+    def _running(self) -> bool:
+        return self._processes is not None and self._pid == os.getpid()
+
+    def _start_processes(self):
+        """
+        Gibt den laufenden Prozess-Pool zurück oder startet ihn, wenn gefahrlos geforkt werden kann; sonst None.
+        Muss unter self._lock aufgerufen werden.
+        """
+        self._forget_parent_pools()
+        if self._processes is None:
+            if not self._can_fork():
+                return None
+            self._processes = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork'))
+            # Die erste Aufgabe forkt alle Worker, solange noch kein anderer Thread läuft
+            self._processes.submit(int).result()
+        return self._processes
+
+    def _forget_parent_pools(self):
+        # Pools aus dem Elternprozess (z. B. bei gunicorn --preload) gehören nicht zu diesem Prozess
+        if self._pid != os.getpid():
+            self._threads = self._processes = None
+            self._pid = os.getpid()
+
+    @staticmethod
+    def _can_fork() -> bool:
+        return ('fork' in multiprocessing.get_all_start_methods() and threading.active_count() == 1
+                and not multiprocessing.current_process().daemon)
+
+    def map_threads(self, fn, items) -> list:
+        """
+        Wendet fn auf alle Elemente im Thread-Pool an.
+
+        Returns:
+            list: Die Ergebnisse in der Reihenfolge der Elemente. Eine Ausnahme wird beim Aufrufer ausgelöst.
+        """
+        items = list(items)
+        if not self.parallel or len(items) < 2:
+            return [fn(item) for item in items]
+        with self._lock:
+            self._forget_parent_pools()
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(self.workers, thread_name_prefix='mein_verein-worker')
+        return list(self._threads.map(fn, items))
+
+    def map_processes(self, fn, *iterables) -> list:
+        """
+        Wendet fn auf alle Elemente im Prozess-Pool an. fn muss eine Funktion auf Modulebene sein, Argumente
+        und Ergebnisse werden zwischen den Prozessen kopiert. Ohne `multiprocess` läuft fn im aufrufenden Thread.
+
+        Returns:
+            list: Die Ergebnisse in der Reihenfolge der Elemente. Eine Ausnahme wird beim Aufrufer ausgelöst.
+        """
+        if not self.parallel:
+            return list(map(fn, *iterables))
+        with self._lock:
+            processes = self._start_processes()
+            if processes is not None:
+                self.process_maps += 1
+        if processes is None:
+            return list(map(fn, *iterables))
+        return list(processes.map(fn, *iterables))
+
+    def shutdown(self):
+        """
+        Beendet beide Pools. Beim nächsten Bedarf werden sie neu angelegt.
+        """
+        with self._lock:
+            self._forget_parent_pools()
+            threads, processes = self._threads, self._processes
+            self._threads = self._processes = None
+        for executor in (threads, processes):
+            if executor is not None:
+                executor.shutdown()
+
+
+# Der gemeinsame Worker-Pool der Anwendung
+shared_pool = ClWorkerPool()